@@ -4,8 +4,9 @@ from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 
 from backend.auth.jwt_handler import verify_access_token
-from backend.config.rate_limit_config import get_rate_limit_config
+from backend.config.rate_limit_config import get_rate_limit_policies
 from backend.utils.rate_limiter import get_rate_limiter
+from backend.utils.metrics import RATE_LIMIT_REJECTIONS, time_stage
 
 
 # OAuth2PasswordBearer extracts "Authorization: Bearer <token>"
@@ -25,20 +26,29 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    payload = verify_access_token(token)
+    with time_stage("request", "auth"):
+        payload = verify_access_token(token)
     return {
         "user_id": payload["sub"],
         "role": payload["role"],
         "department": payload["department"],
     }
 
+def require_admin(current_user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
+    """
+    FastAPI dependency: allows only users with the admin role.
+    Raises 403 for every other role.
+    """
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have permission")
+    return current_user
+
 def rate_limit_user(endpoint: str):
     """
     Dependency factory for role-aware user-based rate limiting.
     Usage: Depends(rate_limit_user("chat"))
     """
     def _rate_limit_dependency(current_user: Dict[str, Any] = Depends(get_current_user)):
-        config = get_rate_limit_config()
         role = current_user.get("role", "intern")
         user_id = current_user.get("user_id")
 
@@ -48,32 +58,20 @@ def rate_limit_user(endpoint: str):
                 detail="User ID not found in token.",
             )
 
-        # Get limits for user's role and endpoint
-        role_config = config.get(role, config.get("intern", {}))
-        endpoint_config = role_config.get(endpoint)
-
-        if not endpoint_config:
-            # No rate limit configured for this role/endpoint combination
-            return current_user
-
-        # Convert config to (limit, window_seconds) format
-        limits = {}
-        if "per_minute" in endpoint_config:
-            limits["per_minute"] = (endpoint_config["per_minute"], 60)
-        if "per_hour" in endpoint_config:
-            limits["per_hour"] = (endpoint_config["per_hour"], 3600)
-        if "per_day" in endpoint_config:
-            limits["per_day"] = (endpoint_config["per_day"], 86400)
-
+        # Compiled (limit, window_seconds[, burst]) windows for the user's role and endpoint
+        limits = get_rate_limit_policies().lookup(role, endpoint)
         if not limits:
+            # No rate limit configured for this role/endpoint combination
             return current_user
 
         # Check rate limits
         limiter = get_rate_limiter()
         identifier = f"user:{user_id}:{endpoint}"
-        allowed, retry_after, violated_window = limiter.check_multiple_limits(identifier, limits)
+        with time_stage("request", "rate_limit"):
+            allowed, retry_after, violated_window = limiter.check_multiple_limits(identifier, limits)
 
         if not allowed:
+            RATE_LIMIT_REJECTIONS.labels(endpoint, violated_window or "unknown").inc()
             window_display = violated_window.replace("_", " ").title() if violated_window else "rate limit"
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -86,25 +84,27 @@ def rate_limit_user(endpoint: str):
     return _rate_limit_dependency
 
 
-def rate_limit_ip(endpoint: str, per_15min: int, per_hour: int):
+def rate_limit_ip(endpoint: str):
     """
     Dependency factory for IP-based rate limiting.
-    Usage: Depends(rate_limit_ip("login", 5, 10))
+    Limits come from the IP policies, e.g. RATE_LIMIT_LOGIN_PER_15MIN / RATE_LIMIT_LOGIN_PER_HOUR.
+    Usage: Depends(rate_limit_ip("login"))
     """
     def _rate_limit_dependency(request: Request):
+        limits = get_rate_limit_policies().lookup_ip(endpoint)
+        if not limits:
+            return
+
         client_ip = request.client.host if request.client else "unknown"
 
         limiter = get_rate_limiter()
         identifier = f"ip:{client_ip}:{endpoint}"
 
-        limits = {
-            "per_15min": (per_15min, 900),  # 15 minutes = 900 seconds
-            "per_hour": (per_hour, 3600),
-        }
-
-        allowed, retry_after, violated_window = limiter.check_multiple_limits(identifier, limits)
+        with time_stage("request", "rate_limit_ip"):
+            allowed, retry_after, violated_window = limiter.check_multiple_limits(identifier, limits)
 
         if not allowed:
+            RATE_LIMIT_REJECTIONS.labels(endpoint, violated_window or "unknown").inc()
             window_display = violated_window.replace("_", " ").title() if violated_window else "rate limit"
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -1,8 +1,132 @@
 import os
+import time
+import heapq
+import hashlib
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Optional, Tuple
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from fastapi import HTTPException, status
-from jose import JWTError,jwt # type: ignore
+from jose import JWTError,jwk,jwt # type: ignore
+from backend.utils.metrics import CACHE_REQUESTS
+
+
+def _key_id(secret_key: str) -> str:
+    return hashlib.sha256(secret_key.encode("utf-8")).hexdigest()[:16]
+
+
+class KeyRing:
+    """
+    Signing key plus every key still accepted for verification, constructed once.
+    New tokens are signed with the current key. Tokens signed with a previous key
+    stay valid until that key is dropped from JWT_PREVIOUS_SECRET_KEYS.
+    """
+
+    def __init__(self, secret_key: str, algorithm: str = "HS256", previous_keys: Sequence[str] = ()):
+        if not secret_key:
+            raise RuntimeError("JWT_SECRET_KEY is not set")
+        self.algorithm = algorithm
+        self.kid = _key_id(secret_key)
+        self.signing_key = jwk.construct(secret_key, algorithm)
+        self.verification_keys = [self.signing_key] + [
+            jwk.construct(key, algorithm) for key in previous_keys if key and key != secret_key
+        ]
+
+
+class VerifiedTokenCache:
+    """
+    Claims of tokens that already passed verification, keyed by the token's SHA-256 digest.
+    Entries are evicted at their exp; when full, the token expiring soonest is dropped.
+    """
+
+    def __init__(self, max_entries: int, name: str = "verified_token"):
+        self.max_entries = max_entries
+        self._entries: Dict[bytes, Tuple[Dict[str, Any], int]] = {}
+        # (exp, digest) min-heap, one item per entry
+        self._expiry: List[Tuple[int, bytes]] = []
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        # Exported counters keep counting across clear() and reload_keys(), unlike hits/misses
+        self._hit_counter = CACHE_REQUESTS.labels(name, "hit")
+        self._miss_counter = CACHE_REQUESTS.labels(name, "miss")
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, digest: bytes, now: float) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(digest)
+        if entry is None or entry[1] <= now:
+            # Expired entries fall through to full verification, which reports the expiry
+            self.misses += 1
+            self._miss_counter.inc()
+            return None
+        self.hits += 1
+        self._hit_counter.inc()
+        return entry[0]
+
+    def put(self, digest: bytes, claims: Dict[str, Any], exp: int, now: float):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            while self._expiry and (self._expiry[0][0] <= now or len(self._entries) >= self.max_entries):
+                _, evicted = heapq.heappop(self._expiry)
+                del self._entries[evicted]
+            if digest not in self._entries:
+                heapq.heappush(self._expiry, (exp, digest))
+            self._entries[digest] = (claims, exp)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._expiry.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_key_ring: Optional[KeyRing] = None
+_token_cache: Optional[VerifiedTokenCache] = None
+
+
+def get_key_ring() -> KeyRing:
+    """Build the key ring from JWT_SECRET_KEY / JWT_PREVIOUS_SECRET_KEYS / JWT_ALGORITHM on first use."""
+    global _key_ring
+    if _key_ring is None:
+        previous = os.getenv("JWT_PREVIOUS_SECRET_KEYS", "")
+        _key_ring = KeyRing(
+            os.getenv("JWT_SECRET_KEY"),
+            os.getenv("JWT_ALGORITHM", "HS256"),
+            [key.strip() for key in previous.split(",") if key.strip()],
+        )
+    return _key_ring
+
+
+def get_token_cache() -> VerifiedTokenCache:
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = VerifiedTokenCache(int(os.getenv("JWT_TOKEN_CACHE_SIZE", "10000")))
+    return _token_cache
+
+
+def reload_keys():
+    """Re-read the signing keys from the environment, e.g. after rotating JWT_SECRET_KEY."""
+    global _key_ring
+    _key_ring = None
+    # Cached tokens may have been signed with a key that is no longer accepted
+    get_token_cache().clear()
+    return get_key_ring()
+
 
 def create_access_token(
     *,
@@ -15,8 +139,7 @@ def create_access_token(
     Create a signed JWT access token.
     Required claims: sub, role, department, exp
     """
-    secret_key = os.getenv("JWT_SECRET_KEY")
-    algorithm = os.getenv("JWT_ALGORITHM", "HS256")
+    key_ring = get_key_ring()
     default_exp_minutes = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
     now = datetime.now(timezone.utc)
@@ -28,22 +151,28 @@ def create_access_token(
         "department": department,
         "exp": int(expire.timestamp()),
     }
-    return jwt.encode(to_encode, secret_key, algorithm=algorithm)
+    return jwt.encode(to_encode, key_ring.signing_key, algorithm=key_ring.algorithm, headers={"kid": key_ring.kid})
 
 
 def verify_access_token(token: str) -> Dict[str, Any]:
     """
     Verify JWT signature + required claims + explicit expiry validation.
+    Tokens verified before are served from the token cache until they expire.
     Raises 401 on invalid/missing/expired token.
     """
-    secret_key = os.getenv("JWT_SECRET_KEY")
-    algorithm = os.getenv("JWT_ALGORITHM", "HS256")
+    now_ts = int(time.time())
+    cache = get_token_cache()
+    digest = cache.digest(token)
+    claims = cache.get(digest, now_ts)
+    if claims is not None:
+        return dict(claims)
 
+    key_ring = get_key_ring()
     try:
         payload = jwt.decode(
             token,
-            secret_key,
-            algorithms=[algorithm],
+            key_ring.verification_keys,
+            algorithms=[key_ring.algorithm],
             options={
                 "verify_signature": True,
                 "verify_exp": False,  # we validate exp explicitly below for clarity
@@ -79,7 +208,6 @@ def verify_access_token(token: str) -> Dict[str, Any]:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    now_ts = int(datetime.now(timezone.utc).timestamp())
     if exp_int <= now_ts:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -87,4 +215,5 @@ def verify_access_token(token: str) -> Dict[str, Any]:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    return payload
\ No newline at end of file
+    cache.put(digest, payload, exp_int, now_ts)
+    return dict(payload)
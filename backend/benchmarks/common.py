@@ -0,0 +1,116 @@
+"""
+Shared helpers for the benchmark scripts.
+Every benchmark reports the same timing fields and can write them as JSON.
+"""
+import json
+import time
+import socket
+import platform
+import subprocess
+import http.client
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(durations: List[float]) -> Dict[str, float]:
+    """Summarize durations given in seconds as milliseconds."""
+    if not durations:
+        return {"runs": 0}
+    total = sum(durations)
+    return {
+        "runs": len(durations),
+        "mean_ms": round(total / len(durations) * 1000, 4),
+        "p50_ms": round(percentile(durations, 50) * 1000, 4),
+        "p95_ms": round(percentile(durations, 95) * 1000, 4),
+        "p99_ms": round(percentile(durations, 99) * 1000, 4),
+        "min_ms": round(min(durations) * 1000, 4),
+        "ops_per_sec": round(len(durations) / total, 2) if total else None,
+    }
+
+
+def measure(fn: Callable[[], Any], runs: int = 100, warmup: int = 5) -> Dict[str, float]:
+    """Call fn repeatedly and summarize the per-call latency."""
+    for _ in range(warmup):
+        fn()
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return summarize(durations)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_ready(port: int, path: str = "/health", timeout: float = 60.0):
+    """Poll a local server until path answers 200."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", path)
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not become ready")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def write_results(name: str, results: Dict[str, Any], output: str = None) -> Dict[str, Any]:
+    """Attach run metadata, print the results and optionally write them to a JSON file."""
+    report = {
+        "benchmark": name,
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, default=str)
+    print(text)
+    if output:
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        Path(output).write_text(text)
+    return report
+
+
+def compare_results(results: Dict[str, Any], baseline: str) -> Dict[str, Any]:
+    """
+    Mean latency of each case against a report written earlier (e.g. on another commit).
+    A positive change_pct means the case got slower.
+    """
+    previous = json.loads(Path(baseline).read_text())
+    comparison = {}
+    for name, current in results.items():
+        before = previous.get("results", {}).get(name)
+        if not isinstance(current, dict) or not isinstance(before, dict) or not before.get("mean_ms"):
+            continue
+        comparison[name] = {
+            "baseline_mean_ms": before["mean_ms"],
+            "mean_ms": current["mean_ms"],
+            "change_pct": round((current["mean_ms"] / before["mean_ms"] - 1) * 100, 1),
+        }
+    return {"baseline": baseline, "baseline_commit": previous.get("commit"), "cases": comparison}
@@ -0,0 +1,85 @@
+"""
+Query embedding throughput with and without micro-batching.
+
+Simulates N concurrent users, each embedding a sequence of distinct questions.
+The default fake model charges a fixed per-call overhead plus a per-item cost
+and runs one call at a time, which is how a CPU-bound sentence-transformer
+behaves. Pass --real to use the configured EMBED_MODEL_NAME instead.
+
+Usage (from the project root):
+    python -m backend.benchmarks.embedding_batcher [--users 50] [--real] [--output results.json]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from backend.benchmarks.common import summarize, write_results
+from backend.utils.embedding_batcher import EmbeddingBatcher
+
+
+class FakeEmbeddingModel:
+    """Serialized model with a fixed cost per call and a small cost per text."""
+
+    def __init__(self, call_overhead: float = 0.008, per_item: float = 0.0005, dim: int = 384):
+        self.call_overhead = call_overhead
+        self.per_item = per_item
+        self.dim = dim
+        self._lock = Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            time.sleep(self.call_overhead + self.per_item * len(texts))
+        return [[0.0] * self.dim for _ in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def _drive(embed, users: int, per_user: int):
+    latencies = []
+    latencies_lock = Lock()
+
+    def user(index: int):
+        for i in range(per_user):
+            start = time.perf_counter()
+            embed(f"user {index} question {i} about leave policy")
+            elapsed = time.perf_counter() - start
+            with latencies_lock:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user, range(users)))
+    wall = time.perf_counter() - started
+    return {**summarize(latencies), "throughput_per_sec": round(len(latencies) / wall, 2)}
+
+
+def run(users: int = 50, per_user: int = 20, window_ms: float = 5, max_batch: int = 32, real: bool = False):
+    if real:
+        from backend.utils.embeddings import get_embedding_model
+        model = get_embedding_model()
+    else:
+        model = FakeEmbeddingModel()
+
+    batcher = EmbeddingBatcher(model.embed_documents, max_batch_size=max_batch, window_seconds=window_ms / 1000)
+    results = {
+        "unbatched": _drive(model.embed_query, users, per_user),
+        "batched": _drive(batcher.embed, users, per_user),
+        "single_user_unbatched": _drive(model.embed_query, 1, per_user),
+        "single_user_batched": _drive(batcher.embed, 1, per_user),
+    }
+    results["batcher"] = batcher.stats()
+    results["config"] = {"users": users, "per_user": per_user, "window_ms": window_ms, "max_batch": max_batch, "real_model": real}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--per-user", type=int, default=20)
+    parser.add_argument("--window-ms", type=float, default=5)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--real", action="store_true", help="Use the configured sentence-transformer model")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+    write_results("embedding_batcher", run(args.users, args.per_user, args.window_ms, args.max_batch, args.real), args.output)
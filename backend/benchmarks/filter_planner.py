@@ -0,0 +1,131 @@
+"""
+Filtered-search benchmark: filter planner vs. the previous "should over all
+four fields" filter.
+
+Every query is a noisy copy of a stored point with part of that point's
+metadata. Quality is measured without either filter: hit_rate_at_k is the
+share of queries whose source point (the labeled relevant one) is returned,
+recall_vs_unfiltered the overlap with an unfiltered exact top-k search.
+
+Usage (from the project root):
+    python -m backend.benchmarks.filter_planner [--url http://localhost:6333] [--output results.json]
+
+Without --url the benchmark runs against Qdrant's local in-memory mode, which
+brute-forces every search; use a real server for representative HNSW latency.
+"""
+import argparse
+import random
+import time
+import uuid
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    Distance, FieldCondition, Filter, MatchValue, PayloadSchemaType, PointStruct, SearchParams, VectorParams,
+)
+from backend.benchmarks.common import summarize, write_results
+from backend.services import query_retriever
+from backend.services.query_retriever import ALLOWED_METADATA_VALUES, search_handbook
+
+COLLECTION = "bench_filter_planner"
+
+
+def _random_vector(rng: random.Random, dim: int):
+    return [rng.gauss(0, 1) for _ in range(dim)]
+
+
+def _random_metadata(rng: random.Random):
+    # Most chunks are tagged "General" by the keyword taggers
+    return {
+        field: rng.choice(sorted(values)) if rng.random() < 0.5 else "General"
+        for field, values in ALLOWED_METADATA_VALUES.items()
+    }
+
+
+def _legacy_filter(metadata: dict):
+    return Filter(should=[FieldCondition(key=k, match=MatchValue(value=v)) for k, v in metadata.items()])
+
+
+def _setup(client: QdrantClient, rng: random.Random, points: int, dim: int):
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+    client.create_collection(COLLECTION, vectors_config=VectorParams(size=dim, distance=Distance.COSINE))
+    for field in ALLOWED_METADATA_VALUES:
+        client.create_payload_index(COLLECTION, field_name=field, field_schema=PayloadSchemaType.KEYWORD)
+
+    stored = []
+    batch = []
+    for _ in range(points):
+        point_id = str(uuid.uuid4())
+        vector = _random_vector(rng, dim)
+        payload = _random_metadata(rng)
+        stored.append((point_id, vector, payload))
+        batch.append(PointStruct(id=point_id, vector=vector, payload=payload))
+        if len(batch) == 256:
+            client.upsert(COLLECTION, points=batch)
+            batch = []
+    if batch:
+        client.upsert(COLLECTION, points=batch)
+    return stored
+
+
+def _queries(rng: random.Random, stored, count: int):
+    queries = []
+    for _ in range(count):
+        point_id, vector, payload = rng.choice(stored)
+        noisy = [v + rng.gauss(0, 0.3) for v in vector]
+        metadata = {k: (v if v != "General" and rng.random() < 0.7 else "General") for k, v in payload.items()}
+        queries.append((noisy, metadata, point_id))
+    return queries
+
+
+def run(url: str = None, points: int = 5000, queries: int = 200, dim: int = 64, limit: int = 5, seed: int = 7):
+    rng = random.Random(seed)
+    client = QdrantClient(url=url) if url else QdrantClient(":memory:")
+    stored = _setup(client, rng, points, dim)
+    workload = _queries(rng, stored, queries)
+
+    # Point the retriever at the benchmark collection
+    query_retriever.client = client
+    query_retriever.collection_handbook = COLLECTION
+    query_retriever.clear_cardinality_cache()
+
+    latencies = {"legacy_should": [], "planner": []}
+    hits = {"legacy_should": [], "planner": []}
+    recall = {"legacy_should": [], "planner": []}
+    for vector, metadata, source_id in workload:
+        unfiltered = {p.id for p in client.query_points(
+            COLLECTION, query=vector, limit=limit, search_params=SearchParams(exact=True),
+        ).points}
+
+        start = time.perf_counter()
+        legacy = client.query_points(COLLECTION, query=vector, query_filter=_legacy_filter(metadata), limit=limit).points
+        latencies["legacy_should"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        planned = search_handbook(vector, metadata, limit)
+        latencies["planner"].append(time.perf_counter() - start)
+
+        for name, points in (("legacy_should", legacy), ("planner", planned)):
+            ids = {p.id for p in points}
+            hits[name].append(source_id in ids)
+            recall[name].append(len(unfiltered & ids) / len(unfiltered))
+
+    client.delete_collection(COLLECTION)
+    return {
+        name: {
+            **summarize(latencies[name]),
+            "hit_rate_at_k": round(sum(hits[name]) / len(hits[name]), 4),
+            "recall_vs_unfiltered": round(sum(recall[name]) / len(recall[name]), 4),
+        }
+        for name in latencies
+    } | {"config": {"points": points, "queries": queries, "dim": dim, "limit": limit, "url": url or ":memory:"}}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Qdrant server URL, defaults to local in-memory mode")
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+    write_results("filter_planner", run(args.url, args.points, args.queries, limit=args.limit), args.output)
@@ -0,0 +1,173 @@
+"""
+Fixed, representative inputs for the benchmarks: a synthetic multi-page
+handbook, a question set, and deterministic stand-ins for the embedding model
+and the Ollama LLMs. Everything is derived from a seed, so two runs (or two
+commits) see exactly the same inputs.
+"""
+import re
+import json
+import random
+import hashlib
+from functools import lru_cache
+from typing import Dict, List
+import numpy as np
+from backend.services.generate_metadata import infer_employee_type, infer_location, infer_policy_type, infer_section
+
+# Dimension of the default embedding model (all-MiniLM-L6-v2)
+EMBEDDING_DIM = 384
+
+SECTIONS = {
+    "Introduction": [
+        "Welcome to the company. This handbook gives an overview of our policies, procedures and benefits.",
+        "About us: the company operates from its headquarters, two branch offices and a growing remote workforce.",
+    ],
+    "Leave Policy": [
+        "Full-time employees accrue paid time off (PTO) at 1.5 days per month, up to 20 days per year.",
+        "Sick leave of up to 10 days per year is available to all permanent staff without loss of pay.",
+        "Parental leave of 16 weeks is granted to primary caregivers and 6 weeks to secondary caregivers.",
+        "Vacation requests must be submitted to your manager at least two weeks in advance.",
+    ],
+    "Work From Home": [
+        "Employees may work from home up to three days per week with manager approval.",
+        "Remote employees must be reachable during core hours, 10:00 to 15:00 local time.",
+        "Telecommute equipment is provided by IT and remains company property.",
+    ],
+    "Payroll and Compensation": [
+        "Salary is paid monthly on the last working day. Payroll questions go to hr-payroll.",
+        "Non-exempt employees receive overtime pay of one and a half times their regular wage.",
+        "Compensation reviews take place once a year in the first quarter.",
+    ],
+    "Code of Conduct": [
+        "All employees must follow the code of conduct and treat colleagues with respect.",
+        "Harassment of any kind is not tolerated and leads to disciplinary action.",
+        "Report ethics concerns to your manager or through the anonymous hotline.",
+    ],
+    "Information Security": [
+        "Passwords must be at least 14 characters long and must not be shared.",
+        "Confidentiality of customer data is required by our data protection policy.",
+        "Report suspected cybersecurity incidents to the security team immediately.",
+    ],
+    "Employee Benefits": [
+        "Health insurance covers employees and their dependants from the first day of employment.",
+        "The company matches retirement contributions up to 5 percent of salary.",
+        "Wellness perks include a gym allowance and two wellness days per year.",
+    ],
+    "Health and Safety": [
+        "Follow the emergency procedures posted on every floor of the office.",
+        "Workplace safety training is mandatory for on-site staff within the first month.",
+    ],
+    "Interns and Contractors": [
+        "Interns receive a mentor and a structured internship plan for the duration of their stay.",
+        "Contractors and consultants follow the security and conduct policies of this handbook.",
+        "Part-time and seasonal staff accrue leave pro rata to their contracted hours.",
+    ],
+}
+
+QUESTIONS = [
+    "What is the leave policy of the company?",
+    "How many days of paid time off do full-time employees get?",
+    "Is there a work from home policy for full-time employees?",
+    "When is salary paid?",
+    "How is overtime paid for non-exempt employees?",
+    "What does the code of conduct say about harassment?",
+    "What are the password requirements?",
+    "What benefits are available for interns?",
+    "Does health insurance cover dependants?",
+    "How long is parental leave?",
+    "Explain payroll procedures at the headquarters office",
+    "Code of conduct for contractors working remotely",
+    "Health and safety guidelines for branch office staff",
+    "Do part-time employees get vacation?",
+    "Who provides equipment for remote work?",
+    "What are the core hours for remote employees?",
+    "How do I report a security incident?",
+    "Is there a retirement plan?",
+    "What are the office timings?",
+    "How do I request vacation?",
+]
+
+
+def build_handbook_text(pages: int = 40, seed: int = 7) -> str:
+    """
+    Synthetic handbook text as pdf_loader returns it: pages separated by blank
+    lines, with headings, bullet lines and the stray whitespace of PDF extraction.
+    """
+    rng = random.Random(seed)
+    headings = list(SECTIONS)
+    out = []
+    for page in range(1, pages + 1):
+        heading = headings[(page - 1) % len(headings)]
+        lines = [f"{heading}\t\t(page {page})", ""]
+        for _ in range(rng.randint(6, 10)):
+            sentences = rng.sample(SECTIONS[heading], k=min(len(SECTIONS[heading]), rng.randint(1, 3)))
+            filler = rng.choice(SECTIONS[rng.choice(headings)])
+            if rng.random() < 0.3:
+                lines.append("  - " + sentences[0])
+            else:
+                lines.append("  ".join(sentences + [filler]))
+        out.append("\n".join(lines))
+    return "\n\n\n".join(out)
+
+
+@lru_cache(maxsize=4096)
+def _word_vector(word: str, dim: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(word.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(dim)
+
+
+def fake_embedding(text: str, dim: int = EMBEDDING_DIM) -> List[float]:
+    """
+    Deterministic unit vector for a text, a stand-in for the embedding model.
+    Sum of one fixed random vector per word, so texts sharing words score
+    similar, like a real model would, and retrieval returns relevant chunks.
+    """
+    words = re.findall(r"[a-z0-9]+", text.lower()) or [text]
+    vector = np.sum([_word_vector(word, dim) for word in words], axis=0)
+    return (vector / np.linalg.norm(vector)).astype(np.float32).tolist()
+
+
+class FakeEmbeddingModel:
+    """Drop-in for the HuggingFaceEmbeddings model, backed by fake_embedding."""
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    def embed_query(self, text: str) -> List[float]:
+        return fake_embedding(text, self.dim)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [fake_embedding(text, self.dim) for text in texts]
+
+
+def fake_metadata(question: str) -> Dict[str, str]:
+    """What the metadata LLM would extract, derived from the keyword taggers."""
+    return {
+        "policy_type": infer_policy_type(question),
+        "section": infer_section(question),
+        "location": infer_location(question),
+        "employee_type": infer_employee_type(question),
+    }
+
+
+def fake_metadata_response(question: str) -> str:
+    """Raw metadata LLM output, JSON as the query prompt asks for."""
+    return json.dumps(fake_metadata(question))
+
+
+def fake_answer(context: List[str], question: str) -> str:
+    """Answer LLM output with the chatty preamble clean_output strips."""
+    bullets = "\n".join(f"- {text.split('. ')[0].strip().rstrip('.')}." for text in context[:4])
+    return f"Sure, here is what the handbook says.\n\n{question.rstrip('?')}:\n{bullets}\n\n"
+
+
+def fake_query_result(question: str, chunks: List[str], limit: int = 5) -> Dict:
+    """get_query_retriever output for a question, with descending scores."""
+    rng = random.Random(question)
+    hits = rng.sample(chunks, k=min(limit, len(chunks)))
+    return {
+        "query": question,
+        "results": [
+            {"id": f"{i}", "score": round(0.85 - 0.05 * i, 4), "payload": {"text": text}}
+            for i, text in enumerate(hits)
+        ],
+    }
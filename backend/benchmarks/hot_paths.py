@@ -0,0 +1,127 @@
+"""
+Microbenchmarks of the backend hot functions on fixed inputs (see fixtures.py):
+chunking and cleaning, the metadata taggers, filter building, context
+extraction and answer cleanup, the in-memory rate limiter, token verification
+and add_vectors against Qdrant's local in-memory mode.
+
+No model, LLM or Qdrant server is needed: embeddings and LLM output come from
+the deterministic fakes in fixtures.py. Write the results with --output on two
+commits and pass one of them as --baseline to the other run to see the change.
+
+Usage (from the project root):
+    python -m backend.benchmarks.hot_paths [--runs 200] [--only chunk_text clean_text] [--output results.json] [--baseline previous.json]
+"""
+import os
+import argparse
+import itertools
+from typing import Any, Callable, Dict
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, VectorParams
+from backend.benchmarks.common import compare_results, measure, write_results
+from backend.benchmarks.fixtures import (
+    EMBEDDING_DIM, QUESTIONS, build_handbook_text, fake_answer, fake_embedding, fake_metadata, fake_query_result,
+)
+from backend.utils.chunker import chunk_text, clean_text
+from backend.utils.rate_limiter import InMemoryRateLimiter
+from backend.services import handbook_services
+from backend.services.generate_metadata import infer_employee_type, infer_location, infer_policy_type, infer_section
+from backend.services.query_retriever import build_filter
+from backend.services.final_result import clean_output, extract_context
+
+COLLECTION = "bench_hot_paths"
+
+
+def _cycle(fn: Callable, inputs) -> Callable[[], Any]:
+    """Call fn with the next input on every call, so no input is favoured by caching."""
+    it = itertools.cycle(inputs)
+    return lambda: fn(next(it))
+
+
+def _bench_text(cases: Dict[str, Callable], text: str, chunks):
+    cases["chunk_text"] = (lambda: chunk_text(text), 0.1)
+    cases["clean_text"] = (_cycle(clean_text, chunks), 10)
+    for tagger in (infer_policy_type, infer_section, infer_location, infer_employee_type):
+        cases[tagger.__name__] = (_cycle(tagger, chunks), 10)
+
+
+def _bench_retrieval(cases: Dict[str, Callable], chunks):
+    metadata = [fake_metadata(q) for q in QUESTIONS]
+    results = [fake_query_result(q, chunks) for q in QUESTIONS]
+    answers = [fake_answer(extract_context(r), r["query"]) for r in results]
+    cases["build_filter"] = (_cycle(build_filter, metadata), 10)
+    cases["extract_context"] = (_cycle(extract_context, results), 10)
+    cases["clean_output"] = (_cycle(clean_output, answers), 10)
+
+
+def _bench_rate_limiter(cases: Dict[str, Callable]):
+    limiter = InMemoryRateLimiter()
+    # The chat windows of an employee, high enough that every check is allowed
+    limits = {"per_minute": (10**9, 60), "per_hour": (10**9, 3600)}
+    users = [f"user:employee-{i}:chat" for i in range(1000)]
+    cases["rate_limiter_check_multiple_limits"] = (_cycle(lambda u: limiter.check_multiple_limits(u, limits), users), 10)
+
+
+def _bench_jwt(cases: Dict[str, Callable]):
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret-key")
+    from backend.auth.jwt_handler import create_access_token, get_token_cache, reload_keys, verify_access_token
+    reload_keys()
+    tokens = [create_access_token(sub=f"employee-{i}", role="employee", department="HR") for i in range(100)]
+
+    def uncached(token):
+        get_token_cache().clear()
+        return verify_access_token(token)
+
+    cases["verify_access_token_uncached"] = (_cycle(uncached, tokens), 1)
+    # The uncached case empties the cache: warm up with every token so no measured call decodes
+    cases["verify_access_token_cached"] = (_cycle(verify_access_token, tokens), 10, len(tokens))
+
+
+def _bench_add_vectors(cases: Dict[str, Callable], chunks, batch: int):
+    client = QdrantClient(":memory:")
+    client.create_collection(COLLECTION, vectors_config=VectorParams(size=EMBEDDING_DIM, distance=Distance.COSINE))
+    # Point the ingestion path at the in-memory collection and the fake embeddings
+    handbook_services.client = client
+    handbook_services.collection_handbook = COLLECTION
+    handbook_services.get_embedding = fake_embedding
+    batches = [chunks[i:i + batch] for i in range(0, len(chunks) - batch + 1, batch)] or [chunks]
+    cases[f"add_vectors_{batch}_chunks"] = (_cycle(handbook_services.add_vectors, batches), 0.1)
+
+
+def run(runs: int = 200, pages: int = 40, batch: int = 32, only=None) -> Dict[str, Any]:
+    text = build_handbook_text(pages)
+    chunks = chunk_text(text)
+
+    # name -> (fn, multiplier of runs[, warm-up calls]); slow cases run less often, fast ones more
+    cases: Dict[str, Any] = {}
+    _bench_text(cases, text, chunks)
+    _bench_retrieval(cases, chunks)
+    _bench_rate_limiter(cases)
+    _bench_jwt(cases)
+    _bench_add_vectors(cases, chunks, batch)
+
+    results: Dict[str, Any] = {}
+    for name, (fn, multiplier, *warmup) in cases.items():
+        if only and name not in only:
+            continue
+        case_runs = max(5, int(runs * multiplier))
+        results[name] = measure(fn, runs=case_runs, warmup=warmup[0] if warmup else min(case_runs, 5))
+    results["config"] = {
+        "runs": runs, "pages": pages, "handbook_chars": len(text), "chunks": len(chunks),
+        "questions": len(QUESTIONS), "add_vectors_batch": batch,
+    }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200, help="Base number of calls per case")
+    parser.add_argument("--pages", type=int, default=40, help="Pages in the synthetic handbook")
+    parser.add_argument("--batch", type=int, default=32, help="Chunks per add_vectors call")
+    parser.add_argument("--only", nargs="+", help="Run only these cases")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    args = parser.parse_args()
+    results = run(args.runs, args.pages, args.batch, args.only)
+    if args.baseline:
+        results["comparison"] = compare_results(results, args.baseline)
+    write_results("hot_paths", results, args.output)
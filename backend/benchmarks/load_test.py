@@ -0,0 +1,248 @@
+"""
+End-to-end HTTP load test of one backend node, entirely offline.
+
+Starts the stub Ollama server (stub_ollama.py) and the app (load_test_app.py:
+local in-memory Qdrant seeded with the synthetic handbook, fake embeddings)
+as separate processes, then ramps up concurrent virtual users. Each user logs
+in once per stage through /login and asks /chat questions back to back (plus
+--think-time), backing off for Retry-After (at most 5 s) when told to wait.
+Per stage and endpoint it reports throughput, p50/p95/p99 latency of
+successful requests, and the error and 429 rates.
+
+By default the rate limits are raised out of the way (every virtual user comes
+from 127.0.0.1 and shares three mock accounts), so the result is the capacity
+of the node. Use --rate-limits production to see the configured limits at work.
+LLM concurrency and admission settings (OLLAMA_MAX_CONCURRENCY_PER_BACKEND,
+ADMISSION_*) are taken from the environment like in production.
+
+Usage (from the project root):
+    python -m backend.benchmarks.load_test [--ramp 1 5 10 25 50] [--stage-seconds 15]
+        [--first-token-latency 0.3] [--tokens-per-sec 40] [--roles employee intern] [--output results.json]
+"""
+import os
+import sys
+import time
+import signal
+import asyncio
+import argparse
+import itertools
+import subprocess
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from backend.benchmarks.common import free_port, summarize, wait_until_ready, write_results
+from backend.benchmarks.fixtures import EMBEDDING_DIM, QUESTIONS
+from backend.routes.auth_routes import MOCK_USERS
+
+RATE_LIMIT_SETTINGS = [
+    f"RATE_LIMIT_CHAT_{window}_{role}" for window in ("PER_MIN", "PER_HOUR") for role in ("ADMIN", "EMPLOYEE", "INTERN")
+] + ["RATE_LIMIT_LOGIN_PER_15MIN", "RATE_LIMIT_LOGIN_PER_HOUR", "RATE_LIMIT_GLOBAL_PER_HOUR"]
+
+# Longest pause after a 429/503 before the user asks again
+MAX_BACKOFF_SECONDS = 5.0
+
+# (endpoint, status code or 0 for a failed connection/timeout, seconds)
+Record = Tuple[str, int, float]
+
+
+def _accounts(roles: List[str]) -> List[Tuple[str, str]]:
+    """One mock account (username, password) per requested role."""
+    by_role = {user["role"]: (name, user["password"]) for name, user in MOCK_USERS.items()}
+    unknown = [role for role in roles if role not in by_role]
+    if unknown:
+        raise ValueError(f"No mock user with role {unknown}, choose from {sorted(by_role)}")
+    return [by_role[role] for role in roles]
+
+
+def _start(module: str, args: List[str], env: Dict[str, str], log) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-m", module, *args], env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def _stop(process: subprocess.Popen):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def _app_env(port: int, ollama_url: str, rate_limits: str, pages: int) -> Dict[str, str]:
+    env = {
+        **os.environ,
+        "PORT": str(port),
+        "QDRANT_PATH": ":memory:",
+        "QDRANT_COLLECTION": "handbook_load_test",
+        "QDRANT_VECTOR_SIZE": str(EMBEDDING_DIM),
+        "OLLAMA_BASE_URL": ollama_url,
+        "OLLAMA_BASE_URLS": ollama_url,
+        "OLLAMA_API_KEY": "",
+        "CHAT_MODEL_NAME": "stub",
+        "ANSWER_MODEL": "stub",
+        "EMBED_WORKER_SOCKET": "",
+        "RATE_LIMIT_BACKEND": "memory",
+        "JWT_SECRET_KEY": os.getenv("JWT_SECRET_KEY") or "load-test-secret",
+        "LOG_TO_FILE": "false",
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+        "LOAD_TEST_PAGES": str(pages),
+    }
+    if rate_limits == "relaxed":
+        env.update({name: "1000000000" for name in RATE_LIMIT_SETTINGS})
+    return env
+
+
+async def _timed(client: httpx.AsyncClient, records: List[Record], endpoint: str, **kwargs) -> Optional[httpx.Response]:
+    start = time.perf_counter()
+    try:
+        response = await client.post(endpoint, **kwargs)
+    except httpx.HTTPError:
+        records.append((endpoint, 0, time.perf_counter() - start))
+        return None
+    records.append((endpoint, response.status_code, time.perf_counter() - start))
+    return response
+
+
+async def _virtual_user(client, account, questions, stop_at: float, think_time: float, records: List[Record]):
+    username, password = account
+    token = None
+    while token is None and time.monotonic() < stop_at:
+        response = await _timed(client, records, "/login", data={"username": username, "password": password})
+        if response is not None and response.status_code == 200:
+            token = response.json()["access_token"]
+        else:
+            await asyncio.sleep(1.0)
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.monotonic() < stop_at:
+        response = await _timed(client, records, "/chat", json={"question": next(questions)}, headers=headers)
+        if response is None or response.status_code in (429, 503):
+            # Back off like a user who was told to wait, instead of hammering the limiter
+            retry_after = response.headers.get("Retry-After", "1") if response is not None else "1"
+            await asyncio.sleep(min(float(retry_after), MAX_BACKOFF_SECONDS))
+        elif think_time:
+            await asyncio.sleep(think_time)
+
+
+def _report(records: List[Record], endpoint: str, wall: float) -> Dict[str, Any]:
+    statuses = [status for name, status, _ in records if name == endpoint]
+    ok = [seconds for name, status, seconds in records if name == endpoint and status == 200]
+    limited = statuses.count(429)
+    total = len(statuses)
+    report = summarize(ok)
+    # Throughput is measured over the stage, not from the summed latencies
+    report.pop("ops_per_sec", None)
+    return {
+        **report,
+        "requests": total,
+        "throughput_rps": round(len(ok) / wall, 2) if wall else 0.0,
+        "error_rate": round((total - len(ok) - limited) / total, 4) if total else 0.0,
+        "rate_limited_rate": round(limited / total, 4) if total else 0.0,
+        "status_counts": {str(s): statuses.count(s) for s in sorted(set(statuses))},
+    }
+
+
+async def _stage(base_url: str, users: int, seconds: float, accounts, think_time: float, timeout: float) -> Dict[str, Any]:
+    records: List[Record] = []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        stop_at = time.monotonic() + seconds
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            _virtual_user(
+                client, accounts[i % len(accounts)],
+                itertools.islice(itertools.cycle(QUESTIONS), i % len(QUESTIONS), None),
+                stop_at, think_time, records,
+            )
+            for i in range(users)
+        ))
+        wall = time.perf_counter() - started
+    return {
+        "users": users,
+        "wall_seconds": round(wall, 2),
+        "login": _report(records, "/login", wall),
+        "chat": _report(records, "/chat", wall),
+    }
+
+
+async def _server_stats(base_url: str) -> Dict[str, Any]:
+    """Admission and LLM pool counters as the app saw them, best effort."""
+    username, password = _accounts(["admin"])[0]
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        try:
+            login = await client.post("/login", data={"username": username, "password": password})
+            stats = await client.get("/admin/stats", headers={"Authorization": f"Bearer {login.json()['access_token']}"})
+            return {key: stats.json().get(key) for key in ("admission", "llm_backends", "embedding_cache")}
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            return {"error": str(e)}
+
+
+def run(ramp: List[int], stage_seconds: float = 15.0, roles: List[str] = ("employee",), think_time: float = 0.0,
+        first_token_latency: float = 0.3, tokens_per_sec: float = 40.0, rate_limits: str = "relaxed",
+        pages: int = 40, timeout: float = 120.0) -> Dict[str, Any]:
+    accounts = _accounts(list(roles))
+    stub_port, app_port = free_port(), free_port()
+    ollama_url = f"http://127.0.0.1:{stub_port}"
+    base_url = f"http://127.0.0.1:{app_port}"
+
+    with tempfile.TemporaryFile(mode="w+") as log:
+        stub = _start("backend.benchmarks.stub_ollama", [
+            "--port", str(stub_port),
+            "--first-token-latency", str(first_token_latency),
+            "--tokens-per-sec", str(tokens_per_sec),
+        ], dict(os.environ), log)
+        app = _start("backend.benchmarks.load_test_app", [], _app_env(app_port, ollama_url, rate_limits, pages), log)
+        try:
+            wait_until_ready(stub_port, "/")
+            wait_until_ready(app_port, "/health")
+            # Warm-up: first LLM client construction, Qdrant caches
+            asyncio.run(_stage(base_url, 1, 0.1, accounts, 0.0, timeout))
+            stages = [asyncio.run(_stage(base_url, users, stage_seconds, accounts, think_time, timeout)) for users in ramp]
+            server = asyncio.run(_server_stats(base_url))
+        except Exception:
+            log.seek(0)
+            print(log.read()[-4000:], file=sys.stderr)
+            raise
+        finally:
+            _stop(app)
+            _stop(stub)
+
+    return {
+        "stages": stages,
+        "server": server,
+        "config": {
+            "ramp": list(ramp), "stage_seconds": stage_seconds, "roles": list(roles), "think_time": think_time,
+            "first_token_latency": first_token_latency, "tokens_per_sec": tokens_per_sec,
+            "rate_limits": rate_limits, "handbook_pages": pages, "cpu_count": os.cpu_count(),
+        },
+    }
+
+
+def _print_table(results: Dict[str, Any]):
+    print(f"{'users':>6} {'endpoint':>8} {'req':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err':>7} {'429':>7}", file=sys.stderr)
+    for stage in results["stages"]:
+        for endpoint in ("login", "chat"):
+            r = stage[endpoint]
+            print(
+                f"{stage['users']:>6} {endpoint:>8} {r['requests']:>6} {r['throughput_rps']:>8} "
+                f"{r.get('p50_ms', 0):>9} {r.get('p95_ms', 0):>9} {r.get('p99_ms', 0):>9} "
+                f"{r['error_rate']:>7.2%} {r['rate_limited_rate']:>7.2%}",
+                file=sys.stderr,
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ramp", type=int, nargs="+", default=[1, 5, 10, 25, 50], help="Concurrent users per stage")
+    parser.add_argument("--stage-seconds", type=float, default=15.0)
+    parser.add_argument("--roles", nargs="+", default=["employee"], help="Mock account roles the users log in as")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds between a user's questions")
+    parser.add_argument("--first-token-latency", type=float, default=0.3, help="Stub Ollama seconds to first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=40.0, help="Stub Ollama generation speed")
+    parser.add_argument("--rate-limits", choices=["relaxed", "production"], default="relaxed")
+    parser.add_argument("--pages", type=int, default=40, help="Pages in the synthetic handbook")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+    results = run(
+        args.ramp, args.stage_seconds, args.roles, args.think_time,
+        args.first_token_latency, args.tokens_per_sec, args.rate_limits, args.pages,
+    )
+    write_results("load_test", results, args.output)
+    _print_table(results)
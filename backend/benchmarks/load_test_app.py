@@ -0,0 +1,32 @@
+"""
+The FastAPI app as the load test runs it, in its own process: Qdrant in local
+mode seeded with the synthetic handbook from fixtures.py, the fake embedding
+model instead of sentence-transformers, and the LLMs pointed at whatever
+OLLAMA_BASE_URL says (the stub Ollama server). load_test.py starts it with the
+environment set up; it needs no network access and no model downloads.
+
+Usage (from the project root, normally started by load_test.py):
+    QDRANT_PATH=:memory: QDRANT_VECTOR_SIZE=384 PORT=8000 ... python -m backend.benchmarks.load_test_app
+"""
+import os
+import uvicorn
+from backend.benchmarks.fixtures import EMBEDDING_DIM, FakeEmbeddingModel, build_handbook_text
+from backend.utils import embeddings
+from backend.utils.chunker import chunk_text
+from backend.services.handbook_services import add_vectors
+from backend.main import app
+
+
+def seed_handbook(pages: int):
+    """Ingest the synthetic handbook through the normal add_vectors path."""
+    add_vectors(chunk_text(build_handbook_text(pages)))
+
+
+def main():
+    embeddings._embedding_model = FakeEmbeddingModel(int(os.getenv("QDRANT_VECTOR_SIZE", str(EMBEDDING_DIM))))
+    seed_handbook(int(os.getenv("LOAD_TEST_PAGES", "40")))
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("PORT", "8000")), log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Per-call cost of logger.info on the request path.
+
+Compares the previous setup (formatter plus synchronous stdout and file writes
+in the calling thread) with the queue handler used by setup_logging, with and
+without sampling. Records go to a temporary directory and stdout is replaced by
+a null stream so terminal speed does not skew the numbers. Each request on the
+/chat path logs about five info lines, so multiply the mean accordingly.
+
+Usage (from the project root):
+    python -m backend.benchmarks.logging_overhead [--calls 20000] [--output results.json]
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+from backend.benchmarks.common import summarize, write_results
+from backend.config.logging_config import TEXT_DATEFMT, TEXT_FORMAT, setup_logging, shutdown_logging
+
+
+class _NullStream:
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def _sync_setup(logs_dir: str):
+    """The previous setup_logging: formatting and blocking writes in the caller."""
+    root = logging.getLogger()
+    handlers = [logging.StreamHandler(sys.stdout), logging.FileHandler(os.path.join(logs_dir, "sync.log"), mode="a")]
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=TEXT_DATEFMT))
+        root.addHandler(handler)
+
+    def teardown():
+        for handler in handlers:
+            root.removeHandler(handler)
+            handler.close()
+    return teardown
+
+
+def _queue_setup(logs_dir: str, sample_rates: str = ""):
+    os.environ["LOG_DIR"] = logs_dir
+    os.environ["LOG_SAMPLE_RATES"] = sample_rates
+    setup_logging()
+    return shutdown_logging
+
+
+def _measure(logger: logging.Logger, calls: int):
+    durations = []
+    for i in range(calls):
+        start = time.perf_counter()
+        logger.info(f"Processing query with limit {i % 10}")
+        durations.append(time.perf_counter() - start)
+    return summarize(durations)
+
+
+def run(calls: int = 20000):
+    logger = logging.getLogger("backend.services.handbook_services")
+    logging.getLogger().setLevel(logging.INFO)
+    scenarios = {
+        "sync_file_handler": lambda d: _sync_setup(d),
+        "queue_handler": lambda d: _queue_setup(d),
+        "queue_handler_sampled_10pct": lambda d: _queue_setup(d, "backend.services=0.1"),
+    }
+    results = {}
+    stdout = sys.stdout
+    sys.stdout = _NullStream()
+    try:
+        for name, setup in scenarios.items():
+            with tempfile.TemporaryDirectory() as logs_dir:
+                teardown = setup(logs_dir)
+                try:
+                    results[name] = _measure(logger, calls)
+                finally:
+                    teardown()
+    finally:
+        sys.stdout = stdout
+    results["config"] = {"calls": calls}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+    write_results("logging_overhead", run(args.calls), args.output)
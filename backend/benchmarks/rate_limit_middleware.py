@@ -0,0 +1,122 @@
+"""
+Per-request overhead of the global rate limit middleware.
+
+Drives a minimal FastAPI app directly through ASGI (no sockets) three ways:
+without middleware, behind the previous BaseHTTPMiddleware implementation
+(kept here for comparison), and behind the current pure ASGI middleware.
+All use an in-memory limiter with a limit high enough that every request is
+allowed. The rejection path of the current middleware is measured separately.
+
+Usage (from the project root):
+    python -m backend.benchmarks.rate_limit_middleware [--requests 20000] [--output results.json]
+"""
+import time
+import asyncio
+import argparse
+from fastapi import FastAPI, HTTPException, status
+from starlette.middleware.base import BaseHTTPMiddleware
+from backend.benchmarks.common import summarize, write_results
+from backend.config.rate_limit_config import compile_rate_limit_policies, set_rate_limit_policies
+from backend.middleware.rate_limit_middleware import RateLimitMiddleware
+from backend.utils.rate_limiter import InMemoryRateLimiter
+
+
+class BaseHTTPRateLimitMiddleware(BaseHTTPMiddleware):
+    """The previous implementation, kept here for comparison."""
+
+    def __init__(self, app, limiter, limit):
+        super().__init__(app)
+        self.exclude_paths = ["/health", "/", "/docs", "/openapi.json", "/redoc"]
+        self.limiter = limiter
+        self.limit = limit
+
+    async def dispatch(self, request, call_next):
+        if request.url.path in self.exclude_paths:
+            return await call_next(request)
+        client_ip = request.client.host if request.client else "unknown"
+        allowed, retry_after = self.limiter.check_rate_limit(f"ip:{client_ip}:global", self.limit, 3600, "per_hour")
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests. Please try again later.",
+                headers={"Retry-After": str(retry_after) if retry_after else "3600"},
+            )
+        return await call_next(request)
+
+
+def _create_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/test")
+    async def test_endpoint():
+        return {"message": "OK"}
+
+    return app
+
+
+def _scope(client_ip: str) -> dict:
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/test", "raw_path": b"/test", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": (client_ip, 50000), "server": ("bench", 80),
+    }
+
+
+async def _drive(app, requests: int, clients: int, expected_status: int):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    statuses = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    # Warm up routing and the limiter entries
+    for i in range(min(requests, clients)):
+        await app(_scope(f"10.0.{i // 256}.{i % 256}"), receive, send)
+
+    durations = []
+    for i in range(requests):
+        scope = _scope(f"10.0.{(i % clients) // 256}.{i % clients % 256}")
+        start = time.perf_counter()
+        await app(scope, receive, send)
+        durations.append(time.perf_counter() - start)
+
+    assert all(code == expected_status for code in statuses[-requests:]), set(statuses)
+    return summarize(durations)
+
+
+def _global_limit(limit: int):
+    """Pin the global per-IP limit instead of reading RATE_LIMIT_GLOBAL_PER_HOUR."""
+    set_rate_limit_policies(compile_rate_limit_policies(ip_config={"global_per_hour": limit}))
+
+
+def run(requests: int = 20000, clients: int = 1000):
+    high = 10**9
+    scenarios = {
+        "no_middleware": (lambda: _create_app(), high, 200),
+        "base_http_middleware": (lambda: BaseHTTPRateLimitMiddleware(_create_app(), InMemoryRateLimiter(), high), high, 200),
+        "asgi_middleware": (lambda: RateLimitMiddleware(_create_app(), limiter=InMemoryRateLimiter()), high, 200),
+        "asgi_middleware_rejected": (lambda: RateLimitMiddleware(_create_app(), limiter=InMemoryRateLimiter()), 0, 429),
+    }
+    results = {}
+    for name, (factory, limit, code) in scenarios.items():
+        _global_limit(limit)
+        results[name] = asyncio.run(_drive(factory(), requests, clients, code))
+    set_rate_limit_policies(None)
+
+    baseline = results["no_middleware"]["mean_ms"]
+    for name in ("base_http_middleware", "asgi_middleware"):
+        results[name]["overhead_ms"] = round(results[name]["mean_ms"] - baseline, 4)
+    results["config"] = {"requests": requests, "clients": clients}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=1000, help="Distinct client IPs")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+    write_results("rate_limit_middleware", run(args.requests, args.clients), args.output)
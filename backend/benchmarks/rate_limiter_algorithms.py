@@ -0,0 +1,97 @@
+"""
+Per-check cost and memory of the rate limiting algorithms.
+
+Compares the previous timestamp-list limiter (every request timestamp kept
+and filtered on each check) with the constant-size sliding-window counter
+and GCRA used by InMemoryRateLimiter. The workload mirrors the global
+per-IP middleware check: a 1000 per hour window, spread over 10k identifiers,
+plus a single hot identifier sitting at its limit.
+
+Usage (from the project root):
+    python -m backend.benchmarks.rate_limiter_algorithms [--identifiers 10000] [--output results.json]
+"""
+import time
+import argparse
+import tracemalloc
+from collections import defaultdict
+from backend.benchmarks.common import summarize, write_results
+from backend.utils.rate_limiter import InMemoryRateLimiter
+
+LIMIT = 1000
+WINDOW = 3600
+
+
+class TimestampListLimiter:
+    """The previous algorithm, kept here for comparison: O(limit) time and memory per window."""
+
+    def __init__(self):
+        self._storage = defaultdict(lambda: defaultdict(list))
+
+    def check_rate_limit(self, identifier, limit, window_seconds, window_name="default", burst=None):
+        current_time = time.time()
+        cutoff = current_time - window_seconds
+        timestamps = [ts for ts in self._storage[identifier][window_name] if ts > cutoff]
+        self._storage[identifier][window_name] = timestamps
+        if len(timestamps) >= limit:
+            retry_after = int((min(timestamps) + window_seconds) - current_time) + 1
+            return False, max(1, retry_after)
+        timestamps.append(current_time)
+        return True, None
+
+
+def _spread(factory, identifiers: int, per_identifier: int, burst=None):
+    """Round-robin requests over many identifiers, returns latencies and retained memory."""
+    def drive(limiter, record):
+        for _ in range(per_identifier):
+            for i in range(identifiers):
+                start = time.perf_counter()
+                limiter.check_rate_limit(f"ip:10.0.{i // 256}.{i % 256}:global", LIMIT, WINDOW, "per_hour", burst)
+                record(time.perf_counter() - start)
+
+    latencies = []
+    drive(factory(), latencies.append)
+
+    # Separate untimed pass so the latency list does not count as limiter memory
+    tracemalloc.start()
+    limiter = factory()
+    drive(limiter, lambda _: None)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {**summarize(latencies), "retained_bytes": retained, "bytes_per_identifier": retained // identifiers}
+
+
+def _hot(limiter, requests: int, burst=None):
+    """A single identifier hammering its window well past the limit."""
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        limiter.check_rate_limit("ip:10.0.0.1:global", LIMIT, WINDOW, "per_hour", burst)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+def run(identifiers: int = 10000, per_identifier: int = 50, hot_requests: int = 5000):
+    algorithms = {
+        "timestamp_list": (TimestampListLimiter, None),
+        "sliding_window_counter": (InMemoryRateLimiter, None),
+        "gcra_burst_100": (InMemoryRateLimiter, 100),
+    }
+    results = {}
+    for name, (factory, burst) in algorithms.items():
+        results[name] = {
+            "spread": _spread(factory, identifiers, per_identifier, burst),
+            "hot_identifier": _hot(factory(), hot_requests, burst),
+        }
+    results["config"] = {"identifiers": identifiers, "per_identifier": per_identifier,
+                         "hot_requests": hot_requests, "limit": LIMIT, "window_seconds": WINDOW}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--identifiers", type=int, default=10000)
+    parser.add_argument("--per-identifier", type=int, default=50)
+    parser.add_argument("--hot-requests", type=int, default=5000)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+    write_results("rate_limiter_algorithms", run(args.identifiers, args.per_identifier, args.hot_requests), args.output)
@@ -0,0 +1,112 @@
+"""
+Rate limiter throughput under contention.
+
+Runs check_multiple_limits (per_minute + per_hour, as for /chat) from several
+threads of one process and, for the shared backend, from several processes
+mapping the same table. The in-memory limiter is run with a single lock and
+with its default lock shards. Each scenario is run with a single hot identifier
+(every caller contends for the same lock) and with requests spread over many
+identifiers. Limits are set high enough that every request is allowed, so
+each call does the full read-modify-write.
+
+Usage (from the project root):
+    python -m backend.benchmarks.rate_limiter_contention [--processes 4] [--threads 8] [--output results.json]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+from threading import Thread
+from backend.benchmarks.common import summarize, write_results
+from backend.utils.rate_limiter import InMemoryRateLimiter, SHARDS
+from backend.utils.shared_rate_limiter import SharedMemoryRateLimiter
+
+LIMITS = {"per_minute": (10**9, 60), "per_hour": (10**9, 3600)}
+
+
+def _run_threads(limiter, threads: int, calls: int, identifiers: int, seed: int = 0):
+    """Drive the limiter from threads, return per-call latencies and wall time."""
+    latencies = [[] for _ in range(threads)]
+
+    def worker(index: int):
+        local = latencies[index]
+        for i in range(calls):
+            identifier = f"user:{(seed + index * calls + i) % identifiers}:chat"
+            start = time.perf_counter()
+            limiter.check_multiple_limits(identifier, LIMITS)
+            local.append(time.perf_counter() - start)
+
+    workers = [Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return [x for chunk in latencies for x in chunk], time.perf_counter() - started
+
+
+def _process_worker(path, groups, threads, calls, identifiers, seed, queue):
+    limiter = SharedMemoryRateLimiter(path, groups)
+    queue.put(_run_threads(limiter, threads, calls, identifiers, seed))
+
+
+def _shared_processes(path, groups, processes, threads, calls, identifiers):
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    workers = [
+        ctx.Process(target=_process_worker, args=(path, groups, threads, calls, identifiers, i * 7919, queue))
+        for i in range(processes)
+    ]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    outputs = [queue.get() for _ in workers]
+    wall = time.perf_counter() - started
+    for w in workers:
+        w.join()
+    return [x for latencies, _ in outputs for x in latencies], wall
+
+
+def _report(latencies, wall):
+    return {**summarize(latencies), "throughput_per_sec": round(len(latencies) / wall, 2)}
+
+
+def run(processes: int = 4, threads: int = 8, calls: int = 5000, identifiers: int = 10000, groups: int = 16384):
+    results = {}
+    path = os.path.join(tempfile.mkdtemp(), "rate-limits")
+    shared = SharedMemoryRateLimiter(path, groups)
+
+    for label, ids in (("hot_key", 1), ("spread", identifiers)):
+        for shards in (1, SHARDS):
+            memory = InMemoryRateLimiter(shards=shards)
+            results[f"memory_{shards}_shards_{threads}_threads_{label}"] = _report(
+                *_run_threads(memory, threads, calls, ids)
+            )
+        shared.reset()
+        results[f"shared_{threads}_threads_{label}"] = _report(*_run_threads(shared, threads, calls, ids))
+        shared.reset()
+        results[f"shared_{processes}x{threads}_procs_{label}"] = _report(
+            *_shared_processes(path, groups, processes, threads, calls // processes, ids)
+        )
+
+    shared.close()
+    os.unlink(path)
+    results["config"] = {"processes": processes, "threads": threads, "calls_per_thread": calls,
+                         "identifiers": identifiers, "groups": groups, "shards": SHARDS,
+                         "cpu_count": os.cpu_count(), "gil_enabled": getattr(sys, "_is_gil_enabled", lambda: True)()}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=5000, help="Calls per thread")
+    parser.add_argument("--identifiers", type=int, default=10000)
+    parser.add_argument("--groups", type=int, default=16384)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+    write_results("rate_limiter_contention",
+                  run(args.processes, args.threads, args.calls, args.identifiers, args.groups), args.output)
@@ -0,0 +1,103 @@
+"""
+HTTP throughput of the production server with 1 vs N workers.
+
+Starts backend/start.py in SERVER_MODE=production once per worker count and
+drives /health with keep-alive connections from concurrent client threads.
+/health skips the rate limiter and touches no external service, so the result
+is the raw request-handling capacity of the server processes.
+
+Usage (from the project root):
+    python -m backend.benchmarks.server_workers [--workers 1 4] [--clients 32] [--output results.json]
+"""
+import os
+import sys
+import time
+import signal
+import argparse
+import subprocess
+import http.client
+from pathlib import Path
+from threading import Lock, Thread
+from backend.benchmarks.common import free_port, summarize, wait_until_ready, write_results
+
+START_SCRIPT = Path(__file__).resolve().parent.parent / "start.py"
+
+
+def _drive(port: int, clients: int, duration: float):
+    latencies = []
+    errors = [0]
+    lock = Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        local, failed = [], 0
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                conn.request("GET", "/health")
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+            except OSError:
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+                continue
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    return {**summarize(latencies), "requests_per_sec": round(len(latencies) / wall, 2), "errors": errors[0]}
+
+
+def run_workers(workers: int, clients: int, duration: float):
+    port = free_port()
+    env = {
+        **os.environ,
+        "SERVER_MODE": "production",
+        "WEB_CONCURRENCY": str(workers),
+        "PRELOAD_MODELS": os.getenv("PRELOAD_MODELS", "false"),
+        "PORT": str(port),
+    }
+    server = subprocess.Popen(
+        [sys.executable, str(START_SCRIPT)], env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(port)
+        _drive(port, clients, 1.0)  # warm-up
+        return _drive(port, clients, duration)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def run(worker_counts, clients: int = 32, duration: float = 10.0):
+    results = {f"workers_{n}": run_workers(n, clients, duration) for n in worker_counts}
+    results["config"] = {"worker_counts": list(worker_counts), "clients": clients,
+                         "duration_seconds": duration, "cpu_count": os.cpu_count()}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+    write_results("server_workers", run(args.workers, args.clients, args.duration), args.output)
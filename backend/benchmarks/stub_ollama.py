@@ -0,0 +1,119 @@
+"""
+Stub Ollama server for offline load tests.
+
+Speaks enough of the Ollama HTTP API for ChatOllama (/api/chat, streamed as
+NDJSON or not) and answers from the deterministic fakes in fixtures.py: JSON
+metadata for the metadata prompt, a short bullet list for the answer prompt.
+Latency is configurable as time to first token plus a token rate, so the stub
+can stand in for a fast GPU host or a slow shared one.
+
+Usage (from the project root):
+    python -m backend.benchmarks.stub_ollama [--port 11434] [--first-token-latency 0.3] [--tokens-per-sec 40]
+"""
+import re
+import ast
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime, timezone
+from typing import List
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from backend.benchmarks.fixtures import fake_answer, fake_metadata_response
+
+_QUERY = re.compile(r'Query: "([^"\n]*)"\s*Answer:\s*$')
+_ANSWER = re.compile(r"Employee Handbook Content:\s*(.*?)\s*Question:\s*(.*?)\s*Answer:\s*$", re.S)
+_TOKEN = re.compile(r"\S+\s*|\s+")
+
+
+def reply_for(messages: List[dict]) -> str:
+    """Model output for a chat request, depending on which of the app's prompts it is."""
+    prompt = messages[-1].get("content", "") if messages else ""
+    match = _QUERY.search(prompt)
+    if match:
+        return fake_metadata_response(match.group(1))
+    match = _ANSWER.search(prompt)
+    if match:
+        try:
+            context = ast.literal_eval(match.group(1))
+        except (ValueError, SyntaxError):
+            context = [match.group(1)]
+        return fake_answer(context if isinstance(context, list) else [str(context)], match.group(2))
+    return "According to the employee handbook, this information is not specified."
+
+
+def create_app(first_token_latency: float = 0.3, tokens_per_sec: float = 40.0) -> Starlette:
+    token_delay = 1.0 / tokens_per_sec if tokens_per_sec > 0 else 0.0
+
+    def _message(model: str, content: str, done: bool, **extra) -> dict:
+        return {
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "message": {"role": "assistant", "content": content},
+            "done": done,
+            **extra,
+        }
+
+    async def chat(request: Request):
+        body = await request.json()
+        model = body.get("model", "stub")
+        messages = body.get("messages", [])
+        tokens = _TOKEN.findall(reply_for(messages))
+        prompt_chars = sum(len(m.get("content", "")) for m in messages)
+        started = time.perf_counter_ns()
+
+        def final() -> dict:
+            elapsed = time.perf_counter_ns() - started
+            return {
+                "done_reason": "stop",
+                "total_duration": elapsed,
+                "load_duration": 0,
+                "prompt_eval_count": prompt_chars // 4,
+                "prompt_eval_duration": int(first_token_latency * 1e9),
+                "eval_count": len(tokens),
+                "eval_duration": max(0, elapsed - int(first_token_latency * 1e9)),
+            }
+
+        if not body.get("stream", True):
+            await asyncio.sleep(first_token_latency + token_delay * len(tokens))
+            return JSONResponse(_message(model, "".join(tokens), True, **final()))
+
+        async def stream():
+            await asyncio.sleep(first_token_latency)
+            for i, token in enumerate(tokens):
+                if i and token_delay:
+                    await asyncio.sleep(token_delay)
+                yield json.dumps(_message(model, token, False)) + "\n"
+            yield json.dumps(_message(model, "", True, **final())) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    async def tags(request: Request):
+        return JSONResponse({"models": [{"name": "stub", "model": "stub"}]})
+
+    async def version(request: Request):
+        return JSONResponse({"version": "0.0.0-stub"})
+
+    async def root(request: Request):
+        return PlainTextResponse("Ollama is running")
+
+    return Starlette(routes=[
+        Route("/", root),
+        Route("/api/chat", chat, methods=["POST"]),
+        Route("/api/tags", tags),
+        Route("/api/version", version),
+    ])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--first-token-latency", type=float, default=0.3, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=40.0, help="Generation speed, 0 for instant")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.first_token_latency, args.tokens_per_sec), host=args.host, port=args.port, log_level="warning")
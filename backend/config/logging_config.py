@@ -1,27 +1,220 @@
+"""
+Logging setup: callers only enqueue records, a background listener formats and writes them.
+Output is JSON lines (LOG_FORMAT=text for the plain format) to stdout and a daily rotated file.
+High-volume info lines can be sampled per logger with LOG_SAMPLE_RATES.
+"""
 import os
-import logging
 import sys
-from datetime import datetime
+import copy
+import json
+import queue
+import atexit
+import random
+import logging
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from threading import Lock
+from typing import Dict, Optional
+from dotenv import load_dotenv
 
-def setup_logging():
+load_dotenv()
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+TEXT_DATEFMT = '%Y-%m-%d %H:%M:%S'
+
+# Attributes every LogRecord has, anything else was passed through extra={...}
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any extra={...} fields included."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of INFO and lower records per logger, e.g. {"backend.routes": 0.1}.
+    The longest matching logger prefix wins. Warnings and errors are never dropped.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved: Dict[str, float] = {}
+        self.dropped = 0
+
+    def _rate_for(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            for prefix in sorted(self.rates, key=len, reverse=True):
+                if name == prefix or name.startswith(prefix + "."):
+                    rate = self.rates[prefix]
+                    break
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        rate = self._rate_for(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Enqueues records without formatting them, the listener thread does that.
+    When the queue is full the record is dropped and counted rather than blocking the caller.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            # Keep the traceback for other handlers, send the listener a rendered copy
+            record = copy.copy(record)
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if record.args:
+            # Merge args now, they may be mutated after the call returns
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Parse "logger=rate,logger=rate" (rates between 0 and 1)."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+_lock = Lock()
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+
+
+def _output_handlers(formatter: logging.Formatter):
     handlers = [logging.StreamHandler(sys.stdout)]  # Console output
-    
+
     # Try to create logs directory and file handler, but don't fail if it's not possible
-    try:
-        logs_dir = os.path.join(os.path.dirname(__file__), '../logs')
-        os.makedirs(logs_dir, exist_ok=True)
-        log_file = os.path.join(logs_dir, f'app_{datetime.now().strftime("%Y%m%d")}.log')
-        handlers.append(
-            logging.FileHandler(filename=log_file, mode='a')
-        )
-    except (OSError, PermissionError) as e:
-        # If we can't create log files, just use console logging
-        print(f"Warning: Could not set up file logging: {e}", flush=True)
-
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.INFO)
+    if os.getenv("LOG_TO_FILE", "true").lower() == "true":
+        try:
+            logs_dir = os.getenv("LOG_DIR") or os.path.join(os.path.dirname(__file__), '../logs')
+            os.makedirs(logs_dir, exist_ok=True)
+            handlers.append(TimedRotatingFileHandler(
+                filename=os.path.join(logs_dir, 'app.log'),
+                when='midnight',
+                backupCount=int(os.getenv("LOG_RETENTION_DAYS", "14")),
+                encoding='utf-8',
+                delay=True,
+            ))
+        except (OSError, PermissionError) as e:
+            # If we can't create log files, just use console logging
+            print(f"Warning: Could not set up file logging: {e}", flush=True)
+
     for handler in handlers:
-        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
-        root_logger.addHandler(handler)
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def setup_logging():
+    """
+    Route all logging through a queue to the output handlers. Calling it again is a no-op.
+    Takes over the root logger: handlers attached earlier (e.g. by basicConfig) are removed,
+    they would write synchronously, bypass sampling and print every line twice.
+    """
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is not None:
+            return
+
+        if os.getenv("LOG_FORMAT", "json").lower() == "text":
+            formatter = logging.Formatter(TEXT_FORMAT, datefmt=TEXT_DATEFMT)
+        else:
+            formatter = JsonFormatter()
+
+        queue_handler = NonBlockingQueueHandler(queue.Queue(int(os.getenv("LOG_QUEUE_SIZE", "10000"))))
+        rates = parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", ""))
+        if rates:
+            queue_handler.addFilter(SamplingFilter(rates))
+
+        listener = QueueListener(queue_handler.queue, *_output_handlers(formatter), respect_handler_level=True)
+        listener.start()
+
+        root_logger = logging.getLogger()
+        for handler in list(root_logger.handlers):
+            root_logger.removeHandler(handler)
+        root_logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        root_logger.addHandler(queue_handler)
+        _listener, _queue_handler = listener, queue_handler
+
+    logging.info("Logging config loaded")
+
+
+def shutdown_logging():
+    """Flush queued records, close the output handlers and detach from the root logger."""
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is None:
+            return
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener, _queue_handler = None, None
+
+
+def _reset_after_fork():
+    """The listener thread does not survive fork, so a forked worker sets up its own."""
+    global _lock, _listener, _queue_handler
+    _lock = Lock()
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+    _listener, _queue_handler = None, None
+
+
+def get_logging_stats() -> Dict[str, int]:
+    """Queue depth and records dropped by a full queue or by sampling."""
+    if _queue_handler is None:
+        return {}
+    sampled = sum(f.dropped for f in _queue_handler.filters if isinstance(f, SamplingFilter))
+    return {
+        "queued": _queue_handler.queue.qsize(),
+        "dropped_queue_full": _queue_handler.dropped,
+        "dropped_sampled": sampled,
+    }
+
 
-    logging.info("Logging config loaded")
\ No newline at end of file
+atexit.register(shutdown_logging)
+os.register_at_fork(after_in_child=_reset_after_fork)
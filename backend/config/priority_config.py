@@ -0,0 +1,37 @@
+"""
+LLM scheduling priorities loaded from environment variables.
+A request's priority is its role weight multiplied by its endpoint weight.
+"""
+import os
+from typing import Dict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def get_priority_config()-> Dict[str,Dict[str,float]]:
+    """
+    Returns priority weights from environment variables
+    Format:{"roles":{role:weight},"endpoints":{endpoint:weight},"aging":{"per_second":weight}}
+    """
+    return{
+        "roles":{
+            "admin":float(os.getenv("LLM_PRIORITY_ROLE_ADMIN","2")),
+            "employee":float(os.getenv("LLM_PRIORITY_ROLE_EMPLOYEE","2")),
+            "intern":float(os.getenv("LLM_PRIORITY_ROLE_INTERN","1")),
+        },
+        "endpoints":{
+            # Only /chat queues for the LLM; ingestion tags chunks without it
+            "chat":float(os.getenv("LLM_PRIORITY_ENDPOINT_CHAT","10")),
+        },
+        "aging":{
+            # Priority gained per second of waiting, prevents starvation of low-priority work
+            "per_second":float(os.getenv("LLM_PRIORITY_AGING_PER_SEC","1")),
+        }
+    }
+
+def get_request_priority(role:str,endpoint:str)->float:
+    """Priority of a request for the given role and endpoint, unknown values get the lowest weight."""
+    config=get_priority_config()
+    role_weight=config["roles"].get(role,min(config["roles"].values()))
+    endpoint_weight=config["endpoints"].get(endpoint,min(config["endpoints"].values()))
+    return role_weight*endpoint_weight
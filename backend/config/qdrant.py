@@ -1,5 +1,5 @@
 from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams,Distance,HnswConfigDiff,PayloadSchemaType
+from qdrant_client.models import VectorParams,Distance,HnswConfigDiff,PayloadSchemaType,ScalarQuantization,ScalarQuantizationConfig,ScalarType
 import os
 from dotenv import load_dotenv
 import logging
@@ -24,16 +24,21 @@ def get_qdrant_client():
     try:
         qdrant_url = os.getenv('QDRANT_URL')
         qdrant_api_key = os.getenv('QDRANT_API_KEY')
+        # Local mode (no server): a directory, or ":memory:" for a throwaway in-process collection
+        qdrant_path = os.getenv('QDRANT_PATH')
         
-        if not qdrant_url:
+        if qdrant_path:
+            _client = QdrantClient(location=":memory:") if qdrant_path == ":memory:" else QdrantClient(path=qdrant_path)
+            logger.info(f"Using local Qdrant at {qdrant_path}")
+        elif not qdrant_url:
             logger.warning("QDRANT_URL environment variable not set")
             return None
-        
-        _client = QdrantClient(
-            url=qdrant_url, 
-            api_key=qdrant_api_key,
-        )
-        logger.info("Connected to Qdrant successfully")
+        else:
+            _client = QdrantClient(
+                url=qdrant_url, 
+                api_key=qdrant_api_key,
+            )
+            logger.info("Connected to Qdrant successfully")
         
         # Initialize collection if needed
         COLLECTION_NAME = os.getenv('QDRANT_COLLECTION')
@@ -50,17 +55,24 @@ def _initialize_collection(collection_name: str):
     """Initialize Qdrant collection and indices if they don't exist."""
     try:
         if collection_name not in [col.name for col in _client.get_collections().collections]:
+            quantization_config=None
+            if os.getenv("QDRANT_SCALAR_QUANTIZATION","false").lower()=="true":
+                #int8 vectors kept in RAM, original vectors used for rescoring
+                quantization_config=ScalarQuantization(
+                    scalar=ScalarQuantizationConfig(type=ScalarType.INT8,always_ram=True)
+                )
             _client.create_collection(
                 collection_name=collection_name,  
                 vectors_config=VectorParams(
-                    size=1024,                    #Vector dimension
+                    size=int(os.getenv("QDRANT_VECTOR_SIZE","1024")),  #Vector dimension, must match the embedding model
                     distance=Distance.COSINE      #distance metric
                 ),
                 hnsw_config=HnswConfigDiff(
-                    m=16,                         #Number of edges per node
-                    ef_construct=200,             #number of neighbors during idex construction-affects accuracy and speed
+                    m=int(os.getenv("QDRANT_HNSW_M","16")),                           #Number of edges per node
+                    ef_construct=int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT","200")),    #number of neighbors during idex construction-affects accuracy and speed
                     full_scan_threshold=1000      #threshold to full sacn below this size
-                )
+                ),
+                quantization_config=quantization_config
             )
             logger.info(f"Created Qdrant collection: {collection_name}")
 
@@ -1,50 +1,236 @@
 """
 Rate limiting configuration loaded from environment variables.
-All limits are configurable per role and endpoint
+All limits are configurable per role and endpoint.
+Requests read them from a compiled policy table that is swapped on reload
+(SIGHUP or POST /admin/rate-limits/reload) instead of re-reading the environment.
 """
 import os
-from typing import Dict
-from dotenv import load_dotenv
+import time
+import signal
+import logging
+import threading
+from threading import RLock
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from dotenv import dotenv_values, load_dotenv
+from backend.utils.rate_limiter import WindowSpec
 
+logger = logging.getLogger(__name__)
 load_dotenv()
 
-def get_rate_limit_config()-> Dict[str,Dict[str,int]]:
+def get_rate_limit_config(env:Optional[Mapping[str,str]]=None)-> Dict[str,Dict[str,int]]:
     """
-    Returns rate limit configuration from environment variables
+    Returns rate limit configuration from environment variables (or the given mapping)
     Format:{role:{endpoint:{period:limit}}}
+    "burst" lets up to that many chat requests through at once while keeping
+    the per_minute average (GCRA), 0 keeps the plain sliding window
     """
+    env=os.environ if env is None else env
     return{
         "admin":{
             "chat":{
-                "per_minute":int(os.getenv("RATE_LIMIT_CHAT_PER_MIN_ADMIN","20")),
-                "per_hour":int(os.getenv("RATE_LIMIT_CHAT_PER_HOUR_ADMIN","100")),
+                "per_minute":int(env.get("RATE_LIMIT_CHAT_PER_MIN_ADMIN","20")),
+                "per_hour":int(env.get("RATE_LIMIT_CHAT_PER_HOUR_ADMIN","100")),
+                "burst":int(env.get("RATE_LIMIT_CHAT_BURST_ADMIN","0")),
             },
             "upload":{
-                "per_hour":int(os.getenv("RATE_LIMIT_UPLOAD_PER_HOUR_ADMIN","5")),
-                "per_day":int(os.getenv("RATE_LIMIT_UPLOAD_PER_DAY_ADMIN","20")),
+                "per_hour":int(env.get("RATE_LIMIT_UPLOAD_PER_HOUR_ADMIN","5")),
+                "per_day":int(env.get("RATE_LIMIT_UPLOAD_PER_DAY_ADMIN","20")),
             }
         },
         "employee":{
             "chat":{
-                "per_minute":int(os.getenv("RATE_LIMIT_CHAT_PER_MIN_EMPLOYEE","10")),
-                "per_hour":int(os.getenv("RATE_LIMIT_CHAT_PER_HOUR_EMPLOYEE","50")),
+                "per_minute":int(env.get("RATE_LIMIT_CHAT_PER_MIN_EMPLOYEE","10")),
+                "per_hour":int(env.get("RATE_LIMIT_CHAT_PER_HOUR_EMPLOYEE","50")),
+                "burst":int(env.get("RATE_LIMIT_CHAT_BURST_EMPLOYEE","0")),
             }
         },
         "intern":{
             "chat":{
-                "per_minute":int(os.getenv("RATE_LIMIT_CHAT_PER_MIN_INTERN","50")),
-                "per_hour":int(os.getenv("RATE_LIMIT_CHAT_PER_HOUR_INTERN","30")), 
+                "per_minute":int(env.get("RATE_LIMIT_CHAT_PER_MIN_INTERN","50")),
+                "per_hour":int(env.get("RATE_LIMIT_CHAT_PER_HOUR_INTERN","30")), 
+                "burst":int(env.get("RATE_LIMIT_CHAT_BURST_INTERN","0")),
             }
         }
     }
 
-def get_ip_rate_limit_config()-> Dict[str,int]:
+def get_ip_rate_limit_config(env:Optional[Mapping[str,str]]=None)-> Dict[str,int]:
     """
     Returns IP-based rate limit configuration
     Used for login endpoint and global protection
     """
+    env=os.environ if env is None else env
     return{
-        "login_per_15min":int(os.getenv("RATE_LIMIT_LOGIN_PER_15MIN","50")),
-        "login_per_hour":int(os.getenv("RATE_LIMIT_LOGIN_PER_HOUR","100")),
-        "global_per_hour":int(os.getenv("RATE_LIMIT_GLOBAL_PER_HOUR","1000")),
-    }
\ No newline at end of file
+        "login_per_15min":int(env.get("RATE_LIMIT_LOGIN_PER_15MIN","50")),
+        "login_per_hour":int(env.get("RATE_LIMIT_LOGIN_PER_HOUR","100")),
+        "global_per_hour":int(env.get("RATE_LIMIT_GLOBAL_PER_HOUR","1000")),
+    }
+
+# Window name -> length in seconds, for the periods used in the configs above
+WINDOW_SECONDS={"per_minute":60,"per_15min":900,"per_hour":3600,"per_day":86400}
+# Roles missing from the config are limited like this role
+DEFAULT_ROLE="intern"
+# Role under which the IP-based limits are stored in the policy table
+IP_ROLE="ip"
+
+_NO_LIMITS:Mapping[str,WindowSpec]=MappingProxyType({})
+
+
+class RateLimitPolicies:
+    """
+    Rate limits compiled into an immutable (role, endpoint) -> {window_name: (limit, window_seconds[, burst])} table.
+    Built once and replaced as a whole on reload, so a request always sees one consistent version.
+    """
+
+    def __init__(self,table:Dict[Tuple[str,str],Dict[str,WindowSpec]],version:int=1):
+        self._table:Mapping[Tuple[str,str],Mapping[str,WindowSpec]]=MappingProxyType(
+            {key:MappingProxyType(dict(windows)) for key,windows in table.items()}
+        )
+        self.roles=frozenset(role for role,_ in table if role!=IP_ROLE)
+        self.version=version
+        self.compiled_at=time.time()
+
+    def lookup(self,role:str,endpoint:str)->Mapping[str,WindowSpec]:
+        """Windows for a role and endpoint, empty when the endpoint is not limited for that role."""
+        if role not in self.roles:
+            role=DEFAULT_ROLE
+        return self._table.get((role,endpoint),_NO_LIMITS)
+
+    def lookup_ip(self,endpoint:str)->Mapping[str,WindowSpec]:
+        return self._table.get((IP_ROLE,endpoint),_NO_LIMITS)
+
+    def as_dict(self)->Dict[str,Any]:
+        return {
+            "version":self.version,
+            "compiled_at":self.compiled_at,
+            "policies":{f"{role}:{endpoint}":{name:list(spec) for name,spec in windows.items()}
+                        for (role,endpoint),windows in self._table.items()},
+        }
+
+
+def _compile_windows(key:str,endpoint_config:Dict[str,int],errors:List[str])->Dict[str,WindowSpec]:
+    unknown=set(endpoint_config)-set(WINDOW_SECONDS)-{"burst"}
+    if unknown:
+        errors.append(f"{key}: unknown window(s) {', '.join(sorted(unknown))}")
+    for name,value in endpoint_config.items():
+        if not isinstance(value,int) or value<0:
+            errors.append(f"{key}: {name} must be a non-negative integer, got {value!r}")
+    burst=endpoint_config.get("burst",0)
+    if burst and "per_minute" not in endpoint_config:
+        errors.append(f"{key}: burst needs a per_minute limit")
+
+    windows={}
+    for name,seconds in WINDOW_SECONDS.items():
+        if name in endpoint_config:
+            # Burst (GCRA) applies to the per_minute window only
+            windows[name]=(endpoint_config[name],seconds,burst) if burst and name=="per_minute" else (endpoint_config[name],seconds)
+    return windows
+
+
+def compile_rate_limit_policies(
+    config:Optional[Dict[str,Dict[str,Dict[str,int]]]]=None,
+    ip_config:Optional[Dict[str,int]]=None,
+    version:int=1,
+)->RateLimitPolicies:
+    """
+    Validate the rate limit configuration and compile it into a RateLimitPolicies table.
+    Reads the environment when no config is given. Raises ValueError listing every problem found.
+    """
+    try:
+        config=get_rate_limit_config() if config is None else config
+        ip_config=get_ip_rate_limit_config() if ip_config is None else ip_config
+    except ValueError as e:
+        raise ValueError(f"Invalid rate limit configuration: {e}")
+
+    errors:List[str]=[]
+    table={}
+    for role,endpoints in config.items():
+        for endpoint,endpoint_config in endpoints.items():
+            table[(role,endpoint)]=_compile_windows(f"{role}.{endpoint}",endpoint_config,errors)
+    if DEFAULT_ROLE not in config:
+        errors.append(f"default role '{DEFAULT_ROLE}' is not configured")
+
+    # "login_per_15min" -> endpoint "login", window "per_15min"
+    ip_endpoints:Dict[str,Dict[str,int]]={}
+    for name,value in ip_config.items():
+        endpoint,_,period=name.partition("_per_")
+        if not period:
+            errors.append(f"{IP_ROLE}.{name}: expected <endpoint>_per_<period>")
+            continue
+        ip_endpoints.setdefault(endpoint,{})[f"per_{period}"]=value
+    for endpoint,endpoint_config in ip_endpoints.items():
+        table[(IP_ROLE,endpoint)]=_compile_windows(f"{IP_ROLE}.{endpoint}",endpoint_config,errors)
+
+    if errors:
+        raise ValueError("Invalid rate limit configuration: "+"; ".join(errors))
+
+    for (role,endpoint),windows in table.items():
+        if "per_minute" in windows and "per_hour" in windows and windows["per_hour"][0]<windows["per_minute"][0]:
+            logger.warning(f"Rate limit {role}.{endpoint}: per_hour ({windows['per_hour'][0]}) is below "
+                           f"per_minute ({windows['per_minute'][0]})")
+    return RateLimitPolicies(table,version)
+
+
+_policies:Optional[RateLimitPolicies]=None
+# Re-entrant: the SIGHUP handler may run on the main thread while it holds the lock
+_reload_lock=RLock()
+
+
+def get_rate_limit_policies()->RateLimitPolicies:
+    """Current compiled policy table, compiled from the environment on first use."""
+    global _policies
+    if _policies is None:
+        with _reload_lock:
+            if _policies is None:
+                _policies=compile_rate_limit_policies()
+    return _policies
+
+
+def set_rate_limit_policies(policies:Optional[RateLimitPolicies]):
+    """Install a compiled policy table, None recompiles from the environment on next use."""
+    global _policies
+    _policies=policies
+
+
+def _reload_environment()->Dict[str,str]:
+    """
+    The process environment with the RATE_LIMIT_* values of .env on top, since .env is the
+    only source that can change at runtime. Nothing is written back to os.environ.
+    """
+    file_values={key:value for key,value in dotenv_values().items() if key.startswith("RATE_LIMIT_") and value is not None}
+    return {**os.environ,**file_values}
+
+
+def reload_rate_limit_policies()->RateLimitPolicies:
+    """
+    Recompile the policies and swap them in. RATE_LIMIT_* values in .env take precedence
+    over the process environment here, other settings are left alone.
+    On a validation error the current table stays active and ValueError is raised.
+    """
+    global _policies
+    with _reload_lock:
+        env=_reload_environment()
+        try:
+            config,ip_config=get_rate_limit_config(env),get_ip_rate_limit_config(env)
+        except ValueError as e:
+            raise ValueError(f"Invalid rate limit configuration: {e}")
+        current=_policies
+        policies=compile_rate_limit_policies(config,ip_config,version=(current.version+1) if current else 1)
+        _policies=policies
+    logger.info(f"Rate limit policies reloaded (version {policies.version})")
+    return policies
+
+
+def install_reload_signal_handler()->bool:
+    """Reload the policies on SIGHUP. Only possible from the main thread on platforms with SIGHUP."""
+    if not hasattr(signal,"SIGHUP") or threading.current_thread() is not threading.main_thread():
+        return False
+
+    def _reload(signum,frame):
+        try:
+            reload_rate_limit_policies()
+        except ValueError as e:
+            logger.error(f"Rate limit reload rejected, keeping version {get_rate_limit_policies().version}: {e}")
+
+    signal.signal(signal.SIGHUP,_reload)
+    return True
@@ -0,0 +1,59 @@
+"""
+Qdrant search profiles loaded from environment variables.
+Each profile trades recall for latency through the per-request SearchParams.
+"""
+import os
+from typing import Dict
+from dotenv import load_dotenv
+from qdrant_client.models import SearchParams, QuantizationSearchParams
+
+load_dotenv()
+
+DEFAULT_SEARCH_PROFILE=os.getenv("QDRANT_SEARCH_PROFILE","balanced")
+
+def get_search_profiles()-> Dict[str,SearchParams]:
+    """
+    Returns the available search profiles
+    Format:{profile_name:SearchParams}
+    """
+    return{
+        # Small candidate list, quantized scores are used as-is
+        "fast":SearchParams(
+            hnsw_ef=int(os.getenv("QDRANT_HNSW_EF_FAST","32")),
+            quantization=QuantizationSearchParams(rescore=False),
+        ),
+        # Wider candidate list, oversampled quantized candidates rescored with original vectors
+        "balanced":SearchParams(
+            hnsw_ef=int(os.getenv("QDRANT_HNSW_EF_BALANCED","128")),
+            quantization=QuantizationSearchParams(
+                rescore=True,
+                oversampling=float(os.getenv("QDRANT_OVERSAMPLING_BALANCED","2.0")),
+            ),
+        ),
+        # Full scan on original vectors, for recall checks and debugging
+        "exact":SearchParams(
+            exact=True,
+            quantization=QuantizationSearchParams(ignore=True),
+        ),
+    }
+
+def get_search_params(profile:str=None)->SearchParams:
+    """
+    Returns SearchParams for a profile name, defaults to QDRANT_SEARCH_PROFILE.
+    Raises ValueError for unknown profiles.
+    """
+    profiles=get_search_profiles()
+    name=profile or DEFAULT_SEARCH_PROFILE
+    if name not in profiles:
+        raise ValueError(f"Unknown search profile '{name}'. Available profiles: {', '.join(profiles)}")
+    return profiles[name]
+
+def validate_search_config():
+    """
+    Check QDRANT_SEARCH_PROFILE and the profile settings, called at startup so a typo
+    fails the deploy instead of every /chat request. Raises ValueError.
+    """
+    try:
+        get_search_params()
+    except ValueError as e:
+        raise ValueError(f"Invalid search configuration: {e}")
@@ -2,10 +2,14 @@ import os
 from fastapi import FastAPI
 from backend.routes.handbook_routes import router
 from backend.routes.auth_routes import router as auth_router
+from backend.routes.admin_routes import router as admin_router
 from starlette.middleware.cors import CORSMiddleware
 from backend.middleware.rate_limit_middleware import RateLimitMiddleware
+from backend.middleware.server_timing_middleware import ServerTimingMiddleware
 import logging
-from backend.config.logging_config import setup_logging
+from backend.config.logging_config import setup_logging,shutdown_logging
+from backend.config.rate_limit_config import get_rate_limit_policies,install_reload_signal_handler
+from backend.config.search_config import validate_search_config
 from contextlib import asynccontextmanager
 
 @asynccontextmanager
@@ -14,15 +18,22 @@ async def lifespan(app: FastAPI):
     setup_logging()
     logger = logging.getLogger(__name__)
     logger.info("Starting Employee Handbook Chatbot")
+    # Fail fast on an invalid search or rate limit configuration, then allow retuning the limits with SIGHUP
+    validate_search_config()
+    get_rate_limit_policies()
+    install_reload_signal_handler()
 
     yield
 
     #Shutdown logic 
     logger.info("Shutting down Employee Handbook Chatbot")
+    shutdown_logging()
 
 app = FastAPI(title="Employee Handbook Bot",lifespan=lifespan)
 
 app.add_middleware(RateLimitMiddleware)
+# Added after the rate limiter so it wraps it and times the global check too
+app.add_middleware(ServerTimingMiddleware)
 
 # Get frontend URL from environment 
 frontend_url = os.getenv("FRONTEND_URL", "*")
@@ -37,4 +48,5 @@ app.add_middleware(
 )
 app.include_router(router)
 app.include_router(auth_router)
+app.include_router(admin_router)
 
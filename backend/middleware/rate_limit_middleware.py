@@ -1,51 +1,74 @@
 """
 IP-based rate limiting middleware for global protection.
 Applies a per-IP hourly limit to all requests.
+
+Implemented as a plain ASGI middleware rather than on BaseHTTPMiddleware: allowed
+requests are handed to the app with the original receive/send, so responses
+(including streaming ones) pass through untouched and no extra task or body
+stream is created per request. Rejected requests get a prebuilt 429 response.
 """
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
-from fastapi import HTTPException, status
-from backend.config.rate_limit_config import get_ip_rate_limit_config
-from backend.utils.rate_limiter import get_rate_limiter
+import json
 import logging
+from typing import Iterable, Optional
+from starlette.types import ASGIApp, Receive, Scope, Send
+from backend.config.rate_limit_config import get_rate_limit_policies
+from backend.utils.rate_limiter import RateLimiter, get_rate_limiter, parse_window
+from backend.utils.metrics import RATE_LIMIT_REJECTIONS, time_stage
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_EXCLUDE_PATHS = ("/health", "/", "/docs", "/openapi.json", "/redoc", "/metrics")
+
+_TOO_MANY_REQUESTS_BODY = json.dumps({"detail": "Too many requests. Please try again later."}).encode("utf-8")
+_TOO_MANY_REQUESTS_HEADERS = [
+    (b"content-type", b"application/json"),
+    (b"content-length", str(len(_TOO_MANY_REQUESTS_BODY)).encode("latin-1")),
+]
+
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+class RateLimitMiddleware:
     """
     Middleware that applies global IP-based rate limiting.
     Excludes health check and root endpoints from rate limiting.
     """
 
-    def __init__(self, app, limiter=None, exclude_paths: list = None):
-        super().__init__(app)
-        self.exclude_paths = exclude_paths or ["/health", "/", "/docs", "/openapi.json", "/redoc"]
-        self.config = get_ip_rate_limit_config()
+    def __init__(self, app: ASGIApp, limiter: Optional[RateLimiter] = None, exclude_paths: Iterable[str] = None):
+        self.app = app
+        self.exclude_paths = frozenset(exclude_paths or DEFAULT_EXCLUDE_PATHS)
         self.limiter = limiter or get_rate_limiter()
 
-    async def dispatch(self, request: Request, call_next):
-        # Skip rate limiting for excluded paths
-        if request.url.path in self.exclude_paths:
-            return await call_next(request)
-
-        client_ip = request.client.host if request.client else "unknown"
-        identifier = f"ip:{client_ip}:global"
-
-        # Check global hourly limit
-        limit = self.config.get("global_per_hour", 1000)
-        allowed, retry_after = self.limiter.check_rate_limit(
-            identifier, limit, 3600, "per_hour"
-        )
-
-        if not allowed:
-            logger.info(f"Global rate limit exceeded for IP: {client_ip}")
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Too many requests. Please try again later.",
-                headers={"Retry-After": str(retry_after) if retry_after else "3600"},
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # Lifespan and websocket scopes, and excluded paths, are not rate limited
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        # Check global hourly limit (RATE_LIMIT_GLOBAL_PER_HOUR)
+        window = get_rate_limit_policies().lookup_ip("global").get("per_hour")
+        if window is None:
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        limit, window_seconds, burst = parse_window(window)
+        with time_stage("request", "rate_limit_global"):
+            allowed, retry_after = self.limiter.check_rate_limit(
+                f"ip:{client_ip}:global", limit, window_seconds, "per_hour", burst
             )
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+
+        RATE_LIMIT_REJECTIONS.labels("global", "per_hour").inc()
+        logger.info(f"Global rate limit exceeded for IP: {client_ip}")
+        await self._reject(send, retry_after or window_seconds)
 
-        response = await call_next(request)
-        return response
\ No newline at end of file
+    @staticmethod
+    async def _reject(send: Send, retry_after: int):
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [*_TOO_MANY_REQUESTS_HEADERS, (b"retry-after", str(retry_after).encode("latin-1"))],
+        })
+        await send({"type": "http.response.body", "body": _TOO_MANY_REQUESTS_BODY})
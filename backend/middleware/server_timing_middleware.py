@@ -0,0 +1,32 @@
+"""
+Adds a Server-Timing header with the per-stage durations of each request.
+Plain ASGI, like RateLimitMiddleware, so streaming responses are not buffered.
+"""
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from backend.utils.request_timing import end_request_timings, start_request_timings
+
+
+class ServerTimingMiddleware:
+    """Starts the request timings and reports them when the response starts."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings, token = start_request_timings()
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            end_request_timings(token)
@@ -0,0 +1,67 @@
+from fastapi import APIRouter,Depends,HTTPException,status
+from backend.auth.dependencies import require_admin
+from backend.utils.llm_pool import get_llm_pool
+from backend.utils.admission import get_admission_controller
+from backend.utils.embeddings import get_query_cache,get_embedding_batcher
+from backend.utils.rate_limiter import get_rate_limiter
+from backend.auth.jwt_handler import get_token_cache
+from backend.config.rate_limit_config import get_rate_limit_policies,reload_rate_limit_policies
+from backend.config.logging_config import get_logging_stats
+from backend.utils.slow_requests import get_slow_request_log
+from backend.utils.profiling import list_profiles,get_profile_path,unavailable_profiles
+from fastapi.responses import FileResponse
+import logging
+
+logger = logging.getLogger(__name__)
+
+router=APIRouter(prefix="/admin")
+
+#Runtime statistics
+@router.get("/stats")
+def runtime_stats(current_user:dict=Depends(require_admin)):
+    logger.info("Runtime stats requested")
+    return {
+        "llm_backends":get_llm_pool().stats(),
+        "admission":get_admission_controller().stats(),
+        "embedding_cache":get_query_cache().stats(),
+        "embedding_batcher":get_embedding_batcher().stats(),
+        "rate_limiter":get_rate_limiter().stats(),
+        "token_cache":get_token_cache().stats(),
+        "logging":get_logging_stats(),
+        "slow_requests":get_slow_request_log().stats(),
+    }
+
+#Slowest recent /chat requests
+@router.get("/slow-requests")
+def slow_requests(limit:int=10,current_user:dict=Depends(require_admin)):
+    log=get_slow_request_log()
+    return {**log.stats(),"requests":log.worst(max(limit,1))}
+
+#Rate limit policies
+@router.get("/rate-limits")
+def rate_limit_policies(current_user:dict=Depends(require_admin)):
+    return get_rate_limit_policies().as_dict()
+
+@router.post("/rate-limits/reload")
+def reload_rate_limits(current_user:dict=Depends(require_admin)):
+    """Recompile the rate limits from the environment / .env and swap them in (this worker only)."""
+    try:
+        policies=reload_rate_limit_policies()
+    except ValueError as e:
+        logger.error(f"Rate limit reload rejected: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail=str(e))
+    logger.info(f"Rate limits reloaded by {current_user.get('user_id')}")
+    return policies.as_dict()
+
+#Saved request profiles (PROFILING_ENABLED)
+@router.get("/profiles")
+def profiles(current_user:dict=Depends(require_admin)):
+    return {"profiles":list_profiles(),"unavailable":unavailable_profiles()}
+
+@router.get("/profiles/{name}")
+def download_profile(name:str,current_user:dict=Depends(require_admin)):
+    path=get_profile_path(name)
+    if path is None:
+        reason=unavailable_profiles().get(name)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail=f"Profile not available, {reason}" if reason else "Profile not found")
+    return FileResponse(path,media_type="application/octet-stream",filename=name)
@@ -4,7 +4,6 @@ from fastapi import APIRouter,HTTPException,status,Depends,Request
 from fastapi.security import OAuth2PasswordRequestForm
 from backend.auth.jwt_handler import create_access_token
 from backend.auth.dependencies import rate_limit_ip
-from backend.config.rate_limit_config import get_ip_rate_limit_config
 
 router=APIRouter()
 
@@ -15,8 +14,7 @@ MOCK_USERS: Dict[str, Dict[str,str]]={
     "intern":{"password":"intern123","role":"intern","department":"Finance"}
 }
 
-_ip_config=get_ip_rate_limit_config()
-_login_rate_limit=rate_limit_ip("login",_ip_config["login_per_15min"],_ip_config["login_per_15min"])
+_login_rate_limit=rate_limit_ip("login")
 
 @router.post("/login")
 async def login(form_data: OAuth2PasswordRequestForm=Depends(),_:None=Depends(_login_rate_limit)):
@@ -1,7 +1,19 @@
-from fastapi import APIRouter,UploadFile,File,BackgroundTasks,HTTPException,status,Depends
+from fastapi import APIRouter,UploadFile,File,BackgroundTasks,HTTPException,status,Depends,Request
 from backend.services.handbook_services import process_handbook,get_result
 from backend.auth.dependencies import rate_limit_user
 from backend.models.handbook_model import HandbookQuery  
+from backend.utils.admission import get_admission_controller,AdmissionRejectedError
+from backend.config.priority_config import get_request_priority
+from backend.config.search_config import get_search_profiles
+from backend.utils.metrics import CONTENT_TYPE,render_metrics
+from backend.utils.request_timing import current_timings
+from backend.utils.slow_requests import get_slow_request_log
+from backend.utils.profiling import RequestProfiler,profiling_requested,ARTIFACT_HEADER
+from contextlib import nullcontext
+from fastapi.responses import Response
+from typing import Optional
+import os
+import hmac
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,9 +36,22 @@ def health_check():
     }
 
 
+#Prometheus metrics, not rate limited: only served with METRICS_TOKEN set, to scrapers sending it as a bearer token
+@router.get("/metrics",include_in_schema=False)
+def metrics(request:Request):
+    token=os.getenv("METRICS_TOKEN","")
+    if not token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail="Not Found")
+    if not hmac.compare_digest(request.headers.get("Authorization","").encode(),f"Bearer {token}".encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="Invalid metrics token",headers={"WWW-Authenticate":"Bearer"})
+    return Response(content=render_metrics(),media_type=CONTENT_TYPE)
+
+
 #Upload Handbook PDF 
 @router.post("/upload-handbook")
 async def upload_handbook(
+    request: Request,
+    response: Response,
     file: UploadFile = File(...),
     background_tasks: BackgroundTasks=None,
     current_user:dict=Depends(rate_limit_user("upload")),):
@@ -42,7 +67,14 @@ async def upload_handbook(
             logger.error("Invalid file format")
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail="Please upload a PDF File")
         
-        background_tasks.add_task(process_handbook,file)
+        if profiling_requested(request,current_user):
+            # Ingestion runs after the response, profile the background task
+            profiler=RequestProfiler("upload")
+            background_tasks.add_task(profiler.run,process_handbook,file)
+            # Not written yet: /admin/profiles reports it as unavailable until it is, or why it never was
+            response.headers[ARTIFACT_HEADER]=profiler.announce()
+        else:
+            background_tasks.add_task(process_handbook,file)
         logger.info(f"Background task started for file:{file.filename}")
     
         return {"status":"Handbook uploaded and processing started."}
@@ -55,7 +87,7 @@ async def upload_handbook(
 
 #Query
 @router.post("/chat")
-async def handbook_query(query:HandbookQuery, limit:int=5,current_user:dict=Depends(rate_limit_user("chat"))):
+async def handbook_query(query:HandbookQuery, request:Request, response:Response, limit:int=5,search_profile:Optional[str]=None,include_timings:bool=False,current_user:dict=Depends(rate_limit_user("chat"))):
     try:
         if current_user.get("role") not in {"admin", "employee", "intern"}:
             raise HTTPException(
@@ -67,14 +99,51 @@ async def handbook_query(query:HandbookQuery, limit:int=5,current_user:dict=Depe
             logger.error("Query is empty")
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail="Question is empty")
         
+        if search_profile is not None:
+            if current_user.get("role") != "admin":
+                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,detail="Only admins can choose a search profile")
+            if search_profile not in get_search_profiles():
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail=f"Unknown search profile '{search_profile}'")
+
         if limit<=0 or limit>10:
             logger.warning(f"Invalid limit value {limit}, chaning it to 5")
             limit=5
         
         logger.info("Query recieved")
-        search_result=await get_result(query.question,limit)
+        profiler=RequestProfiler("chat",response) if profiling_requested(request,current_user) else nullcontext()
+        timings=current_timings()
+        outcome="ok"
+        try:
+            priority=get_request_priority(current_user.get("role"),"chat")
+            with profiler:
+                async with get_admission_controller().admit(priority):
+                    search_result=await get_result(query.question,limit,search_profile)
+        except AdmissionRejectedError as e:
+            outcome=f"shed:{e.reason}"
+            logger.warning(f"Chat request shed by admission control: {e.reason}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The assistant is busy right now. Please try again shortly.",
+                headers={"Retry-After":str(e.retry_after)},
+            )
+        except Exception:
+            outcome="error"
+            raise
+        finally:
+            if timings is not None:
+                entry=get_slow_request_log().record_if_slow(
+                    timings,query.question,role=current_user.get("role"),limit=limit,
+                    search_profile=search_profile,outcome=outcome,
+                )
+                if entry:
+                    logger.warning(f"Slow chat request: {entry['duration_ms']} ms ({entry['question_hash']})")
         logger.info("Query processed sucessfully")
-    
+
+        if include_timings and timings is not None:
+            # Debug view of the Server-Timing header, in milliseconds
+            if isinstance(search_result,dict):
+                return {**search_result,"timings":timings.as_dict()}
+            return {"answer":search_result,"timings":timings.as_dict()}
         return search_result
     except HTTPException:
         raise
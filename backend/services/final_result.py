@@ -1,5 +1,7 @@
 from fastapi import HTTPException
 from backend.utils.llm_setup import set_llm 
+from backend.utils.llm_pool import get_llm_pool,NoBackendAvailableError
+from backend.utils.metrics import LLM_ERRORS
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 import logging
@@ -81,19 +83,24 @@ Answer:
 """)
 ])
 
-_answer_chain = None
+# Rough size of the prompt in tokens, ~4 characters per token for English text
+CHARS_PER_TOKEN = 4
+_PROMPT_TEMPLATE_CHARS = sum(len(message.prompt.template) for message in rag_prompt.messages)
 
-def get_answer_chain():
-    """Lazy-load the answer chain to prevent startup failures."""
-    global _answer_chain
-    if _answer_chain is None:
+_answer_chains = {}
+
+def get_answer_chain(base_url: str = None):
+    """Lazy-load the answer chain for an Ollama backend to prevent startup failures."""
+    chain = _answer_chains.get(base_url)
+    if chain is None:
         try:
-            llm = set_llm("answer")
-            _answer_chain = rag_prompt | llm | StrOutputParser()
+            llm = set_llm("answer", base_url)
+            chain = rag_prompt | llm | StrOutputParser()
+            _answer_chains[base_url] = chain
         except Exception as e:
             logger.error(f"Failed to initialize answer chain: {e}")
             raise
-    return _answer_chain
+    return chain
 
 def extract_context(query_result):
     if not isinstance(query_result, dict) or "results" not in query_result:
@@ -107,6 +114,11 @@ def extract_context(query_result):
 
     return context
 
+def estimate_prompt_tokens(context, question: str) -> int:
+    """Approximate token count of the answer prompt, without running a tokenizer."""
+    chars = _PROMPT_TEMPLATE_CHARS + sum(len(text) for text in context) + len(question)
+    return chars // CHARS_PER_TOKEN
+
 def clean_output(text:str)->str:
     lines=text.splitlines()
     cleaned=[]
@@ -119,12 +131,19 @@ def clean_output(text:str)->str:
 def answer_chain_invoke(context, question):
     """Wrapper to use the lazy-loaded answer chain."""
     try:
-        chain = get_answer_chain()
-        return chain.invoke({"context": context, "question": question})
+        with get_llm_pool().acquire() as backend:
+            chain = get_answer_chain(backend.base_url)
+            return chain.invoke({"context": context, "question": question})
+    except NoBackendAvailableError as e:
+        LLM_ERRORS.labels("answer", "no_backend").inc()
+        logger.error(f"No Ollama backend available for answer generation: {e}")
+        return "According to the employee handbook, the service is temporarily unavailable. Please try again later or contact support."
     except Exception as e:
         error_msg = str(e).lower()
         if "unauthorized" in error_msg or "401" in error_msg:
+            LLM_ERRORS.labels("answer", "auth").inc()
             logger.error(f"Ollama API authentication failed: {e}. Check OLLAMA_API_KEY environment variable.")
             return "According to the employee handbook, the service is temporarily unavailable. Please try again later or contact support."
+        LLM_ERRORS.labels("answer", "error").inc()
         logger.error(f"Error generating answer: {e}")
         raise
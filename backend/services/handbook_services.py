@@ -2,13 +2,17 @@ import os
 import uuid
 from dotenv import load_dotenv
 from fastapi import HTTPException,status
+from fastapi.concurrency import run_in_threadpool
+from qdrant_client.models import PointStruct
 from backend.config.qdrant import client
 from backend.utils.embeddings import get_embedding
 from backend.utils.chunker import clean_text,chunk_text
 from backend.utils import pdf_loader
-from backend.services.query_retriever import get_query_retriever
+from backend.services.query_retriever import get_query_retriever,select_relevant_results,clear_cardinality_cache
 from backend.services.generate_metadata import infer_policy_type,infer_section,infer_location,infer_employee_type
-from backend.services.final_result import extract_context,clean_output,answer_chain_invoke
+from backend.services.final_result import extract_context,clean_output,answer_chain_invoke,estimate_prompt_tokens
+from backend.utils.metrics import time_stage
+from backend.utils.request_timing import annotate_request
 import logging
 
 logger=logging.getLogger(__name__)
@@ -24,38 +28,43 @@ def add_vectors(chunks:str):
         
         points=[]
         logger.info("Adding vectors to Qdrant collection.")
-        for chunk in chunks:
-            clean_chunk=clean_text(chunk)
-            embedding=get_embedding(clean_chunk)
-            points.append({
-                "id":str(uuid.uuid4()),
-                "vector":embedding,
-                "payload":{
-                    "text":clean_chunk,
-                    "source":"employee_handbook",
-                    "policy_type":infer_policy_type(clean_chunk),
-                    "section":infer_section(clean_chunk),
-                    "location":infer_location(clean_chunk),
-                    "employee_type":infer_employee_type(clean_chunk)
-                }
-            })
+        with time_stage("ingest","embedding"):
+            for chunk in chunks:
+                clean_chunk=clean_text(chunk)
+                embedding=get_embedding(clean_chunk)
+                # PointStruct rather than a dict, local mode does not validate dicts
+                points.append(PointStruct(
+                    id=str(uuid.uuid4()),
+                    vector=embedding,
+                    payload={
+                        "text":clean_chunk,
+                        "source":"employee_handbook",
+                        "policy_type":infer_policy_type(clean_chunk),
+                        "section":infer_section(clean_chunk),
+                        "location":infer_location(clean_chunk),
+                        "employee_type":infer_employee_type(clean_chunk)
+                    }
+                ))
 
         logger.info(f"Chunk added: len(points)")
-        client.upsert(
-            collection_name=collection_handbook,
-            points=points
-        )
+        with time_stage("ingest","upsert"):
+            client.upsert(
+                collection_name=collection_handbook,
+                points=points
+            )
+        clear_cardinality_cache()
         logger.info("Vectors added successfully.")
     except Exception as e:
         logger.error(f"Error in add_vectors:{str(e)}",exc_info=True)
         raise
     
-async def get_result(query:str,limit:int=5):
+async def get_result(query:str,limit:int=5,search_profile:str=None):
     try:
         if not query or not query.strip():
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,detail="Query is empty")
         logger.info(f"Processing query with limit {limit}")
-        query_result=get_query_retriever(query,limit)
+        # Blocking LLM, embedding and Qdrant calls run off the event loop
+        query_result=await run_in_threadpool(get_query_retriever,query,limit,search_profile)
 
         logger.info("Retrieved Query.")
         if not query_result or not query_result.get('results'):
@@ -64,7 +73,16 @@ async def get_result(query:str,limit:int=5):
                 "answer":"According to the employee handbook this information is not specified.",
                 "sources":[]
             }
-        context=extract_context(query_result)
+
+        with time_stage("chat","context_build"):
+            relevant_results=select_relevant_results(query_result['results'])
+            context=extract_context({**query_result,"results":relevant_results}) if relevant_results else None
+        if not relevant_results:
+            logger.info("Best match is below the relevance threshold, skipping LLM")
+            return{
+                "answer":"According to the employee handbook this information is not specified.",
+                "sources":[]
+            }
 
         if not context:
             logger.info(f"No context extracted")
@@ -73,12 +91,16 @@ async def get_result(query:str,limit:int=5):
                 "sources":[]
             }
         
+        annotate_request(context_chunks=len(context),prompt_tokens=estimate_prompt_tokens(context,query))
         logger.info("Generating answer using LLM chain")
-        response = answer_chain_invoke(
-            context=context,
-            question=query
-        )
-        return clean_output(response)
+        with time_stage("chat","answer_llm"):
+            response = await run_in_threadpool(
+                answer_chain_invoke,
+                context=context,
+                question=query
+            )
+        with time_stage("chat","clean_output"):
+            return clean_output(response)
     except HTTPException:
         raise
     except Exception as e:
@@ -93,13 +115,15 @@ async def process_handbook(file):
             
         logger.info("File saved")
         logger.info(f"File saved successfully")
-        text=pdf_loader.load_pdf(file_location)
+        with time_stage("ingest","pdf_extract"):
+            text=pdf_loader.load_pdf(file_location)
 
         if not text:
             logger.error("No text extracted from pdf")
             raise ValueError("Failed to extract text from PDF")
         
-        chunks=chunk_text(text)
+        with time_stage("ingest","chunking"):
+            chunks=chunk_text(text)
         logger.info(f"Total chunks created:{len(chunks)}")
         add_vectors(chunks)
 
@@ -1,13 +1,38 @@
+import os
+import math
+import time
+from threading import Lock
+from typing import Dict, NamedTuple, Optional, Tuple
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from qdrant_client.models import Filter, FieldCondition, MatchValue
 from backend.config.qdrant import client,COLLECTION_NAME as collection_handbook
-from backend.utils.embeddings import get_embedding
+from backend.config.search_config import get_search_params
+from backend.utils.embeddings import get_query_embedding
 from backend.utils.llm_setup import set_llm
+from backend.utils.llm_pool import get_llm_pool,NoBackendAvailableError
+from backend.utils.metrics import LLM_ERRORS,time_stage
+from backend.utils.request_timing import annotate_request
 import logging
 
 logger=logging.getLogger(__name__)
 
+# Hits scoring below this cosine similarity are treated as "not in the handbook"
+MIN_RELEVANCE_SCORE=float(os.getenv("RETRIEVAL_MIN_SCORE","0.25"))
+# Drop the tail of the result list after a score drop larger than this
+MAX_SCORE_GAP=float(os.getenv("RETRIEVAL_SCORE_GAP","0.15"))
+# Filters matching at least this share of the collection are applied after an unfiltered search
+POST_FILTER_MIN_SELECTIVITY=float(os.getenv("FILTER_POST_FILTER_MIN_SELECTIVITY","0.5"))
+# How long per-value point counts from the payload indexes are reused
+CARDINALITY_TTL_SECONDS=float(os.getenv("FILTER_CARDINALITY_TTL_SECONDS","300"))
+
+ALLOWED_METADATA_VALUES={
+    "policy_type":{"Leave","Payroll","Work From Home","Conduct","Security","Benefits"},
+    "section":{"Introduction","Policies","Procedures","Health and Safety","Employee Benefits","Code of Conduct"},
+    "location":{"Headquarters","Branch Office","Remote","On-site"},
+    "employee_type":{"Full-Time","Part-Time","Contractor","Intern"},
+}
+
 prompt = ChatPromptTemplate.from_messages([
     (
         "system",
@@ -65,69 +90,178 @@ Answer:
     )
 ])
 
-_query_chain = None
+_query_chains = {}
 
-def get_query_chain():
-    """Lazy-load the query chain to prevent startup failures."""
-    global _query_chain
-    if _query_chain is None:
+def get_query_chain(base_url: str = None):
+    """Lazy-load the query chain for an Ollama backend to prevent startup failures."""
+    chain = _query_chains.get(base_url)
+    if chain is None:
         try:
-            llm = set_llm("query")
-            _query_chain = prompt | llm | JsonOutputParser()
+            llm = set_llm("query", base_url)
+            chain = prompt | llm | JsonOutputParser()
+            _query_chains[base_url] = chain
         except Exception as e:
             logger.error(f"Failed to initialize query chain: {e}")
             raise
-    return _query_chain
+    return chain
+
+def _default_metadata():
+    return {
+        "policy_type": "General",
+        "section": "General",
+        "location": "General",
+        "employee_type": "General"
+    }
 
 def extract_metadata(query:str):
     try:
-        chain = get_query_chain()
-        response = chain.invoke({"query":query})
+        with get_llm_pool().acquire() as backend:
+            chain = get_query_chain(backend.base_url)
+            response = chain.invoke({"query":query})
         logger.info("Extracted Metadata: %s",response)
         return response
+    except NoBackendAvailableError as e:
+        LLM_ERRORS.labels("metadata","no_backend").inc()
+        logger.error(f"No Ollama backend available for metadata extraction: {e}")
+        return _default_metadata()
     except Exception as e:
         error_msg = str(e).lower()
         if "unauthorized" in error_msg or "401" in error_msg:
+            LLM_ERRORS.labels("metadata","auth").inc()
             logger.error(f"Ollama API authentication failed: {e}. Check OLLAMA_API_KEY environment variable.")
             # Return default metadata when auth fails - this allows the app to still work
-            return {
-                "policy_type": "General",
-                "section": "General",
-                "location": "General",
-                "employee_type": "General"
-            }
+            return _default_metadata()
+        LLM_ERRORS.labels("metadata","error").inc()
         logger.error(f"Error extracting metadata: {e}")
         raise
 
-def build_filter(metadata:dict):
+def confident_conditions(metadata:dict)->Dict[str,str]:
+    """
+    Metadata fields worth filtering on.
+    "General" values and values outside the allowed vocabulary are dropped.
+    """
     if not metadata:
+        return {}
+    return {
+        k:val for k,val in metadata.items()
+        if k in ALLOWED_METADATA_VALUES and val in ALLOWED_METADATA_VALUES[k]
+    }
+
+def build_filter(metadata:dict):
+    conditions=confident_conditions(metadata)
+    if not conditions:
         return None
-    
-    conditions=[]
-    for k,val in metadata.items():
-        conditions.append(
-            FieldCondition(
-                key=k,
-                match=MatchValue(value=val)
-            )
+
+    return Filter(must=[
+        FieldCondition(
+            key=k,
+            match=MatchValue(value=val)
         )
+        for k,val in conditions.items()
+    ])
+
+class SearchPlan(NamedTuple):
+    query_filter:Optional[Filter]
+    post_filter:Optional[Dict[str,str]]
+    fetch_limit:int
+
+_cardinality_cache:Dict[Tuple[str,Optional[str]],Tuple[int,float]]={}
+_cardinality_lock=Lock()
+
+def clear_cardinality_cache():
+    """Forget cached point counts (e.g. after a new handbook was ingested)."""
+    with _cardinality_lock:
+        _cardinality_cache.clear()
+
+def _get_cardinality(field:Optional[str]=None,value:Optional[str]=None)->int:
+    """Approximate number of points with field==value, or of all points when field is None."""
+    key=(field,value) if field else (None,None)
+    now=time.monotonic()
+    with _cardinality_lock:
+        cached=_cardinality_cache.get(key)
+        if cached and now-cached[1]<CARDINALITY_TTL_SECONDS:
+            return cached[0]
+
+    count_filter=None
+    if field:
+        count_filter=Filter(must=[FieldCondition(key=field,match=MatchValue(value=value))])
+    count=int(client.count(
+        collection_name=collection_handbook,
+        count_filter=count_filter,
+        exact=False,
+    ).count)
+
+    with _cardinality_lock:
+        _cardinality_cache[key]=(count,now)
+    return count
+
+def plan_search(metadata:dict,limit:int)->SearchPlan:
+    """
+    Decide how metadata is applied to the vector search.
+
+    Selective filters go to Qdrant as `must` clauses. Filters that match most
+    of the collection gain nothing from a filtered HNSW traversal, so the search
+    runs unfiltered with a larger limit and the hits are filtered afterwards.
+    """
+    conditions=confident_conditions(metadata)
+    if not conditions:
+        return SearchPlan(None,None,limit)
+
+    try:
+        total=_get_cardinality()
+        selectivity=1.0
+        for k,val in list(conditions.items()):
+            count=_get_cardinality(k,val)
+            if count==0:
+                # No chunk carries this value, a must clause would only empty the result
+                logger.info(f"Dropping filter {k}={val}, no matching points")
+                del conditions[k]
+                continue
+            selectivity*=count/total if total else 1.0
+    except Exception as e:
+        logger.warning(f"Could not read filter cardinalities, using filtered search: {e}")
+        return SearchPlan(build_filter(conditions),None,limit)
+
+    if not conditions:
+        return SearchPlan(None,None,limit)
+
+    if selectivity>=POST_FILTER_MIN_SELECTIVITY:
+        fetch_limit=math.ceil(limit/selectivity*1.5)
+        return SearchPlan(None,conditions,fetch_limit)
 
-    return Filter(should=conditions)
+    return SearchPlan(build_filter(conditions),None,limit)
 
-def get_query_retriever(query:str,limit:int=5):
-    metadata=extract_metadata(query)
-    filter=build_filter(metadata)
+def search_handbook(embedding,metadata:dict,limit:int=5,search_profile:str=None):
+    """Run the planned vector search and return the matching Qdrant points."""
+    plan=plan_search(metadata,limit)
 
-    embedding=get_embedding(query)
-    
     search_result=client.query_points(
         collection_name=collection_handbook,
         query=embedding,
-        query_filter=filter,
-        limit=limit,
+        query_filter=plan.query_filter,
+        search_params=get_search_params(search_profile),
+        limit=plan.fetch_limit,
         with_payload=True,
     )
 
+    points=search_result.points
+    if plan.post_filter:
+        points=[
+            point for point in points
+            if all((point.payload or {}).get(k)==val for k,val in plan.post_filter.items())
+        ][:limit]
+    return points
+
+def get_query_retriever(query:str,limit:int=5,search_profile:str=None):
+    with time_stage("chat","metadata_llm"):
+        metadata=extract_metadata(query)
+    with time_stage("chat","query_embedding"):
+        embedding=get_query_embedding(query)
+
+    with time_stage("chat","qdrant_search"):
+        points=search_handbook(embedding,metadata,limit,search_profile)
+    annotate_request(metadata=metadata,scores=[point.score for point in points])
+
     return {
         "query":query,
         "results":[
@@ -136,6 +270,34 @@ def get_query_retriever(query:str,limit:int=5):
                 "score":point.score,
                 "payload":point.payload
             }
-            for point in search_result.points
+            for point in points
         ]
     }
+
+
+def select_relevant_results(results:list,min_score:float=None,max_gap:float=None)->list:
+    """
+    Trim retrieved hits before they are sent to the answer LLM.
+
+    Hits below `min_score` are discarded, and the list is cut at the first
+    drop between consecutive scores that is larger than `max_gap` (adaptive k).
+    Hits without a score are kept as-is.
+    """
+    min_score=MIN_RELEVANCE_SCORE if min_score is None else min_score
+    max_gap=MAX_SCORE_GAP if max_gap is None else max_gap
+
+    selected=[]
+    previous_score=None
+    for result in results:
+        score=result.get("score")
+        if score is None:
+            selected.append(result)
+            continue
+        if score<min_score:
+            break
+        if previous_score is not None and previous_score-score>max_gap:
+            break
+        selected.append(result)
+        previous_score=score
+
+    return selected
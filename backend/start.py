@@ -1,5 +1,9 @@
 import os
+import gc
 import sys
+import time
+import signal
+import importlib.util
 import uvicorn
 from pathlib import Path
 import logging
@@ -10,14 +14,163 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 load_dotenv()
 
-# Setup basic logging before everything else
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+
+def get_server_settings():
+    """
+    Returns uvicorn tuning settings from environment variables.
+    uvloop/httptools are used when installed (uvicorn[standard]).
+    """
+    return {
+        "workers": int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))),
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+        "timeout_keep_alive": int(os.getenv("UVICORN_KEEPALIVE_SECONDS", "30")),
+        "backlog": int(os.getenv("UVICORN_BACKLOG", "2048")),
+        "preload": os.getenv("PRELOAD_MODELS", "true").lower() == "true",
+        # A worker dying sooner than this after its start counts as a failed start
+        "min_uptime": float(os.getenv("WORKER_MIN_UPTIME_SECONDS", "10")),
+        "max_failed_starts": int(os.getenv("WORKER_MAX_FAILED_STARTS", "5")),
+        "restart_backoff": float(os.getenv("WORKER_RESTART_BACKOFF_SECONDS", "1")),
+    }
+
+
+def restart_delay(failed_starts: int, backoff: float, max_delay: float = 30.0) -> float:
+    """Seconds to wait before restarting a worker, doubling with every failed start in a row."""
+    if failed_starts <= 0:
+        return 0.0
+    return min(max_delay, backoff * 2 ** (failed_starts - 1))
+
+
+def preload():
+    """
+    Import the app and load heavy models once in the parent process.
+    Forked workers then share these read-only pages through copy-on-write.
+    """
+    from backend.main import app
+
+    if os.getenv("EMBED_WORKER_SOCKET"):
+        logger.info("Embeddings are served by the worker pool, skipping model preload")
+    else:
+        try:
+            from backend.utils.embeddings import get_embedding_model
+            get_embedding_model()
+        except Exception as e:
+            logger.warning(f"Could not preload embedding model, workers will load it lazily: {e}")
+
+    # Keep the garbage collector from touching (and un-sharing) preloaded objects
+    gc.freeze()
+    return app
+
+
+def run_production(host: str, port: int) -> int:
+    """
+    Pre-fork server: binds the socket once, forks N uvicorn workers that share
+    it and restarts workers that die, with backoff. SIGTERM/SIGINT stop all workers.
+    Gives up when workers keep dying right after starting (e.g. invalid configuration).
+    Returns the exit code for the supervisor process.
+    """
+    settings = get_server_settings()
+    app = preload() if settings["preload"] else "backend.main:app"
+
+    config = uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        loop=settings["loop"],
+        http=settings["http"],
+        timeout_keep_alive=settings["timeout_keep_alive"],
+        backlog=settings["backlog"],
+        log_level="info",
+        access_log=os.getenv("UVICORN_ACCESS_LOG", "false").lower() == "true",
+    )
+    sock = config.bind_socket()
+    logger.info(f"Production mode: {settings['workers']} worker(s), loop={settings['loop']}, "
+                f"http={settings['http']}, keep-alive={settings['timeout_keep_alive']}s, "
+                f"backlog={settings['backlog']}, preload={settings['preload']}")
+
+    # pid -> time.monotonic() at spawn
+    children = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            # Not the supervisor's forward(): that would signal this worker's siblings.
+            # The app lifespan installs the worker's own reload handler.
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            exit_code = 1
+            try:
+                server = uvicorn.Server(config)
+                server.run(sockets=[sock])
+                # run() returns without serving when the app's startup failed
+                exit_code = 0 if server.started else 1
+            finally:
+                os._exit(exit_code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def forward(signum, frame):
+        # SIGHUP reloads the rate limit policies in every worker
+        for pid in list(children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGHUP, forward)
+
+    for _ in range(settings["workers"]):
+        spawn()
+
+    failed_starts = 0
+    exit_code = 0
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started_at = children.pop(pid, time.monotonic())
+        if stopping:
+            continue
+        worker_exit = os.waitstatus_to_exitcode(status)
+        if time.monotonic() - started_at < settings["min_uptime"]:
+            failed_starts += 1
+        else:
+            failed_starts = 0
+        if failed_starts >= settings["max_failed_starts"]:
+            logger.error(f"Worker {pid} exited with {worker_exit}; {failed_starts} workers in a row died within "
+                         f"{settings['min_uptime']}s of starting, shutting down")
+            exit_code = 1
+            stop(None, None)
+            continue
+        delay = restart_delay(failed_starts, settings["restart_backoff"])
+        logger.warning(f"Worker {pid} exited with {worker_exit}, restarting in {delay:.1f}s")
+        time.sleep(delay)
+        if not stopping:
+            spawn()
+
+    sock.close()
+    return exit_code
+
+
 if __name__ == "__main__":
+    # Queued logging from the start, forked workers set up their own in the app lifespan
+    from backend.config.logging_config import setup_logging
+    setup_logging()
     try:
         # Check for required environment variables
         required_vars = ["QDRANT_URL", "QDRANT_API_KEY", "JWT_SECRET_KEY", 
@@ -38,6 +191,10 @@ if __name__ == "__main__":
                    f"CHAT_MODEL_NAME={os.getenv('CHAT_MODEL_NAME', 'not set')}, "
                    f"OLLAMA_BASE_URL={os.getenv('OLLAMA_BASE_URL', 'not set')}")
         
+        # SERVER_MODE=production runs several pre-forked workers
+        if os.getenv("SERVER_MODE", "development").lower() == "production":
+            sys.exit(run_production(host, port))
+
         # Start uvicorn server - this will bind to the port and start listening
         uvicorn.run(
             "backend.main:app",
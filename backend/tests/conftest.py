@@ -5,12 +5,22 @@ from fastapi.testclient import TestClient
 import pytest
 import os
 import sys
+import time
+import fnmatch
+import shutil
+import socket
+import hashlib
+import subprocess
+import socketserver
+import threading
 from pathlib import Path
 
 # Add parent directory to path to allow imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from backend.auth.dependencies import get_current_user
+from backend.utils.rate_limiter import fixed_window_start, gcra_check, roll_window, sliding_window_check
+from backend.utils.redis_rate_limiter import SLIDING_WINDOW_SCRIPT
 from main import app
 
 # Set test environment variables
@@ -84,3 +94,170 @@ def sample_query_result():
             }
         ]
     }
+
+
+def _sliding_window_script(server, keys, args):
+    """Python port of SLIDING_WINDOW_SCRIPT for the fake Redis server."""
+    now = float(args[0])
+    states = []
+    for i, key in enumerate(keys):
+        limit, window, burst = int(args[1 + i * 3]), int(args[2 + i * 3]), int(args[3 + i * 3])
+        stored = server.hashes.get(key, {})
+        if burst > 0:
+            allowed, retry_after, tat = gcra_check(float(stored.get("t", 0)), now, limit, window, burst)
+            state, ttl = {"t": f"{tat:.6f}"}, tat - now + 1
+        else:
+            start = fixed_window_start(now, window)
+            p, c = roll_window(float(stored["s"]) if "s" in stored else None,
+                               int(stored.get("p", 0)), int(stored.get("c", 0)), start, window)
+            allowed, retry_after = sliding_window_check(p, c, start, now, limit, window)
+            state, ttl = {"s": str(start), "p": str(p), "c": str(c + 1)}, window * 2
+        if not allowed:
+            return [0, retry_after, i + 1]
+        states.append((key, state, ttl))
+    for key, state, ttl in states:
+        server.hashes[key] = state
+        server.expiry[key] = time.monotonic() + ttl
+    return [1]
+
+
+class FakeRedisServer:
+    """
+    In-process server speaking the Redis protocol for limiter tests.
+    Scripts are not interpreted; known script sources map to Python ports.
+    """
+
+    def __init__(self, scripts=None):
+        self.hashes = {}
+        self.expiry = {}
+        self.commands = []
+        self._handlers = {
+            hashlib.sha1(source.encode()).hexdigest(): handler
+            for source, handler in (scripts or {SLIDING_WINDOW_SCRIPT: _sliding_window_script}).items()
+        }
+        self._loaded = set()
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    count = int(line[1:])
+                    args = []
+                    for _ in range(count):
+                        size = int(self.rfile.readline()[1:])
+                        args.append(self.rfile.read(size + 2)[:-2].decode())
+                    with fake._lock:
+                        reply = fake._dispatch(args)
+                    self.wfile.write(fake._encode(reply))
+
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self.url = f"redis://127.0.0.1:{self.port}/0"
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _dispatch(self, args):
+        command = args[0].upper()
+        self.commands.append(command)
+        self._expire()
+        if command == "PING":
+            return "+PONG"
+        if command == "HELLO":
+            return {"server": "fake-redis", "proto": int(args[1]) if len(args) > 1 else 2}
+        if command in ("CLIENT", "SELECT"):
+            return "+OK"
+        if command == "SCRIPT" and args[1].upper() == "LOAD":
+            sha = hashlib.sha1(args[2].encode()).hexdigest()
+            self._loaded.add(sha)
+            return sha
+        if command in ("EVALSHA", "EVAL"):
+            sha = args[1] if command == "EVALSHA" else hashlib.sha1(args[1].encode()).hexdigest()
+            if sha not in self._handlers or (command == "EVALSHA" and sha not in self._loaded):
+                return Exception("NOSCRIPT No matching script. Please use EVAL.")
+            self._loaded.add(sha)
+            numkeys = int(args[2])
+            return self._handlers[sha](self, args[3:3 + numkeys], args[3 + numkeys:])
+        if command == "SCAN":
+            pattern = args[args.index("MATCH") + 1] if "MATCH" in args else "*"
+            return ["0", [k for k in self.hashes if fnmatch.fnmatchcase(k, pattern)]]
+        if command == "DEL":
+            removed = [k for k in args[1:] if self.hashes.pop(k, None) is not None]
+            return len(removed)
+        if command == "HGETALL":
+            return [item for pair in self.hashes.get(args[1], {}).items() for item in pair]
+        return Exception(f"ERR unknown command '{args[0]}'")
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [k for k, at in self.expiry.items() if at <= now]:
+            self.hashes.pop(key, None)
+            del self.expiry[key]
+
+    def _encode(self, reply):
+        if isinstance(reply, Exception):
+            return f"-{reply}\r\n".encode()
+        if isinstance(reply, int):
+            return f":{reply}\r\n".encode()
+        if isinstance(reply, dict):
+            return f"%{len(reply)}\r\n".encode() + b"".join(
+                self._encode(k) + self._encode(v) for k, v in reply.items()
+            )
+        if isinstance(reply, str) and reply.startswith("+"):
+            return f"{reply}\r\n".encode()
+        if isinstance(reply, str):
+            data = reply.encode()
+            return b"$" + str(len(data)).encode() + b"\r\n" + data + b"\r\n"
+        return f"*{len(reply)}\r\n".encode() + b"".join(self._encode(item) for item in reply)
+
+
+@pytest.fixture
+def fake_redis():
+    """Fake Redis server running in a background thread."""
+    server = FakeRedisServer()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def lua_redis():
+    """
+    Redis client that really executes Lua scripts: REDIS_TEST_URL, a throwaway
+    redis-server from PATH, or fakeredis with lupa. Skipped when none is available.
+    """
+    import redis
+    process = None
+    if os.getenv("REDIS_TEST_URL"):
+        client = redis.Redis.from_url(os.getenv("REDIS_TEST_URL"))
+    elif shutil.which("redis-server"):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        process = subprocess.Popen(
+            ["redis-server", "--port", str(port), "--save", "", "--appendonly", "no"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        client = redis.Redis(port=port)
+        for _ in range(50):
+            try:
+                client.ping()
+                break
+            except redis.ConnectionError:
+                time.sleep(0.1)
+    else:
+        fakeredis = pytest.importorskip("fakeredis", reason="needs redis-server, REDIS_TEST_URL or fakeredis[lua]")
+        pytest.importorskip("lupa", reason="fakeredis needs lupa to run Lua scripts")
+        client = fakeredis.FakeRedis()
+    client.flushdb()
+    yield client
+    client.flushdb()
+    if process is not None:
+        process.terminate()
+        process.wait()
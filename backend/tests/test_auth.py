@@ -1,8 +1,12 @@
-from datetime import datetime, timezone
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
+from jose import jwt
 
-from backend.auth.jwt_handler import create_access_token,verify_access_token
+from backend.auth.jwt_handler import create_access_token,verify_access_token,reload_keys,get_key_ring,get_token_cache,VerifiedTokenCache
 from backend.auth.dependencies import get_current_user
 from backend.main import app
 
@@ -49,4 +53,86 @@ class TestAuth:
         assert payload is not None
         assert payload["user_id"]=="admin"
         assert payload["role"]=="admin"
-        assert payload["department"]=="IT"
\ No newline at end of file
+        assert payload["department"]=="IT"
+
+class TestTokenCache:
+    @pytest.fixture(autouse=True)
+    def fresh_keys(self):
+        reload_keys()
+        yield
+        reload_keys()
+
+    def test_repeat_token_skips_decode(self):
+        # ARRANGE
+        token=create_access_token(sub="admin",role="admin",department="IT")
+        verify_access_token(token)
+
+        # ACT
+        with patch("backend.auth.jwt_handler.jwt.decode") as mock_decode:
+            payload=verify_access_token(token)
+
+        # ASSERT
+        mock_decode.assert_not_called()
+        assert payload["sub"]=="admin"
+        assert get_token_cache().stats()["hits"]==1
+
+    def test_cached_token_rejected_after_exp(self):
+        # ARRANGE
+        token=create_access_token(sub="admin",role="admin",department="IT",expires_delta=timedelta(minutes=1))
+        verify_access_token(token)
+
+        # ACT
+        with patch("backend.auth.jwt_handler.time.time",return_value=time.time()+120):
+            with pytest.raises(HTTPException) as exc:
+                verify_access_token(token)
+
+        # ASSERT
+        assert exc.value.status_code==401
+        assert exc.value.detail=="Authentication token has expired."
+
+    def test_cache_is_bounded_and_evicts_expired(self):
+        # ARRANGE
+        cache=VerifiedTokenCache(max_entries=2)
+
+        # ACT
+        cache.put(b"a",{"sub":"a"},exp=100,now=0)
+        cache.put(b"b",{"sub":"b"},exp=200,now=0)
+        cache.put(b"c",{"sub":"c"},exp=300,now=0)
+        evicted_for_space=cache.get(b"a",now=0)
+        cache.put(b"d",{"sub":"d"},exp=400,now=250)
+
+        # ASSERT
+        assert evicted_for_space is None
+        assert cache.stats()["entries"]==2
+        assert cache.get(b"c",now=250)=={"sub":"c"}
+        assert cache.get(b"d",now=250)=={"sub":"d"}
+
+    def test_rotation_accepts_previous_key_until_dropped(self,monkeypatch):
+        # ARRANGE
+        monkeypatch.setenv("JWT_SECRET_KEY","old-key")
+        reload_keys()
+        token=create_access_token(sub="admin",role="admin",department="IT")
+
+        # ACT
+        monkeypatch.setenv("JWT_SECRET_KEY","new-key")
+        monkeypatch.setenv("JWT_PREVIOUS_SECRET_KEYS","old-key")
+        reload_keys()
+        payload=verify_access_token(token)
+        monkeypatch.delenv("JWT_PREVIOUS_SECRET_KEYS")
+        reload_keys()
+
+        # ASSERT
+        assert payload["sub"]=="admin"
+        with pytest.raises(HTTPException) as exc:
+            verify_access_token(token)
+        assert exc.value.status_code==401
+
+    def test_token_header_carries_key_id(self):
+        # ARRANGE
+        token=create_access_token(sub="admin",role="admin",department="IT")
+
+        # ACT
+        header=jwt.get_unverified_header(token)
+
+        # ASSERT
+        assert header["kid"]==get_key_ring().kid
@@ -1,5 +1,13 @@
 from backend.config.qdrant import client,COLLECTION_NAME
-from backend.config.logging_config import setup_logging
+from backend.config import logging_config
+from backend.config.logging_config import setup_logging,shutdown_logging,JsonFormatter,SamplingFilter,NonBlockingQueueHandler,parse_sample_rates
+import json
+import queue
+from backend.config.priority_config import get_request_priority
+from backend.config.search_config import get_search_params,validate_search_config
+from backend.config.rate_limit_config import compile_rate_limit_policies,get_rate_limit_policies,reload_rate_limit_policies,set_rate_limit_policies,install_reload_signal_handler
+import signal
+import pytest
 import os
 from unittest.mock import MagicMock, patch
 import logging
@@ -26,28 +34,266 @@ class TestQdrant:
         assert len(existing_indices) == len(fields_to_index)
         assert all(field in existing_indices for field in fields_to_index)
 
+    def test_config_qdrant_local_mode(self,monkeypatch):
+        """QDRANT_PATH runs Qdrant in-process, with the collection sized by QDRANT_VECTOR_SIZE"""
+        from backend.config import qdrant
+        monkeypatch.setenv("QDRANT_PATH",":memory:")
+        monkeypatch.setenv("QDRANT_COLLECTION","local_test")
+        monkeypatch.setenv("QDRANT_VECTOR_SIZE","8")
+        monkeypatch.setattr(qdrant,"_client",None)
+        monkeypatch.setattr(qdrant,"_client_initialized",False)
+
+        # ACT
+        local_client=qdrant.get_qdrant_client()
+
+        # ASSERT
+        collection_info=local_client.get_collection("local_test")
+        assert collection_info.config.params.vectors.size == 8
+
 class TestLogging():
-    @patch("config.logging_config.logging.FileHandler")
-    def test_logging_success(self,mock_file_handler):
+    @pytest.fixture(autouse=True)
+    def clean_logging(self):
+        shutdown_logging()
+        yield
+        shutdown_logging()
+
+    @patch("backend.config.logging_config.TimedRotatingFileHandler")
+    def test_logging_success(self,mock_file_handler,tmp_path,monkeypatch):
         """Test if the logging is set up properly
         - Log directory is created
-        - Logger level is set to INFO
-        - StreamHandler and FileHandler are attached
+        - Root logger gets a single queue handler
+        - StreamHandler and the rotating FileHandler sit behind the queue listener
         """
         # ARRANGE
+        monkeypatch.setenv("LOG_DIR",str(tmp_path/"logs"))
         mock_handler = MagicMock()
         mock_handler.level = logging.INFO
         mock_file_handler.return_value = mock_handler
-        
+
         # ACT
         setup_logging()
 
         # ASSERT
-        assert os.path.isdir("logs")
+        assert os.path.isdir(tmp_path/"logs")
         mock_file_handler.assert_called_once()
+        assert mock_file_handler.call_args.kwargs["when"]=="midnight"
+        queue_handlers=[h for h in logging.getLogger().handlers if isinstance(h,NonBlockingQueueHandler)]
+        assert len(queue_handlers)==1
+
+    def test_setup_replaces_existing_root_handlers(self,monkeypatch):
+        """Handlers from an earlier basicConfig would write synchronously and duplicate every line"""
+        # ARRANGE
+        monkeypatch.setenv("LOG_TO_FILE","false")
+        earlier=logging.StreamHandler()
+        logging.getLogger().addHandler(earlier)
+
+        # ACT
+        setup_logging()
+
+        # ASSERT
+        handlers=logging.getLogger().handlers
+        assert earlier not in handlers
+        assert len(handlers)==1 and isinstance(handlers[0],NonBlockingQueueHandler)
+
+    def test_forked_child_sets_up_its_own_listener(self,monkeypatch):
+        """The listener thread does not survive fork, the child must not reuse the parent's queue"""
+        # ARRANGE
+        monkeypatch.setenv("LOG_TO_FILE","false")
+        setup_logging()
+        parent_listener=logging_config._listener
+
+        # ACT
+        logging_config._reset_after_fork()
+        parent_listener.stop()
+        setup_logging()
+
+        # ASSERT
+        assert logging_config._listener is not parent_listener
+        assert len([h for h in logging.getLogger().handlers if isinstance(h,NonBlockingQueueHandler)])==1
 
+    def test_setup_is_idempotent(self,monkeypatch):
+        # ARRANGE
+        monkeypatch.setenv("LOG_TO_FILE","false")
+
+        # ACT
+        setup_logging()
+        setup_logging()
+
+        # ASSERT
+        queue_handlers=[h for h in logging.getLogger().handlers if isinstance(h,NonBlockingQueueHandler)]
+        assert len(queue_handlers)==1
+
+    def test_json_formatter_includes_extra_fields(self):
+        # ARRANGE
+        record=logging.LogRecord("backend.test",logging.INFO,__file__,1,"hello %s",("world",),None)
+        record.request_id="abc"
+
+        # ACT
+        entry=json.loads(JsonFormatter().format(record))
 
+        # ASSERT
+        assert entry["message"]=="hello world"
+        assert entry["level"]=="INFO"
+        assert entry["logger"]=="backend.test"
+        assert entry["request_id"]=="abc"
+
+    def test_sampling_keeps_warnings_and_matches_prefix(self):
+        # ARRANGE
+        sampler=SamplingFilter(parse_sample_rates("backend.routes=0, backend.routes.admin_routes=1"))
+        def record(name,level):
+            return logging.LogRecord(name,level,__file__,1,"msg",None,None)
+
+        # ASSERT
+        assert sampler.filter(record("backend.routes.handbook_routes",logging.INFO)) is False
+        assert sampler.filter(record("backend.routes.handbook_routes",logging.WARNING)) is True
+        assert sampler.filter(record("backend.routes.admin_routes",logging.INFO)) is True
+        assert sampler.filter(record("backend.services",logging.INFO)) is True
+        assert sampler.dropped==1
+
+    def test_queue_handler_drops_when_full(self):
+        # ARRANGE
+        handler=NonBlockingQueueHandler(queue.Queue(1))
+        record=logging.LogRecord("backend.test",logging.INFO,__file__,1,"msg",None,None)
+
+        # ACT
+        handler.handle(record)
+        handler.handle(record)
+
+        # ASSERT
+        assert handler.queue.qsize()==1
+        assert handler.dropped==1
 
 
+class TestPriorityConfig:
+    def test_chat_is_ordered_by_role(self):
+        """Employees' chat requests are served before interns'"""
+        assert get_request_priority("employee","chat") > get_request_priority("intern","chat")
 
+    def test_unknown_role_gets_lowest_weight(self):
+        """Unknown roles are scheduled like the lowest configured role"""
+        assert get_request_priority("contractor","chat") == get_request_priority("intern","chat")
 
+
+class TestSearchConfig:
+    def test_profiles_trade_recall_for_latency(self):
+        """The fast profile explores fewer HNSW candidates than balanced"""
+        assert get_search_params("fast").hnsw_ef < get_search_params("balanced").hnsw_ef
+        assert get_search_params("exact").exact is True
+
+    def test_default_profile(self):
+        """Without a profile name the QDRANT_SEARCH_PROFILE default is used"""
+        assert get_search_params() == get_search_params("balanced")
+
+    def test_unknown_profile(self):
+        with pytest.raises(ValueError):
+            get_search_params("turbo")
+
+    def test_invalid_default_profile_fails_validation(self,monkeypatch):
+        """A typo in QDRANT_SEARCH_PROFILE is caught at startup, not by the first search"""
+        monkeypatch.setattr("backend.config.search_config.DEFAULT_SEARCH_PROFILE","balancd")
+
+        with pytest.raises(ValueError,match="Invalid search configuration"):
+            validate_search_config()
+
+
+class TestRateLimitPolicies:
+    @pytest.fixture(autouse=True)
+    def fresh_policies(self):
+        set_rate_limit_policies(None)
+        yield
+        set_rate_limit_policies(None)
+
+    def test_compiles_env_config_into_window_tuples(self,monkeypatch):
+        # ARRANGE
+        monkeypatch.setenv("RATE_LIMIT_CHAT_PER_MIN_EMPLOYEE","7")
+        monkeypatch.setenv("RATE_LIMIT_CHAT_BURST_EMPLOYEE","3")
+
+        # ACT
+        policies=compile_rate_limit_policies()
+
+        # ASSERT
+        assert dict(policies.lookup("employee","chat"))=={"per_minute":(7,60,3),"per_hour":(50,3600)}
+        assert dict(policies.lookup("admin","upload"))=={"per_hour":(5,3600),"per_day":(20,86400)}
+
+    def test_unknown_role_falls_back_to_intern(self):
+        policies=compile_rate_limit_policies()
+        assert policies.lookup("contractor","chat")==policies.lookup("intern","chat")
+        assert not policies.lookup("employee","upload")
+
+    def test_login_uses_its_own_hourly_limit(self,monkeypatch):
+        monkeypatch.setenv("RATE_LIMIT_LOGIN_PER_15MIN","5")
+        monkeypatch.setenv("RATE_LIMIT_LOGIN_PER_HOUR","12")
+        assert dict(compile_rate_limit_policies().lookup_ip("login"))=={"per_15min":(5,900),"per_hour":(12,3600)}
+
+    def test_table_is_immutable(self):
+        policies=compile_rate_limit_policies()
+        with pytest.raises(TypeError):
+            policies.lookup("admin","chat")["per_minute"]=(1,60)
+
+    def test_invalid_config_lists_every_problem(self):
+        config={"intern":{"chat":{"per_minute":-1,"per_minut":5,"burst":2}},"admin":{"upload":{"burst":1}}}
+
+        with pytest.raises(ValueError) as exc:
+            compile_rate_limit_policies(config,{})
+
+        assert "intern.chat: per_minute must be a non-negative integer" in str(exc.value)
+        assert "intern.chat: unknown window(s) per_minut" in str(exc.value)
+        assert "admin.upload: burst needs a per_minute limit" in str(exc.value)
+
+    def test_reload_swaps_table(self,monkeypatch):
+        # ARRANGE
+        before=get_rate_limit_policies()
+        monkeypatch.setenv("RATE_LIMIT_CHAT_PER_MIN_ADMIN","99")
+
+        # ACT
+        after=reload_rate_limit_policies()
+
+        # ASSERT
+        assert get_rate_limit_policies() is after
+        assert after.version==before.version+1
+        assert after.lookup("admin","chat")["per_minute"]==(99,60)
+        assert before.lookup("admin","chat")["per_minute"]==(20,60)
+
+    def test_reload_applies_only_rate_limits_from_dotenv(self,monkeypatch):
+        """A reload must not change unrelated settings of the running process"""
+        # ARRANGE
+        monkeypatch.delenv("PROFILING_ENABLED",raising=False)
+        monkeypatch.delenv("RATE_LIMIT_CHAT_PER_MIN_ADMIN",raising=False)
+        monkeypatch.setattr("backend.config.rate_limit_config.dotenv_values",
+                            lambda: {"RATE_LIMIT_CHAT_PER_MIN_ADMIN":"42","PROFILING_ENABLED":"true"})
+
+        # ACT
+        policies=reload_rate_limit_policies()
+
+        # ASSERT
+        assert policies.lookup("admin","chat")["per_minute"]==(42,60)
+        assert "PROFILING_ENABLED" not in os.environ
+        assert "RATE_LIMIT_CHAT_PER_MIN_ADMIN" not in os.environ
+
+    def test_reload_keeps_current_table_on_error(self,monkeypatch):
+        # ARRANGE
+        before=get_rate_limit_policies()
+        monkeypatch.setenv("RATE_LIMIT_CHAT_PER_MIN_ADMIN","lots")
+
+        # ACT
+        with pytest.raises(ValueError):
+            reload_rate_limit_policies()
+
+        # ASSERT
+        assert get_rate_limit_policies() is before
+
+    @pytest.mark.skipif(not hasattr(signal,"SIGHUP"),reason="SIGHUP not available")
+    def test_sighup_reloads_policies(self):
+        # ARRANGE
+        before=get_rate_limit_policies()
+        previous_handler=signal.getsignal(signal.SIGHUP)
+
+        # ACT
+        try:
+            assert install_reload_signal_handler() is True
+            os.kill(os.getpid(),signal.SIGHUP)
+        finally:
+            signal.signal(signal.SIGHUP,previous_handler)
+
+        # ASSERT
+        assert get_rate_limit_policies().version==before.version+1
@@ -1,4 +1,5 @@
 import logging
+import pytest
 from unittest.mock import patch, MagicMock
 from starlette.middleware.cors import CORSMiddleware
 from fastapi.testclient import TestClient
@@ -28,6 +29,16 @@ class TestAppLifespan:
         # ASSERT — shutdown
         mock_logger.info.assert_any_call("Shutting down Employee Handbook Chatbot")
 
+    @patch("backend.main.setup_logging")
+    def test_startup_fails_on_invalid_search_profile(self,mock_setup_logging,monkeypatch):
+        # ARRANGE
+        monkeypatch.setattr("backend.config.search_config.DEFAULT_SEARCH_PROFILE","turbo")
+
+        # ACT + ASSERT
+        with pytest.raises(ValueError,match="Unknown search profile 'turbo'"):
+            with TestClient(app):
+                pass
+
 def test_router_is_registered():
     with TestClient(app) as client:
         response = client.get("/docs")
@@ -37,3 +48,58 @@ def test_cors_middleware_configured():
     middleware_classes = [m.cls for m in app.user_middleware]
     assert CORSMiddleware in middleware_classes
 
+
+
+class TestServerSettings:
+
+    def test_server_settings_from_env(self, monkeypatch):
+        # ARRANGE
+        from backend.start import get_server_settings
+        monkeypatch.setenv("WEB_CONCURRENCY", "3")
+        monkeypatch.setenv("UVICORN_KEEPALIVE_SECONDS", "15")
+        monkeypatch.setenv("PRELOAD_MODELS", "false")
+
+        # ACT
+        settings = get_server_settings()
+
+        # ASSERT
+        assert settings["workers"] == 3
+        assert settings["timeout_keep_alive"] == 15
+        assert settings["preload"] is False
+        assert settings["loop"] in ("uvloop", "asyncio")
+        assert settings["http"] in ("httptools", "h11")
+
+    def test_restart_delay_backs_off(self):
+        from backend.start import restart_delay
+        assert restart_delay(0, 1.0) == 0.0
+        assert [restart_delay(n, 1.0) for n in (1, 2, 3)] == [1.0, 2.0, 4.0]
+        assert restart_delay(10, 1.0) == 30.0
+
+
+class TestProductionSupervisor:
+
+    def test_gives_up_when_workers_fail_to_start(self, monkeypatch):
+        """A startup that always fails must not make the supervisor fork-loop forever"""
+        # ARRANGE
+        import signal
+        import socket
+        from backend.start import run_production
+        monkeypatch.setattr("backend.config.search_config.DEFAULT_SEARCH_PROFILE", "turbo")
+        monkeypatch.setenv("WEB_CONCURRENCY", "1")
+        monkeypatch.setenv("PRELOAD_MODELS", "false")
+        monkeypatch.setenv("WORKER_MAX_FAILED_STARTS", "2")
+        monkeypatch.setenv("WORKER_RESTART_BACKOFF_SECONDS", "0.01")
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        handlers = {sig: signal.getsignal(sig) for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP)}
+
+        # ACT
+        try:
+            exit_code = run_production("127.0.0.1", port)
+        finally:
+            for sig, handler in handlers.items():
+                signal.signal(sig, handler)
+
+        # ASSERT
+        assert exit_code == 1
@@ -82,6 +82,32 @@ class TestHealthEndpoint:
         assert response.json()["status"] == "OK"
         assert "Employee Handbook Bot" in response.json()["service"]
 
+class TestMetricsEndpoint:
+    def test_metrics_endpoint_exposition_format(self,monkeypatch):
+        """/metrics serves the text exposition format to a scraper with the metrics token"""
+        # ARRANGE
+        monkeypatch.setenv("METRICS_TOKEN","scrape-secret")
+
+        # ACT
+        response=client.get("/metrics",headers={"Authorization":"Bearer scrape-secret"})
+
+        # ASSERT
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE handbook_stage_duration_seconds histogram" in response.text
+        assert "# TYPE handbook_rate_limit_rejections_total counter" in response.text
+
+    def test_metrics_require_the_token(self,monkeypatch):
+        monkeypatch.setenv("METRICS_TOKEN","scrape-secret")
+
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics",headers={"Authorization":"Bearer guess"}).status_code == 401
+
+    def test_metrics_disabled_without_token(self,monkeypatch):
+        monkeypatch.delenv("METRICS_TOKEN",raising=False)
+
+        assert client.get("/metrics").status_code == 404
+
 class TestUploadHandbookEndpoint:
     """Test cases for the upload handbook endpoint"""
 
@@ -119,6 +145,37 @@ class TestUploadHandbookEndpoint:
         assert "uploaded" in status_text or "processing" in status_text, \
             "Status should indicate upload/processing started"
     
+    @patch("backend.routes.handbook_routes.process_handbook", new_callable=AsyncMock)
+    def test_upload_handbook_profiles_background_ingestion(self,mock_process,client,monkeypatch,tmp_path):
+        """A profiled upload returns the artifact name, written once ingestion finishes"""
+        monkeypatch.setenv("PROFILING_ENABLED", "true")
+        monkeypatch.setenv("PROFILES_DIR", str(tmp_path))
+        files = {"file": ("test_handbook.pdf", b"%PDF-1.4", "application/pdf")}
+
+        response = client.post("/upload-handbook", files=files, headers={"X-Profile-Request": "1"})
+
+        assert response.status_code == 200
+        mock_process.assert_awaited_once()
+        assert (tmp_path / response.headers["X-Profile-Artifact"]).is_file()
+
+    @patch("backend.routes.handbook_routes.process_handbook", new_callable=AsyncMock)
+    def test_upload_handbook_profile_skipped_is_reported(self,mock_process,client,monkeypatch,tmp_path):
+        """The announced artifact explains why it was never written instead of a bare 404"""
+        from backend.utils.profiling import RequestProfiler
+        monkeypatch.setenv("PROFILING_ENABLED", "true")
+        monkeypatch.setenv("PROFILES_DIR", str(tmp_path))
+        files = {"file": ("test_handbook.pdf", b"%PDF-1.4", "application/pdf")}
+
+        # Another request holds the profiler while the upload's background task runs
+        with RequestProfiler("chat"):
+            response = client.post("/upload-handbook", files=files, headers={"X-Profile-Request": "1"})
+        artifact = response.headers["X-Profile-Artifact"]
+        download = client.get(f"/admin/profiles/{artifact}")
+
+        assert download.status_code == 404
+        assert "another request was being profiled" in download.json()["detail"]
+        assert artifact in client.get("/admin/profiles").json()["unavailable"]
+
     def test_upload_handbook_invalid_format(self,client):
         """Test upload with non-PDF file"""
         files = {"file": ("test.txt", b"text content", "text/plain")}
@@ -162,6 +219,127 @@ class TestChatEndpoint:
         assert response.status_code == 200, "Should return success status"
         assert isinstance(response.json(), list), "Response should be a list of answer lines"
     
+    @patch("backend.routes.handbook_routes.get_admission_controller")
+    def test_chat_endpoint_shed_returns_503(self,mock_get_controller,client):
+        """Requests shed by admission control fail fast with Retry-After"""
+        from backend.utils.admission import AdmissionController
+        controller = AdmissionController(max_concurrent=1, max_queue=0, max_wait_seconds=1)
+        controller._in_flight = 1  # the only slot is busy
+        mock_get_controller.return_value = controller
+
+        response = client.post("/chat", json={"question": "What is the leave policy?"})
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert controller.stats()["shed_queue_full"] == 1
+
+    @patch("backend.routes.handbook_routes.get_result", new_callable=AsyncMock)
+    def test_chat_endpoint_admin_search_profile(self,mock_get_result,client):
+        """Admins can pick a search profile per request"""
+        mock_get_result.return_value = ["Answer"]
+
+        response = client.post("/chat?search_profile=exact", json={"question": "What is the leave policy?"})
+
+        assert response.status_code == 200
+        mock_get_result.assert_awaited_once_with("What is the leave policy?", 5, "exact")
+
+    @patch("backend.routes.handbook_routes.get_result", new_callable=AsyncMock)
+    def test_chat_endpoint_timings(self,mock_get_result,client):
+        """Stage timings come back as Server-Timing, and in the body when requested"""
+        from backend.utils.metrics import time_stage
+        async def fake_result(*args):
+            with time_stage("chat","answer_llm"):
+                return ["Answer"]
+        mock_get_result.side_effect = fake_result
+
+        plain = client.post("/chat", json={"question": "What is the leave policy?"})
+        debug = client.post("/chat?include_timings=true", json={"question": "What is the leave policy?"})
+
+        assert plain.json() == ["Answer"]
+        assert "rate_limit;dur=" in plain.headers["Server-Timing"]
+        assert "answer_llm;dur=" in plain.headers["Server-Timing"]
+        assert debug.json()["answer"] == ["Answer"]
+        assert set(debug.json()["timings"]) >= {"rate_limit", "answer_llm", "total"}
+
+    @patch("backend.routes.handbook_routes.get_result", new_callable=AsyncMock)
+    def test_chat_endpoint_records_slow_request(self,mock_get_result,client):
+        """Requests over the threshold land in the slow-request log, readable by admins"""
+        from backend.utils.slow_requests import SlowRequestLog
+        from backend.utils.request_timing import annotate_request
+        async def fake_result(*args):
+            annotate_request(metadata={"policy_type":"leave"},scores=[0.91,0.72],prompt_tokens=812)
+            return ["Answer"]
+        mock_get_result.side_effect = fake_result
+        log = SlowRequestLog(threshold_seconds=0, max_entries=5)
+
+        with patch("backend.routes.handbook_routes.get_slow_request_log", return_value=log), \
+             patch("backend.routes.admin_routes.get_slow_request_log", return_value=log):
+            client.post("/chat", json={"question": "What is the leave policy?"})
+            response = client.get("/admin/slow-requests?limit=3")
+
+        assert response.status_code == 200
+        assert response.json()["entries"] == 1
+        entry = response.json()["requests"][0]
+        assert entry["outcome"] == "ok"
+        assert entry["metadata"] == {"policy_type":"leave"}
+        assert entry["scores"] == [0.91,0.72]
+        assert entry["prompt_tokens"] == 812
+        assert "total" in entry["timings"]
+        assert "leave policy" not in str(entry)
+
+    @patch("backend.routes.handbook_routes.get_result", new_callable=AsyncMock)
+    def test_chat_endpoint_profiling(self,mock_get_result,client,monkeypatch,tmp_path):
+        """Admins can profile a request once profiling is enabled, and download the stats"""
+        import pstats
+        mock_get_result.return_value = ["Answer"]
+        monkeypatch.setenv("PROFILES_DIR", str(tmp_path))
+
+        disabled = client.post("/chat", json={"question": "What is the leave policy?"}, headers={"X-Profile-Request": "1"})
+        monkeypatch.setenv("PROFILING_ENABLED", "true")
+        plain = client.post("/chat", json={"question": "What is the leave policy?"})
+        profiled = client.post("/chat?profile=true", json={"question": "What is the leave policy?"})
+        artifact = profiled.headers["X-Profile-Artifact"]
+        download = client.get(f"/admin/profiles/{artifact}")
+
+        assert "X-Profile-Artifact" not in disabled.headers
+        assert "X-Profile-Artifact" not in plain.headers
+        assert profiled.json() == ["Answer"]
+        listing = client.get("/admin/profiles").json()
+        assert listing["profiles"] == [artifact]
+        assert artifact not in listing["unavailable"]
+        assert download.status_code == 200
+        assert pstats.Stats(str(tmp_path / artifact)).total_calls > 0
+        assert client.get("/admin/profiles/..%2Fapp.log").status_code == 404
+
+    def test_chat_endpoint_profiling_forbidden_for_employee(self,monkeypatch):
+        """Only admins can ask for a profile"""
+        from backend.auth.dependencies import get_current_user
+        monkeypatch.setenv("PROFILING_ENABLED", "true")
+        app.dependency_overrides[get_current_user] = lambda: {"user_id": "user", "role": "employee"}
+        try:
+            response = TestClient(app).post("/chat", json={"question": "What is the leave policy?"}, headers={"X-Profile-Request": "1"})
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.status_code == 403
+
+    def test_chat_endpoint_unknown_search_profile(self,client):
+        """Unknown search profiles are rejected"""
+        response = client.post("/chat?search_profile=turbo", json={"question": "What is the leave policy?"})
+
+        assert response.status_code == 400
+
+    def test_chat_endpoint_search_profile_forbidden_for_employee(self):
+        """Only admins can pick a search profile"""
+        from backend.auth.dependencies import get_current_user
+        app.dependency_overrides[get_current_user] = lambda: {"user_id": "user", "role": "employee"}
+        try:
+            response = TestClient(app).post("/chat?search_profile=fast", json={"question": "What is the leave policy?"})
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.status_code == 403
+
     def test_chat_endpoint_empty_question(self,client):
         """Test chat with empty question"""
         query_data = {"question": ""}
@@ -174,4 +352,67 @@ class TestChatEndpoint:
         """Test chat without question field"""
         response = client.post("/chat", json={})
         
-        assert response.status_code == 422  # Validation error
\ No newline at end of file
+        assert response.status_code == 422  # Validation error
+
+
+class TestAdminEndpoints:
+    """Test cases for the admin endpoints"""
+
+    def test_admin_stats_success(self,client):
+        """Admin users can read runtime statistics"""
+        response = client.get("/admin/stats")
+
+        assert response.status_code == 200
+        assert "llm_backends" in response.json()
+        assert len(response.json()["llm_backends"]) >= 1
+        assert "tracked_identifiers" in response.json()["rate_limiter"]
+        assert "hit_ratio" in response.json()["token_cache"]
+        assert "threshold_seconds" in response.json()["slow_requests"]
+
+    def test_admin_reload_rate_limits(self,client,monkeypatch):
+        """Admins can swap in new rate limits without a restart"""
+        from backend.config.rate_limit_config import set_rate_limit_policies
+        monkeypatch.setenv("RATE_LIMIT_UPLOAD_PER_DAY_ADMIN","3")
+        try:
+            response = client.post("/admin/rate-limits/reload")
+            current = client.get("/admin/rate-limits")
+        finally:
+            set_rate_limit_policies(None)
+
+        assert response.status_code == 200
+        assert response.json()["policies"]["admin:upload"]["per_day"] == [3, 86400]
+        assert current.json()["version"] == response.json()["version"]
+
+    def test_admin_reload_rejects_invalid_rate_limits(self,client,monkeypatch):
+        """An invalid configuration is reported and the current limits stay active"""
+        from backend.config.rate_limit_config import set_rate_limit_policies
+        monkeypatch.setenv("RATE_LIMIT_UPLOAD_PER_DAY_ADMIN","-3")
+        try:
+            response = client.post("/admin/rate-limits/reload")
+        finally:
+            set_rate_limit_policies(None)
+
+        assert response.status_code == 400
+        assert "admin.upload: per_day" in response.json()["detail"]
+
+    def test_admin_stats_forbidden_for_employee(self):
+        """Non-admin users get 403"""
+        from backend.auth.dependencies import get_current_user
+        app.dependency_overrides[get_current_user] = lambda: {"user_id": "user", "role": "employee"}
+        try:
+            response = TestClient(app).get("/admin/stats")
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.status_code == 403
+
+    def test_admin_slow_requests_forbidden_for_employee(self):
+        """The slow-request log is admin only, like uploads"""
+        from backend.auth.dependencies import get_current_user
+        app.dependency_overrides[get_current_user] = lambda: {"user_id": "user", "role": "employee"}
+        try:
+            response = TestClient(app).get("/admin/slow-requests")
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.status_code == 403
@@ -17,9 +17,10 @@ from services.generate_metadata import (
     infer_location,
     infer_employee_type
 )
-from services.query_retriever import extract_metadata,build_filter,get_query_retriever
+from services.query_retriever import extract_metadata,build_filter,get_query_retriever,select_relevant_results,plan_search,clear_cardinality_cache,search_handbook,SearchPlan
 from services.final_result import extract_context, clean_output
-from services.handbook_services import add_vectors, get_result
+from services.handbook_services import get_result
+from backend.services.handbook_services import add_vectors
 from fastapi import HTTPException
 from qdrant_client.models import Filter
 
@@ -203,9 +204,30 @@ class TestHandbookServices:
             "sources": []
         }
 
-        mock_get_query_retriever.assert_called_once_with(query, 5)
+        mock_get_query_retriever.assert_called_once_with(query, 5, None)
         mock_extract_context.assert_called_once()
 
+    @pytest.mark.asyncio
+    @patch("services.handbook_services.answer_chain_invoke")
+    @patch("services.handbook_services.get_query_retriever")
+    async def test_get_result_low_score_skips_llm(self,mock_get_query_retriever,mock_answer_chain_invoke):
+        # ARRANGE
+        mock_get_query_retriever.return_value = {
+            "results": [
+                {"id": "1", "score": 0.05, "payload": {"text": "Unrelated chunk"}}
+            ]
+        }
+
+        # ACT
+        result = await get_result("What is the capital of France?")
+
+        # ASSERT
+        assert result == {
+            "answer": "According to the employee handbook this information is not specified.",
+            "sources": []
+        }
+        mock_answer_chain_invoke.assert_not_called()
+
     @pytest.mark.asyncio
     @patch("services.handbook_services.get_query_retriever")
     async def test_get_result_internal_exception(self,mock_get_query_retriever):
@@ -221,17 +243,17 @@ class TestHandbookServices:
         assert exc_info.value.status_code == 500
         assert exc_info.value.detail == "Failed to process query"
 
-        mock_get_query_retriever.assert_called_once_with(query, 5)
+        mock_get_query_retriever.assert_called_once_with(query, 5, None)
 
 
-    @patch("services.handbook_services.client")
-    @patch("services.handbook_services.uuid.uuid4")
-    @patch("services.handbook_services.infer_employee_type")
-    @patch("services.handbook_services.infer_location")
-    @patch("services.handbook_services.infer_section")
-    @patch("services.handbook_services.infer_policy_type")
-    @patch("services.handbook_services.get_embedding")
-    @patch("services.handbook_services.clean_text")
+    @patch("backend.services.handbook_services.client", new_callable=MagicMock)
+    @patch("backend.services.handbook_services.uuid.uuid4")
+    @patch("backend.services.handbook_services.infer_employee_type")
+    @patch("backend.services.handbook_services.infer_location")
+    @patch("backend.services.handbook_services.infer_section")
+    @patch("backend.services.handbook_services.infer_policy_type")
+    @patch("backend.services.handbook_services.get_embedding")
+    @patch("backend.services.handbook_services.clean_text")
     def test_add_vectors_success(self,
         mock_clean_text,
         mock_get_embedding,
@@ -251,7 +273,7 @@ class TestHandbookServices:
         mock_infer_section.return_value = "Policies"
         mock_infer_location.return_value = "General"
         mock_infer_employee.return_value = "Full-Time"
-        mock_uuid.return_value = "test-uuid"
+        mock_uuid.return_value = "0f8fad5b-d9cb-469f-a165-70867728950e"
 
         # ACT
         add_vectors(chunks)
@@ -263,12 +285,12 @@ class TestHandbookServices:
         points = kwargs["points"]
 
         assert len(points) == 2
-        assert points[0]["id"] == "test-uuid"
-        assert points[0]["vector"] == [0.1, 0.2, 0.3]
-        assert points[0]["payload"]["text"] == "Leave policy text"
-        assert points[0]["payload"]["policy_type"] == "Leave"
+        assert points[0].id == "0f8fad5b-d9cb-469f-a165-70867728950e"
+        assert points[0].vector == [0.1, 0.2, 0.3]
+        assert points[0].payload["text"] == "Leave policy text"
+        assert points[0].payload["policy_type"] == "Leave"
 
-    @patch("services.handbook_services.client")
+    @patch("backend.services.handbook_services.client", new_callable=MagicMock)
     def test_add_vectors_empty_chunks(self,mock_client):
         # ARRANGE
         chunks = []
@@ -279,7 +301,7 @@ class TestHandbookServices:
 
         mock_client.upsert.assert_not_called()
 
-    @patch("services.handbook_services.client")
+    @patch("backend.services.handbook_services.client", new_callable=MagicMock)
     def test_add_vectors_none_chunks(self,mock_client):
         with pytest.raises(ValueError):
             add_vectors(None)
@@ -311,10 +333,103 @@ class TestQueryRetriever:
         # ACT
         filter_obj = build_filter(metadata)
 
-        # ASSERT
+        # ASSERT: "General" fields are dropped, confident fields become must clauses
         assert isinstance(filter_obj, Filter)
-        assert filter_obj.should is not None
-        assert len(filter_obj.should) == len(metadata)
+        assert filter_obj.should is None
+        assert [c.key for c in filter_obj.must] == ["policy_type", "section"]
+
+    def test_build_filter_all_general(self):
+        # ARRANGE
+        metadata = {
+            "policy_type": "General",
+            "section": "General",
+            "location": "General",
+            "employee_type": "Astronaut",
+        }
+
+        # ACT + ASSERT
+        assert build_filter(metadata) is None
+
+    @patch("services.query_retriever.client", new_callable=MagicMock)
+    def test_plan_search_selective_filter(self, mock_client):
+        # ARRANGE: 1000 points, 20 of them are Leave policies
+        clear_cardinality_cache()
+        mock_client.count.side_effect = lambda collection_name, count_filter, exact: MagicMock(
+            count=1000 if count_filter is None else 20
+        )
+
+        # ACT
+        plan = plan_search({"policy_type": "Leave", "section": "General"}, limit=5)
+
+        # ASSERT
+        assert plan.query_filter is not None
+        assert plan.post_filter is None
+        assert plan.fetch_limit == 5
+
+    @patch("services.query_retriever.client", new_callable=MagicMock)
+    def test_plan_search_wide_filter_uses_post_filtering(self, mock_client):
+        # ARRANGE: 1000 points, 800 of them are Policies
+        clear_cardinality_cache()
+        mock_client.count.side_effect = lambda collection_name, count_filter, exact: MagicMock(
+            count=1000 if count_filter is None else 800
+        )
+
+        # ACT
+        plan = plan_search({"section": "Policies"}, limit=5)
+
+        # ASSERT
+        assert plan.query_filter is None
+        assert plan.post_filter == {"section": "Policies"}
+        assert plan.fetch_limit > 5
+
+    @patch("services.query_retriever.client", new_callable=MagicMock)
+    def test_plan_search_caches_cardinalities(self, mock_client):
+        # ARRANGE
+        clear_cardinality_cache()
+        mock_client.count.return_value = MagicMock(count=10)
+
+        # ACT
+        plan_search({"location": "Remote"}, limit=5)
+        plan_search({"location": "Remote"}, limit=5)
+
+        # ASSERT: total + one field, fetched once
+        assert mock_client.count.call_count == 2
+
+    def test_select_relevant_results_min_score(self):
+        # ARRANGE
+        results = [
+            {"id": "1", "score": 0.9},
+            {"id": "2", "score": 0.85},
+            {"id": "3", "score": 0.1},
+        ]
+
+        # ACT
+        selected = select_relevant_results(results, min_score=0.3, max_gap=1.0)
+
+        # ASSERT
+        assert [r["id"] for r in selected] == ["1", "2"]
+
+    def test_select_relevant_results_cuts_at_score_gap(self):
+        # ARRANGE
+        results = [
+            {"id": "1", "score": 0.82},
+            {"id": "2", "score": 0.78},
+            {"id": "3", "score": 0.51},
+            {"id": "4", "score": 0.50},
+        ]
+
+        # ACT
+        selected = select_relevant_results(results, min_score=0.2, max_gap=0.15)
+
+        # ASSERT
+        assert [r["id"] for r in selected] == ["1", "2"]
+
+    def test_select_relevant_results_all_below_threshold(self):
+        # ACT
+        selected = select_relevant_results([{"id": "1", "score": 0.1}], min_score=0.3, max_gap=0.15)
+
+        # ASSERT
+        assert selected == []
 
     def test_build_filter_none(self):
         # ACT
@@ -323,8 +438,8 @@ class TestQueryRetriever:
         # ASSERT
         assert result is None
 
-    @patch("services.query_retriever.get_embedding")
-    @patch("services.query_retriever.client")
+    @patch("services.query_retriever.get_query_embedding")
+    @patch("services.query_retriever.client", new_callable=MagicMock)
     @patch("services.query_retriever.extract_metadata")
     def test_get_query_retriever(
         self,
@@ -355,6 +470,10 @@ class TestQueryRetriever:
         mock_search_result.points = [mock_point]
 
         mock_client.query_points.return_value = mock_search_result
+        clear_cardinality_cache()
+        mock_client.count.side_effect = lambda collection_name, count_filter, exact: MagicMock(
+            count=1000 if count_filter is None else 10
+        )
 
         # ACT
         result = get_query_retriever(query, limit=5)
@@ -370,4 +489,20 @@ class TestQueryRetriever:
 
         mock_extract_metadata.assert_called_once_with(query)
         mock_get_embedding.assert_called_once_with(query)
-        mock_client.query_points.assert_called_once()
\ No newline at end of file
+        mock_client.query_points.assert_called_once()
+        assert mock_client.query_points.call_args.kwargs["search_params"].hnsw_ef is not None
+
+    @patch("services.query_retriever.plan_search")
+    @patch("services.query_retriever.client", new_callable=MagicMock)
+    def test_search_handbook_exact_profile(self, mock_client, mock_plan_search):
+        # ARRANGE
+        mock_plan_search.return_value = SearchPlan(None, None, 5)
+        mock_client.query_points.return_value = MagicMock(points=[])
+
+        # ACT
+        search_handbook([0.1, 0.2], {}, limit=5, search_profile="exact")
+
+        # ASSERT
+        search_params = mock_client.query_points.call_args.kwargs["search_params"]
+        assert search_params.exact is True
+        assert search_params.quantization.ignore is True
\ No newline at end of file
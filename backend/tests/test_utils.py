@@ -1,14 +1,37 @@
 import time
-from backend.utils.rate_limiter import get_rate_limiter
+from backend.utils.rate_limiter import get_rate_limiter,set_rate_limiter,sliding_window_check,InMemoryRateLimiter
+from backend.utils.shared_rate_limiter import SharedMemoryRateLimiter
+from backend.utils.redis_rate_limiter import RedisRateLimiter
+import redis
 from backend.utils.pdf_loader import load_pdf
 from backend.utils.chunker import chunk_text,clean_text
-from backend.utils.embeddings import get_embedding
+from backend.utils.embeddings import get_embedding,get_query_embedding,get_query_cache,EmbeddingCache
+from backend.utils.embedding_batcher import EmbeddingBatcher
+from backend.utils.embedding_workers import EmbeddingWorkerClient,EmbeddingWorkerPool,handle_connection,serve_forever
+import os
+import sys
+import signal
+import socket
+import struct
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from backend.utils.llm_setup import set_llm
+from backend.utils.llm_pool import OllamaBackendPool,NoBackendAvailableError
+from backend.utils.admission import AdmissionController,AdmissionRejectedError
+import asyncio
 import pytest
 from fastapi import status,FastAPI
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock, patch
 from backend.middleware.rate_limit_middleware import RateLimitMiddleware
+from backend.utils.metrics import Counter,Histogram,Registry,CACHE_REQUESTS,RATE_LIMIT_REJECTIONS,STAGE_SECONDS,time_stage
+from backend.utils.request_timing import current_timings,RequestTimings
+from backend.utils.slow_requests import SlowRequestLog,question_hash
+from backend.utils.profiling import RequestProfiler,list_profiles,get_profile_path,unavailable_profiles
+from backend.middleware.server_timing_middleware import ServerTimingMiddleware
 
 class TestPdfLoader:
     def test_pdf_loader_success(self,sample_pdf_path):
@@ -106,6 +129,236 @@ class TestEmbeddings:
         with pytest.raises(TypeError):
             get_embedding(None)
 
+class TestQueryEmbeddingCache:
+    @patch("backend.utils.embeddings.get_embedding_model")
+    def test_repeat_question_skips_model(self,mock_get_model):
+        # ARRANGE
+        get_query_cache().clear()
+        mock_get_model.return_value.embed_documents.side_effect=lambda texts:[[0.1,0.2,0.3] for _ in texts]
+
+        # ACT
+        first=get_query_embedding("What is the leave policy?")
+        second=get_query_embedding("  What is the   leave policy? ")
+
+        # ASSERT
+        assert first.dtype==np.float32
+        assert second is first
+        mock_get_model.return_value.embed_documents.assert_called_once()
+        stats=get_query_cache().stats()
+        assert stats["hits"]==1
+        assert stats["misses"]==1
+        assert stats["hit_ratio"]==0.5
+        assert stats["memory_bytes"]>=first.nbytes
+
+    def test_cache_evicts_least_recently_used(self):
+        # ARRANGE
+        cache=EmbeddingCache(max_entries=2)
+        vector=np.zeros(4,dtype=np.float32)
+        cache.put("a",vector)
+        cache.put("b",vector)
+
+        # ACT
+        cache.get("a")
+        cache.put("c",vector)
+
+        # ASSERT
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.stats()["entries"]==2
+
+    def test_exported_counters_survive_clear(self):
+        """handbook_cache_requests_total is a counter, clear() must not make it go down"""
+        # ARRANGE
+        cache=EmbeddingCache(max_entries=2,name="test_cache")
+        cache.put("a",np.zeros(4,dtype=np.float32))
+        cache.get("a")
+        cache.get("b")
+
+        # ACT
+        cache.clear()
+        cache.get("a")
+
+        # ASSERT
+        assert cache.stats()["misses"]==1
+        assert CACHE_REQUESTS.labels("test_cache","hit").get()==1
+        assert CACHE_REQUESTS.labels("test_cache","miss").get()==2
+
+class TestEmbeddingBatcher:
+    def test_concurrent_requests_share_a_batch(self):
+        # ARRANGE
+        calls=[]
+        def embed_batch(texts):
+            calls.append(list(texts))
+            time.sleep(0.01)
+            return [[float(len(t))] for t in texts]
+        batcher=EmbeddingBatcher(embed_batch,max_batch_size=16,window_seconds=0.05)
+        texts=[f"question {'x'*i}" for i in range(8)]
+
+        # ACT
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            vectors=list(pool.map(batcher.embed,texts))
+
+        # ASSERT: every caller gets its own vector from fewer model calls
+        assert vectors==[[float(len(t))] for t in texts]
+        assert len(calls)<len(texts)
+        assert batcher.stats()["items"]==8
+
+    def test_duplicate_texts_embedded_once(self):
+        # ARRANGE
+        calls=[]
+        def embed_batch(texts):
+            calls.append(list(texts))
+            return [[1.0] for _ in texts]
+        batcher=EmbeddingBatcher(embed_batch,max_batch_size=4,window_seconds=0.05)
+
+        # ACT
+        futures=[batcher.submit("same question") for _ in range(3)]
+
+        # ASSERT
+        assert [f.result(1) for f in futures]==[[1.0]]*3
+        assert all(c==["same question"] for c in calls)
+
+    def test_model_error_reaches_every_caller(self):
+        # ARRANGE
+        def embed_batch(texts):
+            raise RuntimeError("model crashed")
+        batcher=EmbeddingBatcher(embed_batch)
+
+        # ACT + ASSERT
+        with pytest.raises(RuntimeError):
+            batcher.embed("question",timeout=1)
+
+    def test_missing_vectors_fail_callers_and_worker_survives(self):
+        # ARRANGE
+        responses=[[],[[2.0]]]
+        batcher=EmbeddingBatcher(lambda texts: responses.pop(0),window_seconds=0)
+
+        # ACT + ASSERT: the short batch fails its caller, the next batch is still served
+        with pytest.raises(ValueError):
+            batcher.embed("question",timeout=1)
+        assert batcher.embed("question",timeout=1)==[2.0]
+
+    def test_embed_times_out_by_default(self):
+        # ARRANGE
+        release=threading.Event()
+        def embed_batch(texts):
+            release.wait(5)
+            return [[1.0] for _ in texts]
+        batcher=EmbeddingBatcher(embed_batch,window_seconds=0,timeout_seconds=0.05)
+
+        # ACT + ASSERT: the caller gives up, the worker skips its cancelled future
+        with pytest.raises(TimeoutError):
+            batcher.embed("slow question")
+        release.set()
+        assert batcher.embed("next question",timeout=1)==[1.0]
+
+@pytest.fixture
+def embedding_worker_socket():
+    """Embedding worker serving a fake model on a temporary Unix socket"""
+    socket_path=os.path.join(tempfile.mkdtemp(),"embed.sock")
+    listener=socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(8)
+
+    def fake_embed_documents(texts):
+        if "boom" in texts:
+            raise ValueError("bad input")
+        return [[float(len(t)),1.0,2.0] for t in texts]
+
+    threading.Thread(target=serve_forever,args=(listener,fake_embed_documents),daemon=True).start()
+    yield socket_path
+    listener.close()
+    os.unlink(socket_path)
+
+class TestEmbeddingWorkers:
+    def test_client_round_trip(self,embedding_worker_socket):
+        # ARRANGE
+        client=EmbeddingWorkerClient(embedding_worker_socket,timeout=5)
+
+        # ACT
+        vectors=client.embed_documents(["leave","payroll policy"])
+
+        # ASSERT
+        assert vectors.dtype==np.float32
+        assert vectors.shape==(2,3)
+        assert vectors[1].tolist()==[14.0,1.0,2.0]
+
+    def test_worker_error_is_raised(self,embedding_worker_socket):
+        # ARRANGE
+        client=EmbeddingWorkerClient(embedding_worker_socket,timeout=5)
+
+        # ACT + ASSERT
+        with pytest.raises(RuntimeError,match="bad input"):
+            client.embed_documents(["boom"])
+
+    def test_oversized_request_is_rejected(self):
+        # ARRANGE
+        server,client=socket.socketpair()
+        client.sendall(struct.pack(">I",2**31))
+
+        # ACT
+        handle_connection(server,lambda texts: [[1.0] for _ in texts],timeout=1,max_request_bytes=1024)
+
+        # ASSERT: an error frame instead of a 2 GB read
+        assert client.recv(1)==b"E"
+        assert b"exceeds" in client.recv(4096)
+        client.close()
+
+    def test_stalled_client_is_dropped(self):
+        # ARRANGE
+        server,client=socket.socketpair()
+        client.sendall(b"\x00\x00")
+
+        # ACT
+        started=time.monotonic()
+        handle_connection(server,lambda texts: [[1.0] for _ in texts],timeout=0.05)
+
+        # ASSERT
+        assert time.monotonic()-started<1
+        assert client.recv(1)==b""
+        client.close()
+
+    def test_socket_is_private(self):
+        # ARRANGE
+        pool=EmbeddingWorkerPool(os.path.join(tempfile.mkdtemp(),"embed.sock"),workers=0)
+
+        # ACT
+        pool.start()
+        try:
+            mode=os.stat(pool.socket_path).st_mode&0o777
+        finally:
+            pool.stop()
+
+        # ASSERT
+        assert mode==0o600
+
+    def test_terminated_worker_leaves_socket_in_place(self,monkeypatch):
+        """A worker must not run the supervisor's SIGTERM handler and unlink the shared socket"""
+        # ARRANGE
+        class FakeModel:
+            def embed_documents(self,texts):
+                return [[1.0,2.0] for _ in texts]
+        monkeypatch.setattr("backend.utils.embeddings.get_embedding_model",lambda: FakeModel())
+        pool=EmbeddingWorkerPool(os.path.join(tempfile.mkdtemp(),"embed.sock"),workers=1)
+        previous_handler=signal.getsignal(signal.SIGTERM)
+        signal.signal(signal.SIGTERM,lambda signum,frame: pool.stop())
+        try:
+            pool.start()
+            # Once it answers, the worker has installed its own signal handlers
+            EmbeddingWorkerClient(pool.socket_path,timeout=10).embed_documents(["leave"])
+            worker=pool._processes[0]
+
+            # ACT
+            os.kill(worker.pid,signal.SIGTERM)
+            worker.join(5)
+
+            # ASSERT
+            assert worker.exitcode==-signal.SIGTERM
+            assert os.path.exists(pool.socket_path)
+        finally:
+            signal.signal(signal.SIGTERM,previous_handler)
+            pool.stop()
+
 class TestLLMSetup:
     def test_llm_setup_success(self):
         """Test LLM setup success"""
@@ -119,18 +372,216 @@ class TestLLMSetup:
         # ASSERT
         assert llm is not None
 
+class TestLLMPool:
+    def test_acquire_routes_to_least_loaded_backend(self):
+        # ARRANGE
+        pool=OllamaBackendPool(["http://a:11434","http://b:11434"],max_concurrency=2)
+
+        # ACT
+        with pool.acquire() as first:
+            with pool.acquire() as second:
+                # ASSERT
+                assert first.base_url!=second.base_url
+
+        assert all(b["in_flight"]==0 for b in pool.stats())
+
+    def test_acquire_times_out_when_all_slots_busy(self):
+        # ARRANGE
+        pool=OllamaBackendPool(["http://a:11434"],max_concurrency=1)
+
+        # ACT + ASSERT
+        with pool.acquire():
+            with pytest.raises(NoBackendAvailableError):
+                with pool.acquire(timeout=0.01):
+                    pass
+
+    def test_backend_ejected_after_failures_and_probed_back(self):
+        # ARRANGE
+        pool=OllamaBackendPool(["http://a:11434","http://b:11434"],failure_threshold=1,eject_seconds=0.05)
+
+        # ACT
+        with pytest.raises(ConnectionError):
+            with pool.acquire() as backend:
+                assert backend.base_url=="http://a:11434"
+                raise ConnectionError("connection refused")
+
+        # ASSERT: ejected backend is skipped while cooling down
+        assert pool.stats()[0]["healthy"] is False
+        with pool.acquire() as backend:
+            assert backend.base_url=="http://b:11434"
+
+        # ASSERT: after the cool-down a successful probe restores it
+        time.sleep(0.06)
+        with pool.acquire() as first:
+            with pool.acquire() as second:
+                assert {first.base_url,second.base_url}=={"http://a:11434","http://b:11434"}
+        assert pool.stats()[0]["healthy"] is True
+
+    def test_all_backends_ejected_fails_fast(self):
+        # ARRANGE
+        pool=OllamaBackendPool(["http://a:11434"],failure_threshold=1,eject_seconds=60)
+        with pytest.raises(ConnectionError):
+            with pool.acquire():
+                raise ConnectionError("connection refused")
+
+        # ACT + ASSERT
+        with pytest.raises(NoBackendAvailableError):
+            with pool.acquire(timeout=5):
+                pass
+
+class TestAdmissionController:
+    def test_rejects_max_concurrent_below_one(self):
+        # ACT + ASSERT
+        with pytest.raises(ValueError,match="must be at least 1"):
+            AdmissionController(max_concurrent=0,max_queue=1,max_wait_seconds=1)
+
+    @pytest.mark.asyncio
+    async def test_admit_under_capacity(self):
+        # ARRANGE
+        controller=AdmissionController(max_concurrent=2,max_queue=1,max_wait_seconds=1)
+
+        # ACT
+        async with controller.admit():
+            stats=controller.stats()
+
+        # ASSERT
+        assert stats["in_flight"]==1
+        assert controller.stats()["in_flight"]==0
+        assert controller.stats()["admitted"]==1
+
+    @pytest.mark.asyncio
+    async def test_sheds_when_queue_full(self):
+        # ARRANGE
+        controller=AdmissionController(max_concurrent=1,max_queue=0,max_wait_seconds=1)
+
+        # ACT + ASSERT
+        async with controller.admit():
+            with pytest.raises(AdmissionRejectedError) as exc_info:
+                async with controller.admit():
+                    pass
+
+        assert exc_info.value.reason=="queue_full"
+        assert exc_info.value.retry_after>=1
+        assert controller.stats()["shed_queue_full"]==1
+
+    @pytest.mark.asyncio
+    async def test_sheds_after_max_wait(self):
+        # ARRANGE
+        controller=AdmissionController(max_concurrent=1,max_queue=1,max_wait_seconds=0.01)
+
+        # ACT + ASSERT
+        async with controller.admit():
+            with pytest.raises(AdmissionRejectedError) as exc_info:
+                async with controller.admit():
+                    pass
+
+        assert exc_info.value.reason=="queue_timeout"
+        assert controller.stats()["queued"]==0
+        assert controller.stats()["shed_timeout"]==1
+
+    @pytest.mark.asyncio
+    async def test_queued_request_gets_released_slot(self):
+        # ARRANGE
+        controller=AdmissionController(max_concurrent=1,max_queue=1,max_wait_seconds=1)
+        order=[]
+
+        async def worker(name):
+            async with controller.admit():
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        # ACT
+        await asyncio.gather(worker("first"),worker("second"))
+
+        # ASSERT
+        assert order==["first","second"]
+        assert controller.stats()["in_flight"]==0
+        assert controller.stats()["admitted"]==2
+
+    @pytest.mark.asyncio
+    async def test_higher_priority_waiter_served_first(self):
+        # ARRANGE
+        controller=AdmissionController(max_concurrent=1,max_queue=2,max_wait_seconds=1,aging_per_second=0)
+        order=[]
+        release=asyncio.Event()
+
+        async def holder():
+            async with controller.admit():
+                await release.wait()
+
+        async def worker(name,priority):
+            async with controller.admit(priority):
+                order.append(name)
+
+        # ACT
+        holding=asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        low=asyncio.create_task(worker("background",1))
+        await asyncio.sleep(0)
+        high=asyncio.create_task(worker("chat",20))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holding,low,high)
+
+        # ASSERT
+        assert order==["chat","background"]
+
+    @pytest.mark.asyncio
+    async def test_full_queue_preempts_lower_priority(self):
+        # ARRANGE
+        controller=AdmissionController(max_concurrent=1,max_queue=1,max_wait_seconds=1,aging_per_second=0)
+
+        async def worker(priority):
+            async with controller.admit(priority):
+                pass
+
+        # ACT
+        async with controller.admit():
+            low=asyncio.create_task(worker(1))
+            await asyncio.sleep(0)
+            high=asyncio.create_task(worker(20))
+            await asyncio.sleep(0)
+
+        # ASSERT
+        with pytest.raises(AdmissionRejectedError) as exc_info:
+            await low
+        await high
+        assert exc_info.value.reason=="preempted"
+        assert controller.stats()["shed_preempted"]==1
+
+    @pytest.mark.asyncio
+    async def test_aging_prevents_starvation(self):
+        # ARRANGE
+        controller=AdmissionController(max_concurrent=1,max_queue=1,max_wait_seconds=1,aging_per_second=1000)
+
+        async def worker(priority):
+            async with controller.admit(priority):
+                pass
+
+        # ACT: the old low-priority waiter has aged past the newcomer
+        async with controller.admit():
+            low=asyncio.create_task(worker(1))
+            await asyncio.sleep(0.05)
+            with pytest.raises(AdmissionRejectedError) as exc_info:
+                await worker(20)
+
+        # ASSERT
+        await low
+        assert exc_info.value.reason=="queue_full"
+
 class TestRateLimiter:
-    def test_clean_old_enteries_success(self):
+    def test_reset_single_identifier(self):
         # ARRANGE
-        limiter=get_rate_limiter()
-        now=time.time()
-        limiter._storage["test"]["test"]=[now-11]
+        limiter=InMemoryRateLimiter()
+        limiter.check_rate_limit("user1",1,60)
+        limiter.check_rate_limit("user2",5,60)
 
         # ACT
-        limiter._cleanup_old_entries(identifier="test",window="test",window_seconds=10)
+        limiter.reset("user1")
 
         # ASSERT
-        assert limiter._storage["test"]["test"]==[]
+        assert limiter.stats()["tracked_identifiers"]==1
+        assert limiter.check_rate_limit("user1",1,60)==(True,None)
 
     def test_check_rate_limit_allows_first_request(self):
         limiter = get_rate_limiter()
@@ -201,6 +652,129 @@ class TestRateLimiter:
         assert retry_after is not None
         assert violated == "per_minute"
         
+    def test_state_size_is_constant(self):
+        limiter = get_rate_limiter()
+        limiter.reset()
+
+        for _ in range(1000):
+            limiter.check_rate_limit("ip:1.2.3.4:global", 1000, 3600, "per_hour")
+
+        allowed, retry_after = limiter.check_rate_limit("ip:1.2.3.4:global", 1000, 3600, "per_hour")
+
+        assert allowed is False
+        assert retry_after >= 1
+        identifier = "ip:1.2.3.4:global"
+        assert len(limiter._shard_for(identifier).storage[identifier]["per_hour"]) == 3
+
+    def test_previous_window_counts_toward_limit(self):
+        limiter = get_rate_limiter()
+        limiter.reset()
+        window_start = 600000.0
+        # 10 requests in the previous minute and 5 in this one
+        limiter._shard_for("user1").storage["user1"] = {"per_minute": [window_start, 10, 5]}
+
+        with patch("backend.utils.rate_limiter.time.time", return_value=window_start + 15):
+            blocked, retry_after = limiter.check_rate_limit("user1", 10, 60, "per_minute")
+        with patch("backend.utils.rate_limiter.time.time", return_value=window_start + 31):
+            allowed, _ = limiter.check_rate_limit("user1", 10, 60, "per_minute")
+
+        assert blocked is False
+        assert retry_after == 15
+        assert allowed is True
+
+    def test_burst_allows_burst_then_spaces_requests(self):
+        limiter = get_rate_limiter()
+        limiter.reset()
+
+        # 60 per minute on average, at most 5 at once
+        results = [limiter.check_rate_limit("user1", 60, 60, "per_minute", burst=5)[0] for _ in range(6)]
+        allowed, retry_after = limiter.check_rate_limit("user1", 60, 60, "per_minute", burst=5)
+
+        assert results == [True] * 5 + [False]
+        assert allowed is False
+        assert retry_after == 1
+
+    def test_multiple_limits_accept_burst_windows(self):
+        limiter = get_rate_limiter()
+        limiter.reset()
+
+        limits = {"per_minute": (10, 60, 2), "per_hour": (100, 3600)}
+
+        results = [limiter.check_multiple_limits("user1", limits) for _ in range(3)]
+
+        assert results[0] == (True, None, None)
+        assert results[2][0] is False
+        assert results[2][2] == "per_minute"
+
+    def test_idle_identifiers_are_evicted_after_their_windows_expire(self):
+        limiter = InMemoryRateLimiter(shards=1)
+        with patch("backend.utils.rate_limiter.time.time", return_value=600000.0):
+            for i in range(3):
+                limiter.check_rate_limit(f"ip:10.0.0.{i}:global", 100, 60, "per_minute")
+
+        # Two minutes later both windows of the idle identifiers are over
+        with patch("backend.utils.rate_limiter.time.time", return_value=600120.0):
+            limiter.check_rate_limit("ip:10.0.0.9:global", 100, 60, "per_minute")
+            limiter.check_rate_limit("ip:10.0.0.9:global", 100, 60, "per_minute")
+
+        assert list(limiter._shards[0].storage) == ["ip:10.0.0.9:global"]
+        assert limiter.stats()["evicted_expired"] == 3
+
+    def test_cap_evicts_least_recently_used(self):
+        limiter = InMemoryRateLimiter(max_identifiers=2, overflow_policy="evict_oldest", shards=1)
+
+        limiter.check_rate_limit("a", 5, 60)
+        limiter.check_rate_limit("b", 5, 60)
+        limiter.check_rate_limit("a", 5, 60)
+        allowed, _ = limiter.check_rate_limit("c", 5, 60)
+
+        assert allowed is True
+        assert list(limiter._shards[0].storage) == ["a", "c"]
+        assert limiter.stats()["evicted_overflow"] == 1
+
+    def test_cap_rejects_new_identifiers(self):
+        limiter = InMemoryRateLimiter(max_identifiers=1, overflow_policy="reject", shards=1)
+
+        limiter.check_rate_limit("a", 5, 60)
+        allowed, retry_after = limiter.check_rate_limit("b", 5, 60)
+        known_allowed, _ = limiter.check_rate_limit("a", 5, 60)
+
+        assert allowed is False
+        assert retry_after >= 1
+        assert known_allowed is True
+        assert limiter.stats()["rejected_overflow"] == 1
+
+    def test_stats_report_tracked_identifiers_and_memory(self):
+        limiter = InMemoryRateLimiter()
+
+        for i in range(10):
+            limiter.check_multiple_limits(f"user:{i}:chat", {"per_minute": (5, 60), "per_hour": (50, 3600)})
+        stats = limiter.stats()
+
+        assert stats["tracked_identifiers"] == 10
+        assert stats["memory_bytes"] > 0
+
+    def test_multiple_limits_do_not_burn_quota_on_rejection(self):
+        limiter = InMemoryRateLimiter()
+        limits = {"per_minute": (5, 60), "per_hour": (1, 3600)}
+
+        limiter.check_multiple_limits("user1", limits)
+        allowed, _, violated = limiter.check_multiple_limits("user1", limits)
+
+        assert allowed is False
+        assert violated == "per_hour"
+        # Only the first, allowed request was recorded in per_minute
+        assert limiter._shard_for("user1").storage["user1"]["per_minute"][2] == 1
+
+    def test_concurrent_checks_never_exceed_limit(self):
+        limiter = InMemoryRateLimiter()
+        limits = {"per_minute": (50, 60), "per_hour": (100, 3600)}
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: limiter.check_multiple_limits("user1", limits)[0], range(200)))
+
+        assert sum(results) == 50
+
     def test_reset_all_identifiers(self):
         limiter = get_rate_limiter()
         limiter.reset()
@@ -210,7 +784,260 @@ class TestRateLimiter:
 
         limiter.reset()
 
-        assert limiter._storage == {}
+        assert limiter.stats()["tracked_identifiers"] == 0
+
+class TestSlidingWindowCheck:
+    def test_previous_window_is_weighted_by_overlap(self):
+        # ACT: 10 requests last window, 60% of this window elapsed -> estimate 4 + 2
+        allowed, _ = sliding_window_check(10, 2, 0, 36, 7, 60)
+        blocked, retry_after = sliding_window_check(10, 2, 0, 36, 5, 60)
+
+        # ASSERT
+        assert allowed is True
+        assert blocked is False
+        assert retry_after == 6
+
+    def test_full_current_window_waits_for_next_window(self):
+        # ACT
+        allowed, retry_after = sliding_window_check(0, 5, 0, 10, 5, 60)
+
+        # ASSERT
+        assert allowed is False
+        assert retry_after == 50
+
+
+class TestSharedMemoryRateLimiter:
+    @pytest.fixture
+    def shared_limiter(self, tmp_path):
+        limiter = SharedMemoryRateLimiter(str(tmp_path / "limits"), groups=64)
+        yield limiter
+        limiter.close()
+
+    def test_blocks_when_limit_exceeded(self, shared_limiter):
+        # ACT
+        results = [shared_limiter.check_rate_limit("user1", 3, 60)[0] for _ in range(4)]
+        allowed, retry_after = shared_limiter.check_rate_limit("user1", 3, 60)
+
+        # ASSERT
+        assert results == [True, True, True, False]
+        assert allowed is False
+        assert retry_after >= 1
+
+    def test_state_is_shared_between_instances(self, shared_limiter, tmp_path):
+        # ARRANGE
+        other = SharedMemoryRateLimiter(str(tmp_path / "limits"), groups=64)
+
+        # ACT
+        shared_limiter.check_rate_limit("ip:1.2.3.4:login", 2, 900, "per_15min")
+        other.check_rate_limit("ip:1.2.3.4:login", 2, 900, "per_15min")
+        allowed, _ = shared_limiter.check_rate_limit("ip:1.2.3.4:login", 2, 900, "per_15min")
+        other.close()
+
+        # ASSERT
+        assert allowed is False
+
+    def test_limit_holds_across_processes(self, shared_limiter, tmp_path):
+        # ARRANGE
+        script = (
+            "import sys\n"
+            "from backend.utils.shared_rate_limiter import SharedMemoryRateLimiter\n"
+            "limiter = SharedMemoryRateLimiter(sys.argv[1], groups=64)\n"
+            "print(sum(limiter.check_rate_limit('user1', 25, 60)[0] for _ in range(20)))\n"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+        # ACT
+        processes = [
+            subprocess.Popen([sys.executable, "-c", script, str(tmp_path / "limits")],
+                             cwd=root, stdout=subprocess.PIPE, text=True)
+            for _ in range(4)
+        ]
+        allowed = sum(int(p.communicate(timeout=60)[0]) for p in processes)
+
+        # ASSERT
+        assert allowed == 25
+
+    def test_multiple_limits_count_only_when_all_allow(self, shared_limiter):
+        # ARRANGE
+        limits = {"per_minute": (5, 60), "per_hour": (1, 3600)}
+
+        # ACT
+        first = shared_limiter.check_multiple_limits("user1", limits)
+        second = shared_limiter.check_multiple_limits("user1", limits)
+        minute_allowed = [shared_limiter.check_rate_limit("user1", 5, 60, "per_minute")[0] for _ in range(5)]
+
+        # ASSERT
+        assert first == (True, None, None)
+        assert second[0] is False and second[2] == "per_hour"
+        # Only the first request was recorded in per_minute
+        assert minute_allowed == [True, True, True, True, False]
+
+    def test_burst_window(self, shared_limiter):
+        # ACT
+        results = [shared_limiter.check_rate_limit("user1", 60, 60, "per_minute", burst=3)[0] for _ in range(4)]
+
+        # ASSERT
+        assert results == [True, True, True, False]
+
+    def test_reset_identifier(self, shared_limiter):
+        # ARRANGE
+        shared_limiter.check_rate_limit("user1", 1, 60)
+        shared_limiter.check_rate_limit("user2", 1, 60)
+
+        # ACT
+        shared_limiter.reset("user1")
+
+        # ASSERT
+        assert shared_limiter.check_rate_limit("user1", 1, 60)[0] is True
+        assert shared_limiter.check_rate_limit("user2", 1, 60)[0] is False
+
+    def test_layout_change_replaces_table(self, shared_limiter, tmp_path):
+        # ARRANGE
+        shared_limiter.check_rate_limit("user1", 1, 60)
+
+        # ACT
+        resized = SharedMemoryRateLimiter(str(tmp_path / "limits"), groups=128)
+        allowed, _ = resized.check_rate_limit("user1", 1, 60)
+        resized.close()
+
+        # ASSERT
+        assert allowed is True
+
+class TestRedisRateLimiter:
+    @pytest.fixture
+    def redis_limiter(self, fake_redis):
+        return RedisRateLimiter(redis.Redis.from_url(fake_redis.url, socket_timeout=1), retry_seconds=60)
+
+    def test_blocks_when_limit_exceeded(self, redis_limiter):
+        # ACT
+        results = [redis_limiter.check_rate_limit("user1", 3, 60)[0] for _ in range(3)]
+        allowed, retry_after = redis_limiter.check_rate_limit("user1", 3, 60)
+
+        # ASSERT
+        assert results == [True, True, True]
+        assert allowed is False
+        assert retry_after >= 1
+
+    def test_multiple_limits_use_one_round_trip(self, redis_limiter, fake_redis):
+        # ARRANGE
+        limits = {"per_minute": (5, 60), "per_hour": (1, 3600)}
+        redis_limiter.check_multiple_limits("user1", limits)
+        fake_redis.commands.clear()
+
+        # ACT
+        allowed, retry_after, violated = redis_limiter.check_multiple_limits("user1", limits)
+
+        # ASSERT
+        assert fake_redis.commands == ["EVALSHA"]
+        assert allowed is False
+        assert violated == "per_hour"
+        # The rejected request was not counted in per_minute
+        assert fake_redis.hashes["ratelimit:{user1}:per_minute"]["c"] == "1"
+
+    def test_limits_are_shared_between_nodes(self, redis_limiter, fake_redis):
+        # ARRANGE
+        other_node = RedisRateLimiter(redis.Redis.from_url(fake_redis.url, socket_timeout=1))
+
+        # ACT
+        redis_limiter.check_rate_limit("ip:1.2.3.4:login", 1, 900, "per_15min")
+        allowed, _ = other_node.check_rate_limit("ip:1.2.3.4:login", 1, 900, "per_15min")
+
+        # ASSERT
+        assert allowed is False
+
+    def test_falls_back_to_local_limits_when_unreachable(self, redis_limiter, fake_redis):
+        # ARRANGE
+        fake_redis.stop()
+
+        # ACT
+        first = redis_limiter.check_rate_limit("user1", 1, 60)
+        second = redis_limiter.check_rate_limit("user1", 1, 60)
+
+        # ASSERT
+        assert first == (True, None)
+        assert second[0] is False
+        stats = redis_limiter.stats()
+        assert stats["available"] is False
+        assert stats["fallback_checks"] == 2
+        assert stats["errors"] == 1
+
+    def test_retries_store_after_outage(self, fake_redis):
+        # ARRANGE
+        client = redis.Redis.from_url(fake_redis.url, socket_timeout=1)
+        limiter = RedisRateLimiter(client, retry_seconds=0)
+        limiter._mark_unavailable(RuntimeError("connection refused"))
+
+        # ACT
+        limiter.check_rate_limit("user1", 5, 60)
+
+        # ASSERT
+        assert limiter.stats()["remote_checks"] == 1
+
+    def test_burst_window(self, redis_limiter):
+        # ACT
+        results = [redis_limiter.check_rate_limit("user1", 60, 60, "per_minute", burst=3)[0] for _ in range(4)]
+
+        # ASSERT
+        assert results == [True, True, True, False]
+
+    def test_reset_identifier(self, redis_limiter, fake_redis):
+        # ARRANGE
+        redis_limiter.check_rate_limit("user1", 1, 60)
+        redis_limiter.check_rate_limit("user2", 1, 60)
+
+        # ACT
+        redis_limiter.reset("user1")
+
+        # ASSERT
+        assert redis_limiter.check_rate_limit("user1", 1, 60)[0] is True
+        assert redis_limiter.check_rate_limit("user2", 1, 60)[0] is False
+
+    def test_get_rate_limiter_selects_redis_backend(self, monkeypatch, fake_redis):
+        # ARRANGE
+        monkeypatch.setenv("RATE_LIMIT_BACKEND", "redis")
+        monkeypatch.setenv("RATE_LIMIT_REDIS_URL", fake_redis.url)
+        set_rate_limiter(None)
+
+        # ACT
+        try:
+            limiter = get_rate_limiter()
+        finally:
+            set_rate_limiter(None)
+
+        # ASSERT
+        assert isinstance(limiter, RedisRateLimiter)
+
+class TestRedisRateLimiterScript:
+    """Runs the real SLIDING_WINDOW_SCRIPT; the fake_redis tests only exercise its Python port"""
+
+    @pytest.fixture
+    def limiter(self, lua_redis):
+        return RedisRateLimiter(lua_redis, retry_seconds=60)
+
+    def test_sliding_window_blocks_and_reports_violated_window(self, limiter, lua_redis):
+        # ARRANGE
+        limits = {"per_minute": (5, 60), "per_hour": (2, 3600)}
+
+        # ACT
+        results = [limiter.check_multiple_limits("user1", limits) for _ in range(3)]
+
+        # ASSERT
+        assert [r[0] for r in results] == [True, True, False]
+        assert results[2][2] == "per_hour" and results[2][1] >= 1
+        assert limiter.stats()["remote_checks"] == 3 and limiter.stats()["errors"] == 0
+        # The rejected request was not counted, state is kept for two windows
+        state = lua_redis.hgetall("ratelimit:{user1}:per_minute")
+        assert int(state[b"c"]) == 2
+        assert 60 < lua_redis.ttl("ratelimit:{user1}:per_minute") <= 120
+
+    def test_burst_window_uses_gcra_state(self, limiter, lua_redis):
+        # ACT
+        results = [limiter.check_rate_limit("user1", 60, 60, "per_minute", burst=3)[0] for _ in range(4)]
+
+        # ASSERT
+        assert results == [True, True, True, False]
+        assert float(lua_redis.hget("ratelimit:{user1}:per_minute", "t")) > time.time()
+        assert 0 < lua_redis.ttl("ratelimit:{user1}:per_minute") <= 10
 
 def create_test_app():
         app = FastAPI()
@@ -225,6 +1052,207 @@ def create_test_app():
 
         return app
 
+class TestMetrics:
+    def test_counter_renders_labels(self):
+        # ARRANGE
+        registry=Registry()
+        counter=Counter("test_requests_total","Requests.",("endpoint",),registry=registry)
+
+        # ACT
+        counter.labels("chat").inc()
+        counter.labels("chat").inc(2)
+        counter.labels('say "hi"').inc()
+
+        # ASSERT
+        text=registry.render()
+        assert "# HELP test_requests_total Requests.\n# TYPE test_requests_total counter" in text
+        assert 'test_requests_total{endpoint="chat"} 3.0' in text
+        assert 'test_requests_total{endpoint="say \\"hi\\""} 1.0' in text
+
+    def test_counter_reads_function_at_scrape(self):
+        registry=Registry()
+        counter=Counter("test_hits_total","Hits.",("cache",),registry=registry)
+        source={"hits":4}
+        counter.labels("query").set_function(lambda: source["hits"])
+
+        assert 'test_hits_total{cache="query"} 4.0' in registry.render()
+
+    def test_histogram_buckets_are_cumulative(self):
+        # ARRANGE
+        registry=Registry()
+        histogram=Histogram("test_seconds","Latency.",buckets=(0.1,1.0),registry=registry)
+
+        # ACT
+        for value in (0.05,0.1,0.5,3.0):
+            histogram.observe(value)
+
+        # ASSERT
+        text=registry.render()
+        assert 'test_seconds_bucket{le="0.1"} 2' in text
+        assert 'test_seconds_bucket{le="1.0"} 3' in text
+        assert 'test_seconds_bucket{le="+Inf"} 4' in text
+        assert "test_seconds_count 4" in text
+        assert "test_seconds_sum 3.65" in text
+
+    def test_labels_must_match(self):
+        with pytest.raises(ValueError):
+            STAGE_SECONDS.labels("chat")
+
+    def test_time_stage_records_duration(self):
+        # ARRANGE
+        child=STAGE_SECONDS.labels("test","sleep")
+        before=sum(child.counts)
+
+        # ACT
+        with time_stage("test","sleep"):
+            time.sleep(0.01)
+
+        # ASSERT
+        assert sum(child.counts)==before+1
+        assert child.sum>=0.01
+
+
+class TestServerTiming:
+    def test_stages_outside_a_request_are_not_recorded(self):
+        with time_stage("test","outside"):
+            pass
+        assert current_timings() is None
+
+    def test_header_includes_threadpool_stages(self):
+        # ARRANGE
+        from fastapi.concurrency import run_in_threadpool
+        app = FastAPI()
+
+        def blocking_stage():
+            with time_stage("test","blocking"):
+                time.sleep(0.005)
+
+        @app.get("/timed")
+        async def timed():
+            await run_in_threadpool(blocking_stage)
+            with time_stage("test","inline"):
+                pass
+            return {"stages": sorted(current_timings().stages)}
+
+        client = TestClient(ServerTimingMiddleware(app))
+
+        # ACT
+        response = client.get("/timed")
+
+        # ASSERT
+        assert response.json() == {"stages": ["blocking", "inline"]}
+        header = response.headers["Server-Timing"]
+        assert "blocking;dur=" in header
+        assert "inline;dur=" in header
+        assert header.split(", ")[-1].startswith("total;dur=")
+        assert float(header.split("blocking;dur=")[1].split(",")[0]) >= 5
+
+
+class TestSlowRequestLog:
+    def test_fast_requests_are_not_recorded(self):
+        log = SlowRequestLog(threshold_seconds=60, max_entries=5)
+
+        assert log.record_if_slow(RequestTimings(), "What is the leave policy?") is None
+        assert log.stats()["entries"] == 0
+
+    def test_entries_include_details_and_hash_the_question(self):
+        # ARRANGE
+        log = SlowRequestLog(threshold_seconds=0, max_entries=5)
+        timings = RequestTimings()
+        timings.add("answer_llm", 1.5)
+        timings.details.update(metadata={"location": "US"}, prompt_tokens=900)
+
+        # ACT
+        entry = log.record_if_slow(timings, "What is the  LEAVE policy?", role="employee")
+
+        # ASSERT
+        assert entry["question_hash"] == question_hash("what is the leave policy?")
+        assert entry["metadata"] == {"location": "US"}
+        assert entry["prompt_tokens"] == 900
+        assert entry["role"] == "employee"
+        assert entry["timings"]["answer_llm"] == 1500.0
+
+    def test_buffer_is_bounded_and_worst_is_slowest_first(self):
+        # ARRANGE
+        log = SlowRequestLog(threshold_seconds=0, max_entries=3)
+        for offset in (1, 5, 2, 4):
+            timings = RequestTimings()
+            timings.start -= offset
+            log.record_if_slow(timings, f"question {offset}")
+
+        # ACT
+        worst = log.worst(2)
+
+        # ASSERT
+        assert log.stats()["entries"] == 3
+        assert log.stats()["recorded"] == 4
+        # The first entry (1 s) was evicted, the rest come back slowest first
+        assert [round(entry["duration_ms"] / 1000) for entry in worst] == [5, 4]
+        assert [round(entry["duration_ms"] / 1000) for entry in log.worst(10)] == [5, 4, 2]
+
+
+class TestRequestProfiler:
+    def test_saves_stats_and_sets_header(self, monkeypatch, tmp_path):
+        # ARRANGE
+        import pstats
+        from fastapi import Response
+        monkeypatch.setenv("PROFILES_DIR", str(tmp_path))
+        response = Response()
+
+        # ACT
+        with RequestProfiler("chat", response) as profiler:
+            sum(range(1000))
+
+        # ASSERT
+        assert profiler.saved
+        assert response.headers["X-Profile-Artifact"] == profiler.artifact
+        assert pstats.Stats(str(tmp_path / profiler.artifact)).total_calls > 0
+
+    def test_only_one_request_is_profiled_at_a_time(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("PROFILES_DIR", str(tmp_path))
+
+        with RequestProfiler("outer") as outer:
+            with RequestProfiler("inner") as inner:
+                pass
+
+        assert outer.saved
+        assert not inner.saved
+        assert list_profiles() == [outer.artifact]
+
+    def test_announced_profile_reports_why_it_was_not_written(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("PROFILES_DIR", str(tmp_path))
+        written, skipped = RequestProfiler("upload"), RequestProfiler("upload")
+        written.announce()
+        skipped.announce()
+        assert unavailable_profiles()[written.artifact].startswith("pending")
+
+        with written:
+            with skipped:
+                pass
+
+        assert written.artifact not in unavailable_profiles()
+        assert unavailable_profiles()[skipped.artifact].startswith("skipped")
+
+    def test_keeps_newest_profiles(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("PROFILES_DIR", str(tmp_path))
+        monkeypatch.setenv("PROFILES_MAX_FILES", "2")
+
+        for _ in range(3):
+            with RequestProfiler("chat"):
+                pass
+            time.sleep(0.01)
+
+        assert len(list_profiles()) == 2
+
+    def test_profile_path_rejects_other_files(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("PROFILES_DIR", str(tmp_path))
+        (tmp_path / "notes.txt").write_text("x")
+
+        assert get_profile_path("notes.txt") is None
+        assert get_profile_path("../notes.pstats") is None
+        assert get_profile_path("missing.pstats") is None
+
+
 class TestRateMiddleware:
 
     def test_excluded_path_skips_rate_limiting(self):
@@ -250,4 +1278,55 @@ class TestRateMiddleware:
         assert response.status_code == 200
         assert response.json() == {"message": "OK"}
 
-        mock_limiter.check_rate_limit.assert_called_once()
\ No newline at end of file
+        mock_limiter.check_rate_limit.assert_called_once()
+
+    def test_rate_limit_exceeded_returns_429_with_retry_after(self):
+        # ARRANGE
+        mock_limiter = MagicMock()
+        mock_limiter.check_rate_limit.return_value = (False, 42)
+        middleware = RateLimitMiddleware(create_test_app(), limiter=mock_limiter)
+        client = TestClient(middleware)
+
+        # ACT
+        response = client.get("/test")
+
+        # ASSERT
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert response.headers["Retry-After"] == "42"
+        assert RATE_LIMIT_REJECTIONS.labels("global","per_hour").get() >= 1
+        assert response.json() == {"detail": "Too many requests. Please try again later."}
+
+    def test_metrics_path_is_excluded_by_default(self):
+        middleware = RateLimitMiddleware(create_test_app(), limiter=MagicMock())
+        assert "/metrics" in middleware.exclude_paths
+
+    def test_excluded_paths_are_a_set(self):
+        # ARRANGE
+        middleware = RateLimitMiddleware(create_test_app(), limiter=MagicMock(), exclude_paths=["/a", "/a", "/b"])
+
+        # ASSERT
+        assert middleware.exclude_paths == frozenset({"/a", "/b"})
+
+    def test_streaming_response_passes_through(self):
+        # ARRANGE
+        from fastapi.responses import StreamingResponse
+        app = create_test_app()
+
+        @app.get("/stream")
+        async def stream():
+            async def chunks():
+                for part in (b"one,", b"two,", b"three"):
+                    yield part
+            return StreamingResponse(chunks(), media_type="text/plain")
+
+        mock_limiter = MagicMock()
+        mock_limiter.check_rate_limit.return_value = (True, None)
+        client = TestClient(RateLimitMiddleware(app, limiter=mock_limiter))
+
+        # ACT
+        with client.stream("GET", "/stream") as response:
+            parts = list(response.iter_bytes())
+
+        # ASSERT
+        assert response.status_code == 200
+        assert b"".join(parts) == b"one,two,three"
@@ -0,0 +1,187 @@
+"""
+Admission control for LLM-bound requests.
+Caps the number of requests running the RAG pipeline, keeps a bounded wait
+queue in front of it and sheds requests that cannot start in time.
+Queued requests are served by priority, with aging so low-priority work
+is never starved.
+"""
+import os
+import math
+import time
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from backend.utils.llm_pool import get_llm_pool
+from backend.config.priority_config import get_priority_config
+import logging
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a request is shed instead of admitted."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Request rejected by admission control: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("priority", "enqueued_at", "seq", "future")
+
+    def __init__(self, priority: float, seq: int, future: asyncio.Future):
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.seq = seq
+        self.future = future
+
+    def effective_priority(self, now: float, aging_per_second: float) -> float:
+        return self.priority + aging_per_second * (now - self.enqueued_at)
+
+
+class AdmissionController:
+    """
+    Bounded concurrency limiter with a bounded priority wait queue.
+    Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        max_wait_seconds: float,
+        aging_per_second: float = 1.0,
+    ):
+        if max_concurrent < 1:
+            # Nothing could ever be admitted, and retry_after would divide by zero
+            raise ValueError(f"max_concurrent (ADMISSION_MAX_CONCURRENT) must be at least 1, got {max_concurrent}")
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.aging_per_second = aging_per_second
+        self._in_flight = 0
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._avg_service_seconds: Optional[float] = None
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.shed_preempted = 0
+
+    @asynccontextmanager
+    async def admit(self, priority: float = 1.0):
+        """Wait for a free slot or raise AdmissionRejectedError. Higher priority is served first."""
+        await self._acquire(priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._record_service_time(time.monotonic() - started)
+            self._release()
+
+    async def _acquire(self, priority: float):
+        if self._in_flight < self.max_concurrent and not self._waiters:
+            self._in_flight += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            if not self._preempt_lower_priority(priority):
+                self.shed_queue_full += 1
+                raise AdmissionRejectedError("queue_full", self.retry_after())
+
+        waiter = _Waiter(priority, next(self._seq), asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter.future, timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            self.shed_timeout += 1
+            raise AdmissionRejectedError("queue_timeout", self.retry_after())
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was handed over just before cancellation, give it back
+                self._release()
+            else:
+                self._discard(waiter)
+            raise
+
+    def _preempt_lower_priority(self, priority: float) -> bool:
+        """Shed the lowest-priority waiter to make room for a higher-priority request."""
+        if not self._waiters:
+            return False
+        now = time.monotonic()
+        lowest = min(self._waiters, key=lambda w: (w.effective_priority(now, self.aging_per_second), -w.seq))
+        if lowest.effective_priority(now, self.aging_per_second) >= priority:
+            return False
+        self._discard(lowest)
+        self.shed_preempted += 1
+        lowest.future.set_exception(AdmissionRejectedError("preempted", self.retry_after()))
+        return True
+
+    def _release(self):
+        now = time.monotonic()
+        while self._waiters:
+            waiter = max(self._waiters, key=lambda w: (w.effective_priority(now, self.aging_per_second), -w.seq))
+            self._discard(waiter)
+            if not waiter.future.done():
+                # Hand the slot straight to the next waiter, in_flight stays the same
+                waiter.future.set_result(None)
+                self.admitted += 1
+                return
+        self._in_flight -= 1
+
+    def _discard(self, waiter: _Waiter):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _record_service_time(self, seconds: float):
+        if self._avg_service_seconds is None:
+            self._avg_service_seconds = seconds
+        else:
+            self._avg_service_seconds = 0.8 * self._avg_service_seconds + 0.2 * seconds
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue is expected to drain."""
+        if self._avg_service_seconds is None:
+            return max(1, math.ceil(self.max_wait_seconds))
+        backlog = len(self._waiters) + 1
+        return max(1, math.ceil(self._avg_service_seconds * backlog / self.max_concurrent))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self._in_flight,
+            "queued": len(self._waiters),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "max_wait_seconds": self.max_wait_seconds,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+            "shed_preempted": self.shed_preempted,
+            "avg_service_seconds": round(self._avg_service_seconds, 3) if self._avg_service_seconds is not None else None,
+        }
+
+
+_admission_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get or initialize the global admission controller for /chat."""
+    global _admission_controller
+    if _admission_controller is None:
+        # By default admit as many requests as there are generation slots in the pool
+        default_capacity = sum(b.max_concurrency for b in get_llm_pool().backends)
+        _admission_controller = AdmissionController(
+            max_concurrent=int(os.getenv("ADMISSION_MAX_CONCURRENT", str(default_capacity))),
+            max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "32")),
+            max_wait_seconds=float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "30")),
+            aging_per_second=get_priority_config()["aging"]["per_second"],
+        )
+    return _admission_controller
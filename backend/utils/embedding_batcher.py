@@ -0,0 +1,124 @@
+"""
+Micro-batching for query embeddings.
+Embedding requests that arrive within a short window are coalesced into one
+embed_documents call. Each caller waits on a future for its own vector, for
+at most timeout_seconds.
+"""
+import time
+import queue
+import logging
+from concurrent.futures import Future, InvalidStateError
+from threading import Lock, Thread
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    Collects texts from many threads and embeds them in batches on one worker thread.
+    A batch is flushed when it reaches max_batch_size or window_seconds after its first text.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], List[List[float]]],
+        max_batch_size: int = 32,
+        window_seconds: float = 0.005,
+        timeout_seconds: float = 30.0,
+    ):
+        self._embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.window_seconds = window_seconds
+        self.timeout_seconds = timeout_seconds
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker: Optional[Thread] = None
+        self._worker_lock = Lock()
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    def submit(self, text: str) -> Future:
+        """Queue a text for embedding and return a future for its vector."""
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str, timeout: Optional[float] = None) -> List[float]:
+        """
+        Embed a single text through the batcher, blocking until its batch is done.
+        Raises TimeoutError after timeout seconds (default timeout_seconds).
+        """
+        future = self.submit(text)
+        try:
+            return future.result(self.timeout_seconds if timeout is None else timeout)
+        except TimeoutError:
+            # The worker skips cancelled futures when the batch finishes
+            future.cancel()
+            raise
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect_batch(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                # Texts queued while the previous batch was running are taken without waiting
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            # Identical questions in one batch are embedded once
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                vectors = self._embed_batch(texts)
+                if len(vectors) != len(texts):
+                    raise ValueError(f"Embedding model returned {len(vectors)} vectors for {len(texts)} texts")
+                by_text = dict(zip(texts, vectors))
+                for text, future in batch:
+                    self._resolve(future, result=by_text[text])
+            except Exception as e:
+                # Never let the worker die, every queued caller would wait forever
+                logger.error(f"Failed to embed batch of {len(texts)} texts: {e}")
+                for _, future in batch:
+                    self._resolve(future, error=e)
+                continue
+
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+    @staticmethod
+    def _resolve(future: Future, result: Any = None, error: Optional[BaseException] = None):
+        """Resolve a future unless it is already done, e.g. cancelled by a caller that timed out."""
+        if future.done():
+            return
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "queued": self._queue.qsize(),
+        }
@@ -0,0 +1,226 @@
+"""
+Dedicated embedding worker processes shared by all API workers on a machine.
+
+A supervisor binds a Unix socket and pre-forks a fixed number of worker
+processes. Each worker pins its torch thread count, loads the embedding model
+once and accepts requests on the shared socket, so the kernel spreads
+connections across idle workers. API processes talk to the pool through
+EmbeddingWorkerClient by setting EMBED_WORKER_SOCKET.
+
+Wire format (one request per connection):
+    request:  uint32 length + JSON {"texts": [...]}, at most EMBED_WORKER_MAX_REQUEST_BYTES
+    response: 1 status byte ("O" ok / "E" error) + uint32 length + payload
+              ok payload = uint32 rows + uint32 dim + rows*dim float32 (little-endian)
+
+Usage (from the project root):
+    python -m backend.utils.embedding_workers --socket /tmp/handbook-embed.sock --workers 2 --torch-threads 4
+"""
+import os
+import sys
+import json
+import time
+import errno
+import socket
+import signal
+import struct
+import argparse
+import logging
+import multiprocessing
+from typing import Callable, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_LENGTH = struct.Struct(">I")
+_SHAPE = struct.Struct("<II")
+_STATUS_OK = b"O"
+_STATUS_ERROR = b"E"
+
+# A stalled client or a bogus length prefix must not tie up a worker
+MAX_REQUEST_BYTES = int(os.getenv("EMBED_WORKER_MAX_REQUEST_BYTES", str(4 * 1024 * 1024)))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("EMBED_WORKER_REQUEST_TIMEOUT_SECONDS", "10"))
+
+
+def _recv_exact(conn: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = conn.recv(size)
+        if not chunk:
+            raise ConnectionError("Embedding worker connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _send_frame(conn: socket.socket, status: bytes, payload: bytes):
+    conn.sendall(status + _LENGTH.pack(len(payload)) + payload)
+
+
+def handle_connection(
+    conn: socket.socket,
+    embed_documents: Callable[[List[str]], list],
+    timeout: float = REQUEST_TIMEOUT_SECONDS,
+    max_request_bytes: int = MAX_REQUEST_BYTES,
+):
+    """Serve a single embedding request on an accepted connection."""
+    try:
+        conn.settimeout(timeout)
+        (length,) = _LENGTH.unpack(_recv_exact(conn, _LENGTH.size))
+        if length > max_request_bytes:
+            raise ValueError(f"Request of {length} bytes exceeds the {max_request_bytes} byte limit")
+        texts = json.loads(_recv_exact(conn, length))["texts"]
+        vectors = np.asarray(embed_documents(texts), dtype="<f4")
+        if vectors.ndim != 2:
+            vectors = vectors.reshape(len(texts), -1)
+        _send_frame(conn, _STATUS_OK, _SHAPE.pack(*vectors.shape) + vectors.tobytes())
+    except ConnectionError:
+        pass
+    except socket.timeout:
+        logger.warning(f"Embedding worker dropped a connection idle for more than {timeout}s")
+    except Exception as e:
+        logger.error(f"Embedding worker failed to serve request: {e}")
+        try:
+            _send_frame(conn, _STATUS_ERROR, str(e).encode("utf-8"))
+        except OSError:
+            pass
+    finally:
+        conn.close()
+
+
+def serve_forever(listener: socket.socket, embed_documents: Callable[[List[str]], list]):
+    """Accept loop run by every worker on the shared listening socket."""
+    while True:
+        try:
+            conn, _ = listener.accept()
+        except InterruptedError:
+            continue
+        except OSError as e:
+            if e.errno == errno.EBADF:
+                return
+            raise
+        handle_connection(conn, embed_documents)
+
+
+def _worker_main(listener: socket.socket, torch_threads: int):
+    # Thread counts must be fixed before torch is imported by the model
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(torch_threads)
+    # The supervisor's handlers are inherited through fork: a worker must not run pool.stop()
+    # (which unlinks the shared socket), SIGTERM just ends it and the supervisor restarts it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+        torch.set_num_interop_threads(1)
+    except ImportError:
+        pass
+
+    from backend.utils.embeddings import get_embedding_model
+
+    model = get_embedding_model()
+    logger.info(f"Embedding worker {os.getpid()} ready with {torch_threads} torch thread(s)")
+    serve_forever(listener, model.embed_documents)
+
+
+class EmbeddingWorkerPool:
+    """Supervisor that owns the socket and keeps a fixed number of workers alive."""
+
+    def __init__(self, socket_path: str, workers: int = 2, torch_threads: int = 1):
+        self.socket_path = socket_path
+        self.workers = workers
+        self.torch_threads = torch_threads
+        self._listener: Optional[socket.socket] = None
+        self._processes: List[multiprocessing.Process] = []
+        self._stopping = False
+        # Workers must be forked before any model or torch state exists in this process
+        self._context = multiprocessing.get_context("fork")
+
+    def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.socket_path)
+        # Only this user may connect; nothing is accepted before listen(), so there is no race
+        os.chmod(self.socket_path, 0o600)
+        self._listener.listen(128)
+        for _ in range(self.workers):
+            self._spawn()
+        logger.info(f"Started {self.workers} embedding worker(s) on {self.socket_path}")
+
+    def _spawn(self):
+        process = self._context.Process(
+            target=_worker_main, args=(self._listener, self.torch_threads), daemon=True
+        )
+        process.start()
+        self._processes.append(process)
+
+    def supervise(self, interval: float = 1.0):
+        """Restart crashed workers until stop() is called."""
+        while not self._stopping:
+            for process in list(self._processes):
+                if not process.is_alive():
+                    logger.warning(f"Embedding worker {process.pid} exited with {process.exitcode}, restarting")
+                    self._processes.remove(process)
+                    if not self._stopping:
+                        self._spawn()
+            time.sleep(interval)
+
+    def stop(self):
+        self._stopping = True
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            process.join(timeout=5)
+        if self._listener is not None:
+            self._listener.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class EmbeddingWorkerClient:
+    """Client used by API processes to embed texts in the worker pool."""
+
+    def __init__(self, socket_path: str, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """Embed texts remotely, returns a (len(texts), dim) float32 array."""
+        payload = json.dumps({"texts": list(texts)}).encode("utf-8")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(self.timeout)
+            conn.connect(self.socket_path)
+            conn.sendall(_LENGTH.pack(len(payload)) + payload)
+            status = _recv_exact(conn, 1)
+            (length,) = _LENGTH.unpack(_recv_exact(conn, _LENGTH.size))
+            body = _recv_exact(conn, length)
+
+        if status != _STATUS_OK:
+            raise RuntimeError(f"Embedding worker error: {body.decode('utf-8', 'replace')}")
+        rows, dim = _SHAPE.unpack_from(body)
+        return np.frombuffer(body, dtype="<f4", offset=_SHAPE.size).reshape(rows, dim)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the shared embedding worker pool")
+    parser.add_argument("--socket", default=os.getenv("EMBED_WORKER_SOCKET", "/tmp/handbook-embed.sock"))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("EMBED_WORKERS", "2")))
+    parser.add_argument("--torch-threads", type=int, default=int(os.getenv("EMBED_WORKER_TORCH_THREADS", "1")))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    pool = EmbeddingWorkerPool(args.socket, args.workers, args.torch_threads)
+
+    def _shutdown(signum, frame):
+        pool.stop()
+        sys.exit(0)
+
+    pool.start()
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+    pool.supervise()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,15 @@
 from langchain_huggingface import HuggingFaceEmbeddings
 import os
+import sys
+import unicodedata
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional
+import numpy as np
 from dotenv import load_dotenv
+from backend.utils.embedding_batcher import EmbeddingBatcher
+from backend.utils.embedding_workers import EmbeddingWorkerClient
+from backend.utils.metrics import CACHE_REQUESTS
 import logging
 
 logger=logging.getLogger(__name__)
@@ -8,6 +17,10 @@ logger=logging.getLogger(__name__)
 load_dotenv()
 
 MODEL_NAME=os.getenv("EMBED_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+QUERY_CACHE_SIZE=int(os.getenv("EMBED_CACHE_SIZE", "2048"))
+BATCHING_ENABLED=os.getenv("EMBED_BATCHING", "true").lower()=="true"
+# When set, embeddings are computed by the shared worker pool instead of an in-process model
+WORKER_SOCKET=os.getenv("EMBED_WORKER_SOCKET")
 
 # Lazy-load the embedding model
 _embedding_model = None
@@ -27,15 +40,142 @@ def get_embedding_model():
         logger.error(f"Failed to initialize embedding model: {e}")
         raise
 
+_worker_client = None
+
+def get_worker_client() -> EmbeddingWorkerClient:
+    """Get or initialize the client for the embedding worker pool."""
+    global _worker_client
+    if _worker_client is None:
+        _worker_client = EmbeddingWorkerClient(WORKER_SOCKET, timeout=float(os.getenv("EMBED_WORKER_TIMEOUT_SECONDS", "30")))
+        logger.info(f"Using embedding worker pool at {WORKER_SOCKET}")
+    return _worker_client
+
+def embed_documents(texts:list):
+    """Embed several texts with the worker pool or the in-process model."""
+    if WORKER_SOCKET:
+        return get_worker_client().embed_documents(texts)
+    return get_embedding_model().embed_documents(texts)
+
 def get_embedding(text:str):
     try:
-        model = get_embedding_model()
-        response = model.embed_query(text)
-        logger.info("Generated embedding successfully.")
+        if WORKER_SOCKET:
+            response = get_worker_client().embed_documents([text])[0].tolist()
+        else:
+            model = get_embedding_model()
+            response = model.embed_query(text)
+        logger.debug("Generated embedding successfully.")
         return response
     except Exception as e:
         logger.error(f"Failed to generate embedding: {e}")
         raise
 
 
+class EmbeddingCache:
+    """
+    Thread-safe bounded LRU cache of query embeddings.
+    Vectors are stored as read-only float32 arrays.
+    """
+
+    def __init__(self, max_entries: int, name: str = "query_embedding"):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # Exported counters keep counting across clear(), unlike hits/misses
+        self._hit_counter = CACHE_REQUESTS.labels(name, "hit")
+        self._miss_counter = CACHE_REQUESTS.labels(name, "miss")
+
+    @staticmethod
+    def _entry_size(key: str, vector: np.ndarray) -> int:
+        return sys.getsizeof(key) + vector.nbytes
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                self._miss_counter.inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._hit_counter.inc()
+            return vector
+
+    def put(self, key: str, vector: np.ndarray):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= self._entry_size(key, previous)
+            self._entries[key] = vector
+            self._bytes += self._entry_size(key, vector)
+            while len(self._entries) > self.max_entries:
+                old_key, old_vector = self._entries.popitem(last=False)
+                self._bytes -= self._entry_size(old_key, old_vector)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_bytes": self._bytes,
+            }
+
+
+_query_cache = EmbeddingCache(QUERY_CACHE_SIZE)
+
+
+def get_query_cache() -> EmbeddingCache:
+    """Get the global query embedding cache."""
+    return _query_cache
+
+
+_embedding_batcher: Optional[EmbeddingBatcher] = None
+
+
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """Get or initialize the global query embedding batcher."""
+    global _embedding_batcher
+    if _embedding_batcher is None:
+        _embedding_batcher = EmbeddingBatcher(
+            embed_documents,
+            max_batch_size=int(os.getenv("EMBED_BATCH_MAX_SIZE", "32")),
+            window_seconds=float(os.getenv("EMBED_BATCH_WINDOW_MS", "5")) / 1000,
+            timeout_seconds=float(os.getenv("EMBED_BATCH_TIMEOUT_SECONDS", "30")),
+        )
+    return _embedding_batcher
+
+
+def normalize_query(text: str) -> str:
+    """Unicode-normalize and collapse whitespace so trivial variants share a cache entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def get_query_embedding(text: str) -> np.ndarray:
+    """Embedding for a user question, served from the LRU cache when possible."""
+    key = normalize_query(text)
+    vector = _query_cache.get(key)
+    if vector is not None:
+        return vector
+
+    # Concurrent questions are coalesced into one model call
+    embedding = get_embedding_batcher().embed(key) if BATCHING_ENABLED else get_embedding(key)
+    vector = np.asarray(embedding, dtype=np.float32)
+    vector.setflags(write=False)
+    _query_cache.put(key, vector)
+    return vector
 
@@ -0,0 +1,171 @@
+"""
+Pool of Ollama backends with least-outstanding-requests routing.
+Each backend caps its concurrent generations. Backends that keep failing are
+ejected for a cool-down period and then probed back in with a single request.
+"""
+import os
+import time
+import logging
+from contextlib import contextmanager
+from threading import Condition
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from langchain_core.exceptions import OutputParserException
+from backend.utils.llm_setup import OLLAMA_BASE_URLS
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+# Errors raised after the backend answered successfully (e.g. malformed JSON from
+# the model) say nothing about backend health and must not count as failures.
+NON_BACKEND_ERRORS = (OutputParserException,)
+
+
+class NoBackendAvailableError(RuntimeError):
+    """Raised when no Ollama backend can take the request."""
+
+
+class OllamaBackend:
+    """Routing state for a single Ollama host."""
+
+    def __init__(self, base_url: str, max_concurrency: int):
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.total_requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+
+    def has_capacity(self, now: float) -> bool:
+        """Healthy backends take up to max_concurrency requests, ejected ones a single probe."""
+        if self.ejected_until:
+            return now >= self.ejected_until and self.in_flight == 0
+        return self.in_flight < self.max_concurrency
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "healthy": not self.ejected_until,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "total_requests": self.total_requests,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "ejected_for_seconds": round(max(0.0, self.ejected_until - now), 1) if self.ejected_until else 0,
+        }
+
+
+class OllamaBackendPool:
+    """
+    Thread-safe pool of Ollama backends.
+    Usage:
+        with pool.acquire() as backend:
+            ... call the model at backend.base_url ...
+    """
+
+    def __init__(
+        self,
+        base_urls: List[str],
+        max_concurrency: int = 4,
+        failure_threshold: int = 3,
+        eject_seconds: float = 30.0,
+        acquire_timeout: float = 60.0,
+    ):
+        if not base_urls:
+            raise ValueError("At least one Ollama base URL is required")
+        self._backends = [OllamaBackend(url, max_concurrency) for url in base_urls]
+        self.failure_threshold = failure_threshold
+        self.eject_seconds = eject_seconds
+        self.acquire_timeout = acquire_timeout
+        self._condition = Condition()
+
+    @property
+    def backends(self) -> List[OllamaBackend]:
+        return list(self._backends)
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        """Reserve a generation slot on the least-loaded available backend."""
+        backend = self._checkout(self.acquire_timeout if timeout is None else timeout)
+        try:
+            yield backend
+        except NON_BACKEND_ERRORS:
+            self._release(backend, success=True)
+            raise
+        except Exception:
+            self._release(backend, success=False)
+            raise
+        else:
+            self._release(backend, success=True)
+
+    def _checkout(self, timeout: float) -> OllamaBackend:
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                candidates = [b for b in self._backends if b.has_capacity(now)]
+                if candidates:
+                    backend = min(candidates, key=lambda b: (b.in_flight, b.total_requests))
+                    backend.in_flight += 1
+                    backend.total_requests += 1
+                    return backend
+
+                ejected = [b for b in self._backends if b.ejected_until]
+                if len(ejected) == len(self._backends) and all(b.ejected_until > now for b in ejected):
+                    # Every backend is cooling down, waiting would only burn the caller's timeout
+                    raise NoBackendAvailableError("All Ollama backends are currently ejected")
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise NoBackendAvailableError("Timed out waiting for a free Ollama backend")
+
+                # Wake up when a slot is released or the next ejected backend becomes probe-able
+                wait_for = remaining
+                for b in ejected:
+                    if b.ejected_until > now:
+                        wait_for = min(wait_for, b.ejected_until - now)
+                self._condition.wait(wait_for)
+
+    def _release(self, backend: OllamaBackend, success: bool):
+        with self._condition:
+            backend.in_flight -= 1
+            if success:
+                if backend.ejected_until:
+                    logger.info(f"Ollama backend {backend.base_url} passed probe, back in rotation")
+                backend.consecutive_failures = 0
+                backend.ejected_until = 0.0
+            else:
+                backend.failures += 1
+                backend.consecutive_failures += 1
+                if backend.ejected_until or backend.consecutive_failures >= self.failure_threshold:
+                    backend.ejected_until = time.monotonic() + self.eject_seconds
+                    logger.warning(
+                        f"Ejected Ollama backend {backend.base_url} for {self.eject_seconds}s "
+                        f"after {backend.consecutive_failures} consecutive failures"
+                    )
+            self._condition.notify_all()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Routing statistics for every backend."""
+        with self._condition:
+            now = time.monotonic()
+            return [b.stats(now) for b in self._backends]
+
+
+_llm_pool: Optional[OllamaBackendPool] = None
+
+
+def get_llm_pool() -> OllamaBackendPool:
+    """Get or initialize the global Ollama backend pool."""
+    global _llm_pool
+    if _llm_pool is None:
+        _llm_pool = OllamaBackendPool(
+            OLLAMA_BASE_URLS,
+            max_concurrency=int(os.getenv("OLLAMA_MAX_CONCURRENCY_PER_BACKEND", "4")),
+            failure_threshold=int(os.getenv("OLLAMA_FAILURE_THRESHOLD", "3")),
+            eject_seconds=float(os.getenv("OLLAMA_EJECT_SECONDS", "30")),
+            acquire_timeout=float(os.getenv("OLLAMA_ACQUIRE_TIMEOUT_SECONDS", "60")),
+        )
+        logger.info(f"Initialized Ollama backend pool with {len(OLLAMA_BASE_URLS)} backend(s)")
+    return _llm_pool
@@ -10,13 +10,18 @@ QUERY_MODEL = os.getenv("CHAT_MODEL_NAME")
 ANSWER_MODEL = os.getenv("ANSWER_MODEL")
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_API_KEY = os.getenv("OLLAMA_API_KEY")
+# Comma-separated list of Ollama hosts, defaults to the single OLLAMA_BASE_URL
+OLLAMA_BASE_URLS = [
+    url.strip() for url in os.getenv("OLLAMA_BASE_URLS", OLLAMA_BASE_URL).split(",") if url.strip()
+]
 
-def set_llm(type: str):
+def set_llm(type: str, base_url: str = None):
     """
     Create and return a ChatOllama LLM instance.
     
     Args:
         type: Either "answer" or "query" to determine which model to use
+        base_url: Ollama host to connect to, defaults to OLLAMA_BASE_URL
         
     Returns:
         ChatOllama instance configured for cloud or local Ollama
@@ -33,7 +38,7 @@ def set_llm(type: str):
         llm_config = {
             "model": model_name,
             "temperature": 0,
-            "base_url": OLLAMA_BASE_URL,
+            "base_url": base_url or OLLAMA_BASE_URL,
         }
         
         # Add API key authentication for cloud Ollama if provided
@@ -15,7 +15,7 @@ def load_pdf(file_path:str) -> str:
         for page in reader:
             text+=page.get_text()+" "
 
-        logger.info(text[:50])
+        logger.debug(text[:50])
 
         return text
     except Exception:
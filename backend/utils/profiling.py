@@ -0,0 +1,184 @@
+"""
+On-demand profiling of single requests, for finding Python hot spots in production
+without a redeploy.
+
+Off unless PROFILING_ENABLED=true. When enabled, an admin adds the header
+"X-Profile-Request: 1" (or ?profile=true) to /chat or /upload-handbook and the
+request runs under cProfile. The stats are written to PROFILES_DIR as a .pstats
+file, named in the X-Profile-Artifact response header and downloadable from
+/admin/profiles/{name}. Open them with `python -m pstats`, snakeviz, or convert
+them to a flame graph with flameprof / gprof2dot.
+
+Uploads are profiled in the background task, after the response: their artifact
+name is announced up front, and if the profile cannot be written (another request
+was being profiled, the write failed) the reason is kept per worker and shown by
+/admin/profiles and /admin/profiles/{name} instead of the file.
+
+Requests without the flag only pay for one environment lookup. Only one request
+is profiled at a time: on Python 3.12+ cProfile sees every thread, so the
+threadpool stages (LLM, embedding, Qdrant) are included, and so is any other
+request served at the same moment.
+"""
+import os
+import re
+import time
+import uuid
+import cProfile
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Optional
+from fastapi import HTTPException, Request, Response, status
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile-Request"
+ARTIFACT_HEADER = "X-Profile-Artifact"
+ARTIFACT_PATTERN = re.compile(r"^[\w\-]+\.pstats$")
+
+# cProfile cannot run two profilers at once
+_profiler_lock = Lock()
+
+# Announced artifacts that are not written (yet), name -> reason, oldest first
+MAX_UNAVAILABLE = 100
+_unavailable: "OrderedDict[str, str]" = OrderedDict()
+_unavailable_lock = Lock()
+
+
+def _set_unavailable(name: str, reason: Optional[str]):
+    with _unavailable_lock:
+        _unavailable.pop(name, None)
+        if reason is not None:
+            _unavailable[name] = reason
+            while len(_unavailable) > MAX_UNAVAILABLE:
+                _unavailable.popitem(last=False)
+
+
+def profiling_enabled() -> bool:
+    return os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+
+
+def get_profiles_dir() -> str:
+    return os.getenv("PROFILES_DIR") or os.path.join(os.path.dirname(__file__), "../profiles")
+
+
+def profiling_requested(request: Request, current_user: dict) -> bool:
+    """
+    True when profiling is enabled and the request asks for it.
+    Raises 403 when a non-admin asks for it.
+    """
+    if not profiling_enabled():
+        return False
+    flag = request.headers.get(PROFILE_HEADER) or request.query_params.get("profile")
+    if not flag or flag.lower() not in {"1", "true", "yes"}:
+        return False
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can profile requests")
+    return True
+
+
+class RequestProfiler:
+    """
+    Context manager running cProfile and saving the stats on exit.
+    If another request is being profiled, this one runs unprofiled.
+    """
+
+    def __init__(self, label: str, response: Optional[Response] = None):
+        self.artifact = f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-{uuid.uuid4().hex[:8]}.pstats"
+        self.response = response
+        self.saved = False
+        self.announced = False
+        self._profile: Optional[cProfile.Profile] = None
+
+    def announce(self) -> str:
+        """
+        Return the artifact name before the profiled work runs (e.g. in a background task).
+        Until it is written, the name is listed as unavailable with the reason.
+        """
+        self.announced = True
+        _set_unavailable(self.artifact, "pending: the profiled work has not finished yet")
+        return self.artifact
+
+    def _not_saved(self, reason: str):
+        if self.announced:
+            _set_unavailable(self.artifact, reason)
+
+    def __enter__(self):
+        if not _profiler_lock.acquire(blocking=False):
+            logger.warning(f"Another request is being profiled, {self.artifact} skipped")
+            self._not_saved("skipped: another request was being profiled")
+            return self
+        self._profile = cProfile.Profile()
+        try:
+            self._profile.enable()
+        except ValueError as e:
+            # Another profiler (e.g. a debugger) is already active
+            logger.warning(f"Could not start profiler: {e}")
+            self._not_saved(f"failed: could not start the profiler: {e}")
+            self._profile = None
+            _profiler_lock.release()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._profile is None:
+            return
+        try:
+            self._profile.disable()
+            self._save()
+        finally:
+            self._profile = None
+            _profiler_lock.release()
+
+    async def run(self, func, *args, **kwargs):
+        """Await func(*args, **kwargs) under the profiler, e.g. as a background task."""
+        with self:
+            return await func(*args, **kwargs)
+
+    def _save(self):
+        profiles_dir = get_profiles_dir()
+        try:
+            os.makedirs(profiles_dir, exist_ok=True)
+            self._profile.dump_stats(os.path.join(profiles_dir, self.artifact))
+        except OSError as e:
+            logger.error(f"Could not write profile {self.artifact}: {e}")
+            self._not_saved(f"failed: could not write the profile: {e}")
+            return
+        self.saved = True
+        if self.announced:
+            _set_unavailable(self.artifact, None)
+        if self.response is not None:
+            self.response.headers[ARTIFACT_HEADER] = self.artifact
+        logger.info(f"Request profile written to {self.artifact}")
+        _prune(profiles_dir, int(os.getenv("PROFILES_MAX_FILES", "50")))
+
+
+def _prune(profiles_dir: str, max_files: int):
+    """Delete the oldest profiles beyond max_files."""
+    for name in list_profiles()[max_files:]:
+        try:
+            os.remove(os.path.join(profiles_dir, name))
+        except OSError:
+            pass
+
+
+def list_profiles() -> List[str]:
+    """Saved profiles, newest first."""
+    profiles_dir = get_profiles_dir()
+    if not os.path.isdir(profiles_dir):
+        return []
+    names = [name for name in os.listdir(profiles_dir) if ARTIFACT_PATTERN.match(name)]
+    return sorted(names, key=lambda name: os.path.getmtime(os.path.join(profiles_dir, name)), reverse=True)
+
+
+def unavailable_profiles() -> Dict[str, str]:
+    """Announced profiles of this worker that are not written, with the reason."""
+    with _unavailable_lock:
+        return dict(_unavailable)
+
+
+def get_profile_path(name: str) -> Optional[str]:
+    """Path of a saved profile, None for unknown or malformed names."""
+    if not ARTIFACT_PATTERN.match(name):
+        return None
+    path = os.path.join(get_profiles_dir(), name)
+    return path if os.path.isfile(path) else None
@@ -1,36 +1,129 @@
 """
-In-memory rate limiter implementation.
+Rate limiter interface and the in-memory implementation.
 Tracks requests per user_id/role or IP address with time-based windows.
+The backend is chosen by RATE_LIMIT_BACKEND: memory (default), shared or redis.
+
+Every backend keeps constant-size state per identifier and window:
+- (limit, window_seconds): sliding-window counter. Two fixed-window counts,
+  the previous one weighted by how much of it still overlaps the sliding window.
+- (limit, window_seconds, burst): GCRA. Requests are spaced window_seconds / limit
+  apart on average and up to burst of them may arrive at once.
 """
+import os
+import sys
+import math
 import time
-from collections import defaultdict
-from typing import Dict, Tuple, Optional
+import itertools
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Optional
 from threading import Lock
+from dotenv import load_dotenv
 import logging
 
 logger = logging.getLogger(__name__)
+load_dotenv()
+
+MAX_IDENTIFIERS = int(os.getenv("RATE_LIMIT_MAX_IDENTIFIERS", "100000"))
+OVERFLOW_POLICY = os.getenv("RATE_LIMIT_OVERFLOW_POLICY", "evict_oldest")
+OVERFLOW_POLICIES = ("evict_oldest", "reject")
+# Independently locked slices of the in-memory table
+SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", "16"))
+# Seconds a refused identifier is asked to wait under the reject policy
+OVERFLOW_RETRY_AFTER = 60
+# Idle identifiers examined per check, and when the table is full
+SWEEP_BATCH = 2
+OVERFLOW_SWEEP = 16
+STATS_SAMPLE = 256
+
+# limit, window_seconds[, burst]
+WindowSpec = Tuple[int, ...]
+
+
+def parse_window(spec: WindowSpec) -> Tuple[int, int, Optional[int]]:
+    """Split a (limit, window_seconds[, burst]) tuple, burst is None for sliding windows."""
+    limit, window_seconds = spec[0], spec[1]
+    burst = spec[2] if len(spec) > 2 and spec[2] else None
+    return limit, window_seconds, burst
+
+
+def fixed_window_start(now: float, window_seconds: int) -> float:
+    return float(math.floor(now / window_seconds) * window_seconds)
+
+
+def roll_window(
+    stored_start: Optional[float], previous: int, current: int, window_start: float, window_seconds: int
+) -> Tuple[int, int]:
+    """Previous and current counts as seen from the fixed window beginning at window_start."""
+    if stored_start == window_start:
+        return previous, current
+    if stored_start == window_start - window_seconds:
+        return current, 0
+    return 0, 0
 
 
-class InMemoryRateLimiter:
+def sliding_window_check(
+    previous: int,
+    current: int,
+    window_start: float,
+    now: float,
+    limit: int,
+    window_seconds: int,
+) -> Tuple[bool, Optional[int]]:
     """
-    Thread-safe in-memory rate limiter.
-    Stores request timestamps in nested dicts: {identifier: {window: [timestamps]}}
+    Sliding-window-counter decision from two fixed-window counts.
+    The previous window is weighted by how much of it still overlaps the sliding
+    window ending now. Returns: (is_allowed, retry_after_seconds)
+    """
+    elapsed = (now - window_start) / window_seconds
+    estimated = previous * (1 - elapsed) + current
+    if estimated < limit:
+        return True, None
+
+    if current < limit:
+        # The previous window's weight must decay until the estimate falls below the limit
+        allowed_at = window_start + window_seconds * (1 - (limit - current) / previous)
+    elif current > 0:
+        # Nothing more fits in this window, wait for the next one to discount it enough
+        allowed_at = window_start + window_seconds * (2 - limit / current)
+    else:
+        # A limit of zero never allows a request
+        allowed_at = now + window_seconds
+    return False, max(1, math.ceil(allowed_at - now))
+
+
+def gcra_check(
+    tat: float,
+    now: float,
+    limit: int,
+    window_seconds: int,
+    burst: int,
+) -> Tuple[bool, Optional[int], float]:
+    """
+    Generic cell rate algorithm decision from the theoretical arrival time (tat).
+    Returns: (is_allowed, retry_after_seconds, new_tat)
     """
+    if limit <= 0:
+        return False, window_seconds, tat
+    interval = window_seconds / limit
+    new_tat = max(tat, now) + interval
+    allowed_at = new_tat - interval * burst
+    if now < allowed_at:
+        return False, max(1, math.ceil(allowed_at - now)), tat
+    return True, None, new_tat
 
-    def __init__(self):
-        self._storage: Dict[str, Dict[str, list]] = defaultdict(lambda: defaultdict(list))
-        self._lock = Lock()
 
-    def _cleanup_old_entries(self, identifier: str, window: str, window_seconds: int):
-        """Remove timestamps older than the window."""
-        current_time = time.time()
-        cutoff = current_time - window_seconds
+def _entry_size(identifier: str, windows: Dict[str, List[float]]) -> int:
+    """Approximate bytes held for one identifier: key, window dict, state lists and their floats, expiry."""
+    states = sum(sys.getsizeof(state) + 24 * len(state) for state in windows.values())
+    return sys.getsizeof(identifier) + sys.getsizeof(windows) + states + 24
 
-        with self._lock:
-            if identifier in self._storage and window in self._storage[identifier]:
-                self._storage[identifier][window] = [
-                    ts for ts in self._storage[identifier][window] if ts > cutoff
-                ]
+
+class RateLimiter(ABC):
+    """
+    Interface every rate limiter backend implements.
+    Identifiers look like "user:<id>:<endpoint>" or "ip:<address>:<endpoint>".
+    """
 
     def check_rate_limit(
         self,
@@ -38,64 +131,263 @@ class InMemoryRateLimiter:
         limit: int,
         window_seconds: int,
         window_name: str = "default",
+        burst: Optional[int] = None,
     ) -> Tuple[bool, Optional[int]]:
         """
         Check if request is within rate limit.
         Returns: (is_allowed, retry_after_seconds)
         """
-        current_time = time.time()
-        cutoff = current_time - window_seconds
+        spec = (limit, window_seconds, burst) if burst else (limit, window_seconds)
+        allowed, retry_after, _ = self.check_multiple_limits(identifier, {window_name: spec})
+        return allowed, retry_after
+
+    @abstractmethod
+    def check_multiple_limits(
+        self,
+        identifier: str,
+        limits: Dict[str, WindowSpec],
+    ) -> Tuple[bool, Optional[int], Optional[str]]:
+        """
+        Check several windows, limits maps window name to (limit, window_seconds[, burst]).
+        Returns: (is_allowed, retry_after_seconds, violated_window_name)
+        """
+
+    @abstractmethod
+    def reset(self, identifier: Optional[str] = None):
+        """Reset rate limit data for one identifier, or for all of them."""
+
+    def stats(self) -> Dict[str, object]:
+        """Backend statistics for /admin/stats."""
+        return {}
+
+
+class _Shard:
+    """
+    One lock-protected slice of the in-memory table.
+    Identifiers are kept in least-recently-used order together with the time
+    at which all their windows stop affecting decisions.
+    """
+
+    def __init__(self, max_identifiers: int):
+        self.max_identifiers = max_identifiers
+        self.lock = Lock()
+        self.storage: "OrderedDict[str, Dict[str, List[float]]]" = OrderedDict()
+        self.expires_at: Dict[str, float] = {}
+        self.evicted_expired = 0
+        self.evicted_overflow = 0
+        self.rejected_overflow = 0
 
-        with self._lock:
-            # Clean old entries
-            if identifier in self._storage and window_name in self._storage[identifier]:
-                self._storage[identifier][window_name] = [
-                    ts for ts in self._storage[identifier][window_name] if ts > cutoff
-                ]
+    def forget(self, identifier: str):
+        self.storage.pop(identifier, None)
+        self.expires_at.pop(identifier, None)
 
-            # Count requests in window
-            request_count = len(self._storage[identifier][window_name])
+    def evict_expired(self, now: float, budget: int) -> int:
+        """Drop up to budget idle identifiers from the LRU front whose windows have all expired."""
+        evicted = 0
+        while evicted < budget and self.storage:
+            identifier = next(iter(self.storage))
+            if self.expires_at.get(identifier, 0.0) > now:
+                # The least recently used identifier is still live; a long window (e.g. per_day)
+                # can hold back the sweep, the max_identifiers cap still bounds memory.
+                break
+            self.forget(identifier)
+            evicted += 1
+        self.evicted_expired += evicted
+        return evicted
 
-            if request_count >= limit:
-                # Calculate retry_after: oldest request + window_seconds - current_time
-                oldest = min(self._storage[identifier][window_name]) if self._storage[identifier][window_name] else current_time
-                retry_after = int((oldest + window_seconds) - current_time) + 1
-                return False, max(1, retry_after)
+    def windows_for(self, identifier: str, now: float, overflow_policy: str) -> Optional[Dict[str, List[float]]]:
+        """Window states of an identifier, creating them if allowed. None means rejected by the cap."""
+        windows = self.storage.get(identifier)
+        if windows is not None:
+            self.storage.move_to_end(identifier)
+            return windows
 
-            # Add current request
-            self._storage[identifier][window_name].append(current_time)
-            return True, None
+        if len(self.storage) >= self.max_identifiers and not self.evict_expired(now, OVERFLOW_SWEEP):
+            if overflow_policy == "reject":
+                self.rejected_overflow += 1
+                return None
+            self.forget(next(iter(self.storage)))
+            self.evicted_overflow += 1
+
+        windows = self.storage[identifier] = {}
+        return windows
+
+
+class InMemoryRateLimiter(RateLimiter):
+    """
+    Thread-safe in-memory rate limiter.
+    Stores per-window state in nested dicts: {identifier: {window: state}}
+    where state is [window_start, previous, current] or [tat] for burst windows.
+
+    Identifiers are spread over shards by hash, each with its own lock, so
+    concurrent checks for different identifiers rarely wait on each other.
+    All windows of a check_multiple_limits call are decided under one lock
+    and the request is recorded only if every window allows it.
+
+    Within a shard identifiers are kept in least-recently-used order. Each
+    check evicts a few idle identifiers once all their windows have expired,
+    and at most max_identifiers are tracked (split evenly across shards).
+    When a shard is full a new identifier either evicts its least recently
+    used one (evict_oldest) or is refused (reject).
+    """
+
+    def __init__(
+        self,
+        max_identifiers: Optional[int] = None,
+        overflow_policy: Optional[str] = None,
+        shards: Optional[int] = None,
+    ):
+        self.max_identifiers = max_identifiers or MAX_IDENTIFIERS
+        self.overflow_policy = (overflow_policy or OVERFLOW_POLICY).lower()
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown rate limit overflow policy: {self.overflow_policy}")
+        shard_count = max(1, shards or SHARDS)
+        per_shard = max(1, math.ceil(self.max_identifiers / shard_count))
+        self._shards = [_Shard(per_shard) for _ in range(shard_count)]
+
+    def _shard_for(self, identifier: str) -> _Shard:
+        if len(self._shards) == 1:
+            return self._shards[0]
+        return self._shards[hash(identifier) % len(self._shards)]
+
+    @staticmethod
+    def _evaluate(
+        state: Optional[List[float]],
+        limit: int,
+        window_seconds: int,
+        burst: Optional[int],
+        now: float,
+    ) -> Tuple[bool, Optional[int], List[float], float]:
+        """
+        Decide one window without recording anything.
+        Returns: (is_allowed, retry_after_seconds, state_if_recorded, expires_at)
+        """
+        if burst:
+            tat = state[0] if state is not None and len(state) == 1 else 0.0
+            allowed, retry_after, tat = gcra_check(tat, now, limit, window_seconds, burst)
+            return allowed, retry_after, [tat], tat
+
+        window_start = fixed_window_start(now, window_seconds)
+        if state is not None and len(state) == 3:
+            previous, current = roll_window(state[0], int(state[1]), int(state[2]), window_start, window_seconds)
+        else:
+            previous, current = 0, 0
+        allowed, retry_after = sliding_window_check(previous, current, window_start, now, limit, window_seconds)
+        return allowed, retry_after, [window_start, previous, current + 1], window_start + 2 * window_seconds
+
+    def check_rate_limit(
+        self,
+        identifier: str,
+        limit: int,
+        window_seconds: int,
+        window_name: str = "default",
+        burst: Optional[int] = None,
+    ) -> Tuple[bool, Optional[int]]:
+        """
+        Check if request is within rate limit.
+        Returns: (is_allowed, retry_after_seconds)
+        """
+        spec = (limit, window_seconds, burst) if burst else (limit, window_seconds)
+        allowed, retry_after, _ = self.check_multiple_limits(identifier, {window_name: spec})
+        return allowed, retry_after
 
     def check_multiple_limits(
         self,
         identifier: str,
-        limits: Dict[str, Tuple[int, int]],
+        limits: Dict[str, WindowSpec],
     ) -> Tuple[bool, Optional[int], Optional[str]]:
         """
-        Check multiple rate limit windows (e.g., per_minute and per_hour).
+        Check multiple rate limit windows (e.g., per_minute and per_hour) atomically.
+        The request is recorded in every window only if all of them allow it.
         Returns: (is_allowed, retry_after_seconds, violated_window_name)
         """
-        for window_name, (limit, window_seconds) in limits.items():
-            allowed, retry_after = self.check_rate_limit(identifier, limit, window_seconds, window_name)
-            if not allowed:
-                return False, retry_after, window_name
+        now = time.time()
+        shard = self._shard_for(identifier)
+        with shard.lock:
+            windows = shard.windows_for(identifier, now, self.overflow_policy)
+            if windows is None:
+                return False, OVERFLOW_RETRY_AFTER, next(iter(limits), None)
 
-        return True, None, None
+            updates = []
+            expires_at = shard.expires_at.get(identifier, 0.0)
+            for window_name, spec in limits.items():
+                limit, window_seconds, burst = parse_window(spec)
+                allowed, retry_after, state, window_expires_at = self._evaluate(
+                    windows.get(window_name), limit, window_seconds, burst, now
+                )
+                if not allowed:
+                    return False, retry_after, window_name
+                updates.append((window_name, state))
+                expires_at = max(expires_at, window_expires_at)
+
+            windows.update(updates)
+            shard.expires_at[identifier] = expires_at
+            shard.evict_expired(now, SWEEP_BATCH)
+            return True, None, None
 
     def reset(self, identifier: Optional[str] = None):
         """Reset rate limit data (for testing or manual cleanup)."""
-        with self._lock:
-            if identifier:
-                if identifier in self._storage:
-                    del self._storage[identifier]
-            else:
-                self._storage.clear()
+        if identifier:
+            shard = self._shard_for(identifier)
+            with shard.lock:
+                shard.forget(identifier)
+            return
+        for shard in self._shards:
+            with shard.lock:
+                shard.storage.clear()
+                shard.expires_at.clear()
+
+    def stats(self) -> Dict[str, object]:
+        """Tracked identifiers, eviction counters and an estimate of the memory they use."""
+        tracked = 0
+        sample = []
+        containers = 0
+        counters = {"evicted_expired": 0, "evicted_overflow": 0, "rejected_overflow": 0}
+        sample_per_shard = max(1, STATS_SAMPLE // len(self._shards))
+        for shard in self._shards:
+            with shard.lock:
+                tracked += len(shard.storage)
+                sample.extend(itertools.islice(shard.storage.items(), sample_per_shard))
+                containers += sys.getsizeof(shard.storage) + sys.getsizeof(shard.expires_at)
+                for name in counters:
+                    counters[name] += getattr(shard, name)
+        per_identifier = sum(_entry_size(identifier, windows) for identifier, windows in sample) / len(sample) if sample else 0
+        return {
+            "backend": "memory",
+            "shards": len(self._shards),
+            "tracked_identifiers": tracked,
+            "max_identifiers": self.max_identifiers,
+            "overflow_policy": self.overflow_policy,
+            **counters,
+            "memory_bytes": int(containers + per_identifier * tracked),
+        }
 
 
-# Global singleton instance
-_rate_limiter = InMemoryRateLimiter()
+# Global singleton instance, backend chosen by RATE_LIMIT_BACKEND (memory | shared | redis)
+_rate_limiter: Optional[RateLimiter] = None
 
 
-def get_rate_limiter() -> InMemoryRateLimiter:
+def get_rate_limiter() -> RateLimiter:
     """Get the global rate limiter instance."""
-    return _rate_limiter
\ No newline at end of file
+    global _rate_limiter
+    if _rate_limiter is None:
+        backend = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+        # Backends are imported lazily, they depend on this module and may need optional packages
+        if backend == "shared":
+            from backend.utils.shared_rate_limiter import get_shared_rate_limiter
+            _rate_limiter = get_shared_rate_limiter()
+        elif backend == "redis":
+            from backend.utils.redis_rate_limiter import get_redis_rate_limiter
+            _rate_limiter = get_redis_rate_limiter()
+        elif backend == "memory":
+            _rate_limiter = InMemoryRateLimiter()
+        else:
+            raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend}")
+        logger.info(f"Using {backend} rate limiter backend")
+    return _rate_limiter
+
+
+def set_rate_limiter(limiter: Optional[RateLimiter]):
+    """Install a custom rate limiter backend, None restores the configured one on next use."""
+    global _rate_limiter
+    _rate_limiter = limiter
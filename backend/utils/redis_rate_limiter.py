@@ -0,0 +1,177 @@
+"""
+Distributed rate limiter backed by Redis (or any server speaking its protocol).
+
+Every node checks the same counters, so per-user and per-IP limits hold across
+all backend nodes. Each window of an identifier is a small hash holding the
+two fixed-window counts of the sliding-window counter, or the GCRA arrival
+time for burst windows. One Lua script evaluates and records all windows of a
+check atomically, so check_multiple_limits costs a single round trip.
+
+If the store cannot be reached the limiter falls back to local in-memory
+limiting and retries the store after RATE_LIMIT_REDIS_RETRY_SECONDS.
+"""
+import os
+import time
+import logging
+from threading import Lock
+from typing import Dict, Optional, Tuple
+import redis
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+from backend.utils.rate_limiter import RateLimiter, InMemoryRateLimiter, WindowSpec, parse_window
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+# KEYS: one hash per window. ARGV: now, then limit, window seconds and burst (0 = none) per key.
+# Returns {1} when allowed, {0, retry_after_seconds, violated_key_index} otherwise.
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local states = {}
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[i * 3 - 1])
+    local window = tonumber(ARGV[i * 3])
+    local burst = tonumber(ARGV[i * 3 + 1])
+    if burst > 0 then
+        if limit <= 0 then
+            return {0, window, i}
+        end
+        local interval = window / limit
+        local tat = math.max(tonumber(redis.call('HGET', key, 't')) or 0, now) + interval
+        local allowed_at = tat - interval * burst
+        if now < allowed_at then
+            return {0, math.max(1, math.ceil(allowed_at - now)), i}
+        end
+        states[i] = {{'t', string.format('%.6f', tat)}, math.ceil(tat - now) + 1}
+    else
+        local start = math.floor(now / window) * window
+        local stored = redis.call('HMGET', key, 's', 'p', 'c')
+        local s = tonumber(stored[1])
+        local p = tonumber(stored[2]) or 0
+        local c = tonumber(stored[3]) or 0
+        if s ~= start then
+            if s == start - window then p = c else p = 0 end
+            c = 0
+        end
+        if p * (1 - (now - start) / window) + c >= limit then
+            local allowed_at
+            if c < limit then
+                allowed_at = start + window * (1 - (limit - c) / p)
+            elseif c > 0 then
+                allowed_at = start + window * (2 - limit / c)
+            else
+                allowed_at = now + window
+            end
+            return {0, math.max(1, math.ceil(allowed_at - now)), i}
+        end
+        states[i] = {{'s', start, 'p', p, 'c', c + 1}, window * 2}
+    end
+end
+for i, key in ipairs(KEYS) do
+    redis.call('HSET', key, unpack(states[i][1]))
+    redis.call('EXPIRE', key, states[i][2])
+end
+return {1}
+"""
+
+
+class RedisRateLimiter(RateLimiter):
+    """Rate limiter shared by all nodes through a Redis-protocol store, with a local fallback."""
+
+    def __init__(
+        self,
+        client: "redis.Redis",
+        prefix: str = "ratelimit:",
+        fallback: Optional[RateLimiter] = None,
+        retry_seconds: float = 5.0,
+    ):
+        self._client = client
+        # Runs EVALSHA and loads the script on NOSCRIPT, e.g. after a store restart
+        self._script = client.register_script(SLIDING_WINDOW_SCRIPT)
+        self.prefix = prefix
+        self._fallback = fallback or InMemoryRateLimiter()
+        self.retry_seconds = retry_seconds
+        self._unavailable_until = 0.0
+        self._lock = Lock()
+        self.remote_checks = 0
+        self.fallback_checks = 0
+        self.errors = 0
+
+    def _key(self, identifier: str, window_name: str) -> str:
+        # The hash tag keeps all windows of an identifier on one Redis Cluster slot
+        return f"{self.prefix}{{{identifier}}}:{window_name}"
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._unavailable_until
+
+    def _mark_unavailable(self, error: Exception):
+        with self._lock:
+            self.errors += 1
+            was_available = self.available
+            self._unavailable_until = time.monotonic() + self.retry_seconds
+        if was_available:
+            logger.warning(f"Rate limit store unreachable, using local limits for {self.retry_seconds}s: {error}")
+
+    def check_multiple_limits(
+        self,
+        identifier: str,
+        limits: Dict[str, WindowSpec],
+    ) -> Tuple[bool, Optional[int], Optional[str]]:
+        """
+        Check several windows in one round trip. The request is counted in every window only if all allow it.
+        Returns: (is_allowed, retry_after_seconds, violated_window_name)
+        """
+        if self.available:
+            names = list(limits)
+            args = [repr(time.time())]
+            for name in names:
+                limit, window_seconds, burst = parse_window(limits[name])
+                args.extend((limit, window_seconds, burst or 0))
+            try:
+                result = self._script(keys=[self._key(identifier, name) for name in names], args=args)
+            except RedisError as e:
+                self._mark_unavailable(e)
+            else:
+                self.remote_checks += 1
+                if int(result[0]) == 1:
+                    return True, None, None
+                return False, int(result[1]), names[int(result[2]) - 1]
+
+        self.fallback_checks += 1
+        return self._fallback.check_multiple_limits(identifier, limits)
+
+    def reset(self, identifier: Optional[str] = None):
+        """Reset rate limit data (for testing or manual cleanup)."""
+        pattern = f"{self.prefix}{{{identifier}}}:*" if identifier else f"{self.prefix}*"
+        try:
+            keys = list(self._client.scan_iter(match=pattern, count=500))
+            if keys:
+                self._client.delete(*keys)
+        except RedisError as e:
+            self._mark_unavailable(e)
+        self._fallback.reset(identifier)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "backend": "redis",
+            "available": self.available,
+            "remote_checks": self.remote_checks,
+            "fallback_checks": self.fallback_checks,
+            "errors": self.errors,
+        }
+
+
+def get_redis_rate_limiter() -> RedisRateLimiter:
+    """Create the Redis rate limiter configured by RATE_LIMIT_REDIS_* variables."""
+    timeout = float(os.getenv("RATE_LIMIT_REDIS_TIMEOUT_MS", "50")) / 1000
+    client = redis.Redis.from_url(
+        os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0"),
+        socket_timeout=timeout,
+        socket_connect_timeout=timeout,
+    )
+    return RedisRateLimiter(
+        client,
+        prefix=os.getenv("RATE_LIMIT_REDIS_PREFIX", "ratelimit:"),
+        retry_seconds=float(os.getenv("RATE_LIMIT_REDIS_RETRY_SECONDS", "5")),
+    )
@@ -0,0 +1,71 @@
+"""
+Request-scoped stage timings.
+
+ServerTimingMiddleware starts a RequestTimings for every HTTP request and keeps
+it in a ContextVar. Stages timed with metrics.time_stage add their duration to
+it, including stages run in the threadpool (run_in_threadpool copies the
+context, and the copy refers to the same RequestTimings object). The timings are
+sent back as a Server-Timing header, and /chat can include them in the body.
+Stages can also attach details (metadata, scores, ...) for the slow-request log.
+"""
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Optional, Tuple
+
+
+class RequestTimings:
+    """Durations of the stages of one request, in seconds, summed per stage name."""
+
+    __slots__ = ("start", "stages", "details")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.details: Dict[str, Any] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def as_dict(self) -> Dict[str, float]:
+        """Stage durations and the time since the request started, in milliseconds."""
+        timings = {stage: round(seconds * 1000, 2) for stage, seconds in self.stages.items()}
+        timings["total"] = round(self.elapsed() * 1000, 2)
+        return timings
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, e.g. "auth;dur=0.4, answer_llm;dur=812.5, total;dur=830.1"."""
+        return ", ".join(f"{stage};dur={ms}" for stage, ms in self.as_dict().items())
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def start_request_timings() -> Tuple[RequestTimings, Token]:
+    """Begin timing a request, pass the returned token to end_request_timings."""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request_timings(token: Token):
+    _current.reset(token)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """Timings of the request being served, None outside of a request."""
+    return _current.get()
+
+
+def record_stage(stage: str, seconds: float):
+    timings = _current.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+def annotate_request(**details: Any):
+    """Attach details to the request being served, ignored outside of a request."""
+    timings = _current.get()
+    if timings is not None:
+        timings.details.update(details)
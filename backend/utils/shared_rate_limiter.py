@@ -0,0 +1,252 @@
+"""
+Cross-process rate limiter backed by an mmap'd file.
+
+All API workers on a machine map the same file (by default under /dev/shm),
+so limits hold for the whole node instead of per process, and counters
+survive worker restarts.
+
+The file is a fixed-size hash table. An identifier hashes to one group of
+SLOTS_PER_GROUP slots, and each of its windows (per_minute, per_hour, ...)
+occupies one slot in that group. A slot holds the two fixed-window counts of
+the sliding-window counter (or the GCRA arrival time for burst windows), so
+every check is O(1) in time and memory. A check locks only its group: a
+byte-range fcntl lock orders processes and a striped threading lock orders
+threads inside a process, since fcntl locks are owned by the process. Because all windows of an identifier live in one
+group, check_multiple_limits is atomic across windows.
+
+When a group is full, the least recently started window in it is recycled.
+Size the table (RATE_LIMIT_SHM_GROUPS) well above the number of active
+identifiers to keep that rare.
+"""
+import os
+import mmap
+import time
+import fcntl
+import struct
+import hashlib
+import logging
+import tempfile
+import zlib
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from backend.utils.rate_limiter import (
+    RateLimiter,
+    WindowSpec,
+    fixed_window_start,
+    gcra_check,
+    parse_window,
+    roll_window,
+    sliding_window_check,
+)
+
+logger = logging.getLogger(__name__)
+load_dotenv()
+
+_MAGIC = b"HBRL0001"
+# magic, group count, slots per group
+_HEADER = struct.Struct("<8sII")
+_HEADER_SIZE = 64
+# identifier hash, window id, window seconds, current window start, previous count, current count
+_SLOT = struct.Struct("<QIIdII")
+SLOTS_PER_GROUP = 8
+_GROUP_SIZE = _SLOT.size * SLOTS_PER_GROUP
+_THREAD_STRIPES = 64
+
+
+def _identifier_hash(identifier: str) -> int:
+    # Python's hash() is salted per process, the table needs a stable hash. 0 marks an empty slot.
+    return int.from_bytes(hashlib.blake2b(identifier.encode("utf-8"), digest_size=8).digest(), "little") or 1
+
+
+def _window_id(window_name: str) -> int:
+    return zlib.crc32(window_name.encode("utf-8"))
+
+
+class SharedMemoryRateLimiter(RateLimiter):
+    """Rate limiter whose counters live in a file mapped by every worker process."""
+
+    def __init__(self, path: str, groups: int = 16384):
+        self.path = path
+        self.groups = groups
+        self._size = _HEADER_SIZE + groups * _GROUP_SIZE
+        self._thread_locks = [Lock() for _ in range(_THREAD_STRIPES)]
+        self._fd = self._open()
+        self._map = mmap.mmap(self._fd, self._size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+
+    def _open(self) -> int:
+        """
+        Open the table file, creating it if needed. The header lock keeps workers
+        that start together from racing. A file with a different layout (e.g. after
+        RATE_LIMIT_SHM_GROUPS changed) is replaced rather than resized, so processes
+        still mapping the old one are not affected.
+        """
+        expected = _HEADER.pack(_MAGIC, self.groups, SLOTS_PER_GROUP)
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.lockf(fd, fcntl.LOCK_EX, _HEADER_SIZE, 0)
+            try:
+                stat = os.fstat(fd)
+                if not os.path.exists(self.path) or os.stat(self.path).st_ino != stat.st_ino:
+                    # Another worker replaced the file while we waited for the lock
+                    os.close(fd)
+                    continue
+                if stat.st_size == 0:
+                    os.ftruncate(fd, self._size)
+                    os.pwrite(fd, expected, 0)
+                    return fd
+                if stat.st_size == self._size and os.pread(fd, _HEADER.size, 0) == expected:
+                    return fd
+                logger.warning(f"Rate limit table {self.path} has a different layout, replacing it")
+                os.unlink(self.path)
+                os.close(fd)
+            except BaseException:
+                os.close(fd)
+                raise
+            finally:
+                try:
+                    fcntl.lockf(fd, fcntl.LOCK_UN, _HEADER_SIZE, 0)
+                except OSError:
+                    pass
+
+    def _group_offset(self, key: int) -> int:
+        return _HEADER_SIZE + (key % self.groups) * _GROUP_SIZE
+
+    def _lock_group(self, key: int):
+        offset = self._group_offset(key)
+        thread_lock = self._thread_locks[(key % self.groups) % _THREAD_STRIPES]
+        thread_lock.acquire()
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, _GROUP_SIZE, offset)
+        except BaseException:
+            thread_lock.release()
+            raise
+        return offset, thread_lock
+
+    def _unlock_group(self, offset: int, thread_lock: Lock):
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, _GROUP_SIZE, offset)
+        finally:
+            thread_lock.release()
+
+    def _find_slot(
+        self, offset: int, key: int, window: int, window_seconds: int, now: float, claimed: set
+    ) -> Tuple[int, tuple]:
+        """Return the slot for (key, window), claiming a free, expired or oldest slot if needed."""
+        fallback, fallback_start = None, None
+        for index in range(SLOTS_PER_GROUP):
+            slot_offset = offset + index * _SLOT.size
+            if slot_offset in claimed:
+                continue
+            slot = _SLOT.unpack_from(self._map, slot_offset)
+            slot_key, slot_window, slot_seconds, slot_start = slot[0], slot[1], slot[2], slot[3]
+            if slot_key == key and slot_window == window:
+                return slot_offset, slot
+            if slot_key == 0 or now >= slot_start + 2 * slot_seconds:
+                # Empty, or both of its windows are over and it no longer affects any decision
+                free_start = float("-inf")
+            else:
+                free_start = slot_start
+            if fallback is None or free_start < fallback_start:
+                fallback, fallback_start = slot_offset, free_start
+
+        if fallback_start != float("-inf"):
+            logger.debug("Rate limit table group full, recycling its oldest window")
+        return fallback, (key, window, window_seconds, 0.0, 0, 0)
+
+    def _check_locked(
+        self, offset: int, key: int, limits: Dict[str, WindowSpec], now: float
+    ) -> Tuple[bool, Optional[int], Optional[str]]:
+        pending: List[tuple] = []
+        claimed = set()
+        for window_name, spec in limits.items():
+            limit, window_seconds, burst = parse_window(spec)
+            window = _window_id(window_name)
+            slot_offset, slot = self._find_slot(offset, key, window, window_seconds, now, claimed)
+            claimed.add(slot_offset)
+            if burst:
+                # Burst windows keep the theoretical arrival time in the window start field
+                allowed, retry_after, tat = gcra_check(slot[3], now, limit, window_seconds, burst)
+                state = (tat, 0, 0)
+            else:
+                window_start = fixed_window_start(now, window_seconds)
+                previous, current = roll_window(slot[3], slot[4], slot[5], window_start, window_seconds)
+                allowed, retry_after = sliding_window_check(previous, current, window_start, now, limit, window_seconds)
+                state = (window_start, previous, current + 1)
+            if not allowed:
+                return False, retry_after, window_name
+            pending.append((slot_offset, window, window_seconds, state))
+
+        # Every window allows the request, record it in all of them
+        for slot_offset, window, window_seconds, state in pending:
+            _SLOT.pack_into(self._map, slot_offset, key, window, window_seconds, *state)
+        return True, None, None
+
+    def check_multiple_limits(
+        self,
+        identifier: str,
+        limits: Dict[str, WindowSpec],
+    ) -> Tuple[bool, Optional[int], Optional[str]]:
+        """
+        Check several windows at once. The request is counted in every window only if all allow it.
+        Returns: (is_allowed, retry_after_seconds, violated_window_name)
+        """
+        key = _identifier_hash(identifier)
+        offset, thread_lock = self._lock_group(key)
+        try:
+            return self._check_locked(offset, key, limits, time.time())
+        finally:
+            self._unlock_group(offset, thread_lock)
+
+    def reset(self, identifier: Optional[str] = None):
+        """Reset rate limit data (for testing or manual cleanup)."""
+        if identifier:
+            key = _identifier_hash(identifier)
+            offset, thread_lock = self._lock_group(key)
+            try:
+                for index in range(SLOTS_PER_GROUP):
+                    slot_offset = offset + index * _SLOT.size
+                    if _SLOT.unpack_from(self._map, slot_offset)[0] == key:
+                        self._map[slot_offset:slot_offset + _SLOT.size] = bytes(_SLOT.size)
+            finally:
+                self._unlock_group(offset, thread_lock)
+            return
+
+        for thread_lock in self._thread_locks:
+            thread_lock.acquire()
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self._size - _HEADER_SIZE, _HEADER_SIZE)
+            try:
+                self._map[_HEADER_SIZE:] = bytes(self._size - _HEADER_SIZE)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self._size - _HEADER_SIZE, _HEADER_SIZE)
+        finally:
+            for thread_lock in self._thread_locks:
+                thread_lock.release()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "backend": "shared",
+            "path": self.path,
+            "groups": self.groups,
+            "slots": self.groups * SLOTS_PER_GROUP,
+            "memory_bytes": self._size,
+        }
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+def _default_path() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "handbook-rate-limits")
+
+
+def get_shared_rate_limiter() -> SharedMemoryRateLimiter:
+    """Open the node-wide rate limit table configured by RATE_LIMIT_SHM_PATH / RATE_LIMIT_SHM_GROUPS."""
+    path = os.getenv("RATE_LIMIT_SHM_PATH") or _default_path()
+    groups = int(os.getenv("RATE_LIMIT_SHM_GROUPS", "16384"))
+    limiter = SharedMemoryRateLimiter(path, groups)
+    logger.info(f"Opened shared rate limit table {path} ({limiter._size // 1024} KiB)")
+    return limiter
@@ -0,0 +1,83 @@
+"""
+Slow-request log: /chat requests slower than SLOW_REQUEST_THRESHOLD_SECONDS are
+kept in a bounded ring buffer (SLOW_REQUEST_LOG_SIZE entries, oldest dropped
+first) with the details needed to tell where the time went. The question itself
+is not stored, only a hash of it, so the log can be shared without exposing
+what employees asked. Entries are per process.
+"""
+import os
+import time
+import hashlib
+from collections import deque
+from threading import Lock
+from typing import Any, Deque, Dict, List, Optional
+from backend.utils.request_timing import RequestTimings
+
+
+def question_hash(question: str) -> str:
+    """Stable short hash of the normalized question, to group repeats of the same question."""
+    normalized = " ".join(question.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+class SlowRequestLog:
+    """Ring buffer of the most recent slow requests."""
+
+    def __init__(self, threshold_seconds: float, max_entries: int):
+        self.threshold_seconds = threshold_seconds
+        self.max_entries = max_entries
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=max(max_entries, 0))
+        self._lock = Lock()
+        self.recorded = 0
+
+    def record_if_slow(self, timings: RequestTimings, question: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        """Store the request if it took at least the threshold, returns the stored entry."""
+        elapsed = timings.elapsed()
+        if elapsed < self.threshold_seconds or self.max_entries <= 0:
+            return None
+        entry = {
+            "timestamp": time.time(),
+            "duration_ms": round(elapsed * 1000, 2),
+            "question_hash": question_hash(question),
+            **fields,
+            **timings.details,
+            "timings": timings.as_dict(),
+        }
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+        return entry
+
+    def worst(self, n: int = 10) -> List[Dict[str, Any]]:
+        """The n slowest requests still in the buffer, slowest first."""
+        with self._lock:
+            entries = list(self._entries)
+        return sorted(entries, key=lambda entry: entry["duration_ms"], reverse=True)[:max(n, 0)]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.recorded = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold_seconds": self.threshold_seconds,
+                "recorded": self.recorded,
+            }
+
+
+_slow_request_log: Optional[SlowRequestLog] = None
+
+
+def get_slow_request_log() -> SlowRequestLog:
+    """Build the log from SLOW_REQUEST_THRESHOLD_SECONDS / SLOW_REQUEST_LOG_SIZE on first use."""
+    global _slow_request_log
+    if _slow_request_log is None:
+        _slow_request_log = SlowRequestLog(
+            float(os.getenv("SLOW_REQUEST_THRESHOLD_SECONDS", "5")),
+            int(os.getenv("SLOW_REQUEST_LOG_SIZE", "100")),
+        )
+    return _slow_request_log
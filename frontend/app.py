@@ -69,6 +69,8 @@ if "is_authenticated" not in st.session_state:
     st.session_state.is_authenticated = False
 if "login_error" not in st.session_state:
     st.session_state.login_error = None
+if "last_timings" not in st.session_state:
+    st.session_state.last_timings = {}
 
 def get_api_url():
     """Get the current API URL from session state or default"""
@@ -150,6 +152,18 @@ def upload_handbook(file):
     except requests.exceptions.RequestException as e:
         return False, f"Connection error: {str(e)}"
 
+def parse_server_timing(header: str) -> dict:
+    """Parse a Server-Timing header ("stage;dur=12.3, total;dur=40.1") into {stage: milliseconds}"""
+    timings = {}
+    for entry in header.split(","):
+        name, _, params = entry.strip().partition(";")
+        if name and params.startswith("dur="):
+            try:
+                timings[name] = float(params[4:])
+            except ValueError:
+                pass
+    return timings
+
 def query_handbook(question: str, limit: int = 5, timeout: int = 120):
     """Query the handbook"""
     try:
@@ -173,6 +187,7 @@ def query_handbook(question: str, limit: int = 5, timeout: int = 120):
             headers=headers,
             timeout=timeout
         )
+        st.session_state.last_timings = parse_server_timing(response.headers.get("Server-Timing", ""))
         if response.status_code == 200:
             data = response.json()
             return True, data
@@ -297,6 +312,12 @@ with st.sidebar:
         help="Maximum time to wait for a response (increase if queries are slow)"
     )
 
+    show_timings = st.checkbox(
+        "Show latency breakdown",
+        value=False,
+        help="Show how long each stage of the answer took (from the Server-Timing header)"
+    )
+
 # Main content area
 st.markdown('<h1 class="main-header">📚 Employee Handbook Bot</h1>', unsafe_allow_html=True)
 st.markdown("---")
@@ -350,6 +371,11 @@ if prompt := st.chat_input("Ask a question about the employee handbook..."):
                 
                 # Display answer with better formatting
                 st.markdown(answer)
+
+                if show_timings and st.session_state.last_timings:
+                    with st.expander("⏱️ Latency breakdown"):
+                        for stage, ms in st.session_state.last_timings.items():
+                            st.text(f"{stage:<20} {ms:>10.1f} ms")
                 
                 # Add bot response to chat history
                 st.session_state.messages.append({"role": "assistant", "content": answer})